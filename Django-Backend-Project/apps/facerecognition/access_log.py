@@ -0,0 +1,180 @@
+import atexit
+import logging
+import queue
+import threading
+import uuid
+from datetime import datetime
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import Logsmartaccess2
+
+try:
+    import numpy as np
+    import cv2
+except ModuleNotFoundError:
+    np = None
+    cv2 = None
+
+
+logger = logging.getLogger(__name__)
+
+
+def _encode_jpeg(image):
+    ok, buffer = cv2.imencode('.jpeg', image)
+    if not ok:
+        raise ValueError('Gagal encode frame ke JPEG')
+    return buffer.tobytes()
+
+
+def annotate_frame(image, faces):
+    """Gambar kotak dan nama tiap wajah langsung pada `image` (milik job log)."""
+    for face in faces:
+        x, y, w, h = face['box']
+        color = (0, 255, 0) if face['id_face_user'] is not None else (0, 0, 255)
+        cv2.putText(image, face['username'], (x+100, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+        cv2.rectangle(image, (x, y), (x + w, y + h), (255, 0, 0), 2)
+    return image
+
+
+def _decode_frame(frame):
+    if isinstance(frame, (bytes, bytearray, memoryview)):
+        return cv2.imdecode(np.frombuffer(frame, dtype=np.uint8), cv2.IMREAD_COLOR)
+    return frame
+
+
+def make_thumbnail(image, max_size=None):
+    """Perkecil frame dengan mempertahankan rasio, untuk daftar log akses."""
+    max_size = max_size or getattr(settings, 'FACE_THUMBNAIL_SIZE', 160)
+    height, width = image.shape[:2]
+    scale = min(1.0, max_size / max(height, width))
+    if scale >= 1.0:
+        return image
+    size = (max(1, int(width * scale)), max(1, int(height * scale)))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+
+def write_access_log(job):
+    """Decode/anotasi frame, simpan JPEG + thumbnail ke media, lalu insert Logsmartaccess2."""
+    image = _decode_frame(job['frame'])
+    if image is None:
+        raise ValueError('Frame log akses tidak dapat dibaca')
+    if job['faces']:
+        image = annotate_frame(image, job['faces'])
+    file_name = f"{job['file_prefix']}_{job['timestamp']}.jpeg"
+    log = Logsmartaccess2(
+        log_id=job['log_id'],
+        id_face_user_id=job['id_face_user'],
+        status=job['status'],
+    )
+    log.image.save(file_name, ContentFile(_encode_jpeg(image)), save=False)
+    log.thumbnail.save(f"thumb_{file_name}", ContentFile(_encode_jpeg(make_thumbnail(image))), save=False)
+    log.save(force_insert=True)
+    return log
+
+
+class AccessLogWriter:
+    """
+    Antrian background per worker untuk menyimpan log akses wajah.
+
+    Antrian dibatasi `maxsize` frame sehingga memori tetap terkendali. Jika
+    antrian penuh sampai `put_timeout`, log ditulis langsung di thread
+    pemanggil (backpressure) sehingga tidak ada log yang dibuang.
+    """
+
+    def __init__(self, maxsize=32, workers=1, put_timeout=0.05, start=True):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.put_timeout = put_timeout
+        self._threads = []
+        if start:
+            for index in range(workers):
+                thread = threading.Thread(target=self._run, name=f'access-log-writer-{index}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, job):
+        """Masukkan job ke antrian; kembalikan False jika ditulis sinkron karena antrian penuh."""
+        try:
+            self.queue.put(job, timeout=self.put_timeout)
+            return True
+        except queue.Full:
+            logger.warning("Access log queue full, writing log %s synchronously", job['log_id'])
+            self._write(job)
+            return False
+
+    def _write(self, job):
+        try:
+            write_access_log(job)
+        except Exception:
+            logger.exception("Failed to persist access log %s", job['log_id'])
+
+    def _run(self):
+        while True:
+            job = self.queue.get()
+            try:
+                self._write(job)
+            finally:
+                close_old_connections()
+                self.queue.task_done()
+
+    def drain(self, timeout=5.0):
+        """Tunggu antrian kosong (dipanggil saat proses berhenti)."""
+        deadline = threading.Event()
+        waiter = threading.Thread(target=lambda: (self.queue.join(), deadline.set()), daemon=True)
+        waiter.start()
+        return deadline.wait(timeout)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_access_log_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = AccessLogWriter(
+                    maxsize=getattr(settings, 'FACE_ACCESS_LOG_QUEUE_SIZE', 32),
+                    workers=getattr(settings, 'FACE_ACCESS_LOG_WORKERS', 1),
+                )
+                atexit.register(_writer.drain)
+    return _writer
+
+
+def queue_access_log(results, frame, faces=None):
+    """
+    Jadwalkan penyimpanan log akses untuk satu hasil pengenalan dan langsung
+    kembalikan data log (tanpa URL gambar, karena file belum ditulis).
+
+    `frame` berupa array BGR atau bytes JPEG asli dari kamera, dan menjadi
+    milik job (anotasi `faces` digambar langsung di atasnya saat disimpan).
+    """
+    authorized = bool(results['id_face_user'])
+    job = {
+        'log_id': str(uuid.uuid4()),
+        'id_face_user': str(results['id_face_user']) if authorized else None,
+        'status': results['status'],
+        'frame': frame,
+        'faces': [
+            {key: face[key] for key in ('box', 'id_face_user', 'username')}
+            for face in (faces or [])
+        ],
+        'file_prefix': f"{results['username']}_{results['status']}" if authorized else 'Unknown',
+        'timestamp': datetime.now().strftime('%Y%m%d_%H%M%S_%f'),
+    }
+    if getattr(settings, 'FACE_ACCESS_LOG_ASYNC', True):
+        get_access_log_writer().submit(job)
+    else:
+        write_access_log(job)
+    return {
+        'log_id': job['log_id'],
+        'id_face_user': job['id_face_user'],
+        'status': job['status'],
+        'access_time': timezone.now().isoformat(),
+        'image': None,
+        'thumbnail': None,
+    }
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class FacerecognitionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.facerecognition'
+
+    def ready(self):
+        # Invalidasi index label wajah saat data User berubah
+        import apps.facerecognition.signals  # noqa: F401
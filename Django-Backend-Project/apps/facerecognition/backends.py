@@ -0,0 +1,328 @@
+import logging
+import os
+import threading
+
+from django.conf import settings
+
+from . import crop_cache
+from .registry import MODEL_PATH, _file_signature, get_registry, model_write_lock, save_model_atomic
+
+try:
+    import numpy as np
+    import cv2
+except ModuleNotFoundError:
+    np = None
+    cv2 = None
+
+
+logger = logging.getLogger(__name__)
+
+
+class LBPHBackend:
+    """
+    Backend bawaan: satu model LBPH (`lbph_model.xml`) yang menyimpan semua
+    histogram training dan di-scan linear pada setiap prediksi.
+    """
+
+    name = 'lbph'
+
+    def __init__(self, model_path=MODEL_PATH):
+        self.model_path = model_path
+        self.threshold = getattr(settings, 'FACE_LBPH_THRESHOLD', 50)
+
+    @property
+    def lock_path(self):
+        return self.model_path
+
+    def exists(self):
+        return os.path.exists(self.model_path)
+
+    def predict_many(self, crops):
+        """Kembalikan (label, distance) per crop; None jika prediksi gagal."""
+        recognizer = get_registry(self.model_path).get_recognizer()
+        if recognizer is None:
+            return [None] * len(crops)
+        predictions = []
+        for crop in crops:
+            try:
+                label, distance = recognizer.predict(crop)
+                predictions.append((int(label), float(distance)))
+            except cv2.error as e:
+                print(f"Error predicting face: {e}")
+                predictions.append(None)
+        return predictions
+
+    def add(self, faces, labels):
+        """Tambah crop ke model yang ada (read + update + simpan XML penuh)."""
+        recognizer = cv2.face.LBPHFaceRecognizer.create()
+        if self.exists():
+            recognizer.read(self.model_path)
+            recognizer.update(faces, np.array(labels))
+        else:
+            recognizer.train(faces, np.array(labels))
+        save_model_atomic(recognizer, self.model_path)
+
+    def rebuild(self, faces, labels):
+        recognizer = cv2.face.LBPHFaceRecognizer.create()
+        recognizer.train(list(np.stack(faces)), np.array(labels))
+        save_model_atomic(recognizer, self.model_path)
+
+    def remove_owner(self, label):
+        """LBPH tidak bisa menghapus histogram per label; perlu retrain penuh."""
+        return False
+
+    def metrics(self):
+        return dict(get_registry(self.model_path).metrics(), backend=self.name)
+
+    def size_bytes(self):
+        return self.metrics()['model_size_bytes']
+
+
+def _uniform_lbp_table():
+    """Peta kode LBP 8-bit ke 59 bin: 58 pola uniform + 1 bin sisa."""
+    table = np.full(256, 58, dtype=np.int64)
+    index = 0
+    for code in range(256):
+        bits = [(code >> shift) & 1 for shift in range(8)]
+        transitions = sum(bits[i] != bits[(i + 1) % 8] for i in range(8))
+        if transitions <= 2:
+            table[code] = index
+            index += 1
+    return table
+
+
+LBP_BINS = 59
+LBP_GRID = 8
+_UNIFORM_TABLE = _uniform_lbp_table() if np is not None else None
+
+
+def lbp_histograms(crops, grid=LBP_GRID):
+    """
+    Vektor fitur LBP uniform untuk banyak crop sekaligus, shape (n, grid*grid*59).
+
+    Histogram per sel dinormalisasi lalu diakar (Hellinger), sehingga setiap
+    vektor ber-norma 1 dan kemiripan cukup dihitung dengan dot product.
+    """
+    if np is None or not len(crops):
+        return np.zeros((0, grid * grid * LBP_BINS), dtype=np.float32)
+    images = np.stack([crop_cache.normalize_crop(crop) for crop in crops]).astype(np.int16)
+    center = images[:, 1:-1, 1:-1]
+    height, width = center.shape[1:]
+    codes = np.zeros(center.shape, dtype=np.int64)
+    offsets = ((-1, -1), (-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1))
+    for bit, (dy, dx) in enumerate(offsets):
+        neighbour = images[:, 1 + dy:1 + dy + height, 1 + dx:1 + dx + width]
+        codes |= (neighbour >= center).astype(np.int64) << bit
+    codes = _UNIFORM_TABLE[codes]
+
+    # Index sel grid untuk setiap piksel, lalu satu bincount untuk semua crop
+    rows = np.minimum(np.arange(height) * grid // height, grid - 1)
+    cols = np.minimum(np.arange(width) * grid // width, grid - 1)
+    cells = (rows[:, None] * grid + cols[None, :])
+    count = len(images)
+    feature_size = grid * grid * LBP_BINS
+    flat = (np.arange(count)[:, None, None] * feature_size + cells[None] * LBP_BINS + codes).ravel()
+    hist = np.bincount(flat, minlength=count * feature_size).reshape(count, grid * grid, LBP_BINS)
+    hist = hist / np.maximum(hist.sum(axis=2, keepdims=True), 1)
+    features = np.sqrt(hist).reshape(count, feature_size) / grid
+    return features.astype(np.float32)
+
+
+class HistogramIndexBackend:
+    """
+    Index nearest-neighbour dari vektor histogram LBP per owner.
+
+    Vektor disimpan per owner di `<index_dir>/<label>.npy` (float32), sehingga
+    enroll/hapus satu owner hanya menulis satu file kecil. Di memori semua
+    vektor digabung menjadi satu matriks kontigu; prediksi semua wajah dalam
+    satu frame adalah satu perkalian matriks. Distance = jarak Hellinger x 100
+    (0 = identik), diperbandingkan dengan `FACE_HISTOGRAM_THRESHOLD`.
+    """
+
+    name = 'histogram'
+    VERSION_FILE = 'index.version'
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        self.threshold = getattr(settings, 'FACE_HISTOGRAM_THRESHOLD', 35)
+        self._lock = threading.Lock()
+        self._version_signature = None
+        self._owner_signatures = {}
+        self._owner_vectors = {}
+        # (matrix, labels) diganti sebagai satu tuple agar pembaca tidak melihat pasangan campuran
+        self._index = None
+        self._load_count = 0
+
+    @property
+    def lock_path(self):
+        return os.path.join(self.index_dir, 'index')
+
+    @property
+    def _version_path(self):
+        return os.path.join(self.index_dir, self.VERSION_FILE)
+
+    def _owner_path(self, label):
+        return os.path.join(self.index_dir, f"{int(label)}.npy")
+
+    def exists(self):
+        return _file_signature(self._version_path) is not None
+
+    def _bump_version(self):
+        tmp_path = f"{self._version_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as file:
+            file.write(str(os.getpid()))
+        os.replace(tmp_path, self._version_path)
+
+    def _write_owner(self, label, vectors):
+        os.makedirs(self.index_dir, exist_ok=True)
+        path = self._owner_path(label)
+        tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+        np.save(tmp_path, np.ascontiguousarray(vectors, dtype=np.float32))
+        os.replace(tmp_path, path)
+
+    def _load_owner(self, label):
+        path = self._owner_path(label)
+        if not os.path.exists(path):
+            return np.zeros((0, LBP_GRID * LBP_GRID * LBP_BINS), dtype=np.float32)
+        return np.load(path)
+
+    def _ensure_loaded(self):
+        """Muat ulang hanya file owner yang berubah sejak versi index terakhir."""
+        signature = _file_signature(self._version_path)
+        if signature is None:
+            return False
+        if signature == self._version_signature:
+            return self._index is not None
+        with self._lock:
+            if signature == self._version_signature:
+                return self._index is not None
+            owner_signatures = {}
+            with os.scandir(self.index_dir) as entries:
+                for entry in entries:
+                    stem, ext = os.path.splitext(entry.name)
+                    if ext == '.npy' and stem.isdigit():
+                        owner_signatures[int(stem)] = _file_signature(entry.path)
+            owner_vectors = {}
+            for label, owner_signature in owner_signatures.items():
+                if self._owner_signatures.get(label) == owner_signature:
+                    owner_vectors[label] = self._owner_vectors[label]
+                else:
+                    owner_vectors[label] = np.load(self._owner_path(label))
+            owner_vectors = {label: vectors for label, vectors in owner_vectors.items() if len(vectors)}
+            if owner_vectors:
+                labels = sorted(owner_vectors)
+                self._index = (
+                    np.ascontiguousarray(np.concatenate([owner_vectors[label] for label in labels])),
+                    np.repeat(labels, [len(owner_vectors[label]) for label in labels]),
+                )
+            else:
+                self._index = None
+            self._owner_signatures = owner_signatures
+            self._owner_vectors = owner_vectors
+            self._version_signature = signature
+            self._load_count += 1
+            logger.info(
+                "Face histogram index loaded from %s: %d owners, %d vectors",
+                self.index_dir, len(owner_vectors), self._vector_count(),
+            )
+        return self._index is not None
+
+    def _vector_count(self):
+        index = self._index
+        return 0 if index is None else len(index[1])
+
+    def predict_many(self, crops):
+        if not len(crops):
+            return []
+        self._ensure_loaded()
+        index = self._index
+        if index is None:
+            return [None] * len(crops)
+        matrix, labels = index
+        similarity = lbp_histograms(crops) @ matrix.T
+        best = similarity.argmax(axis=1)
+        best_similarity = np.clip(similarity[np.arange(len(crops)), best], 0.0, 1.0)
+        distances = 100.0 * np.sqrt(1.0 - best_similarity)
+        return [(int(labels[position]), float(distance)) for position, distance in zip(best, distances)]
+
+    def _group_by_label(self, faces, labels):
+        features = lbp_histograms(faces)
+        labels = np.asarray(labels)
+        return {int(label): features[labels == label] for label in np.unique(labels)}
+
+    def add(self, faces, labels):
+        """Tambahkan vektor baru; hanya file owner yang bersangkutan yang ditulis."""
+        for label, vectors in self._group_by_label(faces, labels).items():
+            self._write_owner(label, np.concatenate([self._load_owner(label), vectors]))
+        self._bump_version()
+
+    def rebuild(self, faces, labels):
+        grouped = self._group_by_label(faces, labels)
+        os.makedirs(self.index_dir, exist_ok=True)
+        for label, vectors in grouped.items():
+            self._write_owner(label, vectors)
+        with os.scandir(self.index_dir) as entries:
+            stale = [
+                entry.path for entry in entries
+                if entry.name.endswith('.npy') and entry.name[:-4].isdigit() and int(entry.name[:-4]) not in grouped
+            ]
+        for path in stale:
+            os.remove(path)
+        self._bump_version()
+
+    def remove_owner(self, label):
+        """Hapus vektor owner di bawah kunci yang sama dengan training (juga dipakai signal hapus user)."""
+        with model_write_lock(self.lock_path):
+            path = self._owner_path(label)
+            if os.path.exists(path):
+                os.remove(path)
+                self._bump_version()
+        return True
+
+    def metrics(self):
+        self._ensure_loaded()
+        size = 0
+        if os.path.isdir(self.index_dir):
+            with os.scandir(self.index_dir) as entries:
+                size = sum(entry.stat().st_size for entry in entries if entry.name.endswith('.npy'))
+        return {
+            'backend': self.name,
+            'index_dir': self.index_dir,
+            'model_exists': self.exists(),
+            'model_size_bytes': size,
+            'owners': len(self._owner_vectors),
+            'vectors': self._vector_count(),
+            'load_count': self._load_count,
+            'pid': os.getpid(),
+        }
+
+    def size_bytes(self):
+        return self.metrics()['model_size_bytes']
+
+
+
+BACKENDS = {
+    LBPHBackend.name: lambda model_path: LBPHBackend(model_path),
+    HistogramIndexBackend.name: lambda model_path: HistogramIndexBackend(
+        os.path.join(os.path.dirname(model_path), 'embeddings')
+    ),
+}
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(model_path=MODEL_PATH, name=None):
+    """
+    Backend pengenalan aktif (`FACE_RECOGNIZER_BACKEND`) untuk direktori model
+    `model_path`; satu instance per proses worker.
+    """
+    name = name or getattr(settings, 'FACE_RECOGNIZER_BACKEND', LBPHBackend.name)
+    if name not in BACKENDS:
+        raise ValueError(f"FACE_RECOGNIZER_BACKEND tidak dikenal: {name}")
+    key = (name, model_path)
+    backend = _backends.get(key)
+    if backend is None:
+        with _backends_lock:
+            backend = _backends.setdefault(key, BACKENDS[name](model_path))
+    return backend
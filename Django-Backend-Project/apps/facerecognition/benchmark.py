@@ -0,0 +1,190 @@
+"""
+Benchmark pipeline face recognition pada owner sintetis.
+
+`run_scale` menjalankan jalur produksi yang sebenarnya: baris User dan
+Datawajahnew dengan file JPEG, `cache_upload_crops` saat upload,
+`train_user_images` (manifest, crop cache, `model_write_lock`) untuk enroll
+dan `rebuild_face_model` untuk retrain penuh. Hanya detektor Haar yang
+diganti kotak tetap karena wajah sintetis tidak selalu terdeteksi Haar.
+Pemanggil (command `bench_facerecognition`) menyiapkan database test,
+MEDIA_ROOT sementara dan backend, satu subprocess per skala agar peak RSS
+terukur per skala.
+"""
+import contextlib
+import os
+import resource
+import statistics
+import time
+
+from django.core.files.base import ContentFile
+
+from apps.users.models import User
+
+from . import crop_cache
+from .backends import _backends, _backends_lock, get_backend
+from .models import Datawajahnew
+from .registry import FaceModelRegistry, _registries, _registries_lock
+from .training import cache_upload_crops, rebuild_face_model, train_user_images
+
+try:
+    import numpy as np
+    import cv2
+except ModuleNotFoundError:
+    np = None
+    cv2 = None
+
+
+FRAME_SIZE = (240, 320)
+FACE_BOX = (110, 70, 100, 100)
+
+
+class FixedBoxCascade:
+    """
+    Pengganti Haar cascade untuk benchmark: wajah sintetis tidak selalu
+    terdeteksi Haar, jadi kotak wajah dikembalikan langsung.
+    """
+
+    def __init__(self, box=FACE_BOX):
+        self.box = np.array([box])
+
+    def detectMultiScale(self, gray, *args, **kwargs):
+        return self.box
+
+
+def synthetic_face(rng, owner_seed, size):
+    """Wajah abu-abu sintetis: tekstur tetap per owner + noise kecil per gambar."""
+    owner_rng = np.random.default_rng(owner_seed)
+    texture = cv2.GaussianBlur(owner_rng.integers(0, 255, (size, size)).astype(np.uint8), (5, 5), 0)
+    face = np.full((size, size), 60, dtype=np.uint8)
+    cv2.ellipse(face, (size // 2, size // 2), (size * 2 // 5, size // 2 - 4), 0, 0, 360, 255, -1)
+    face = np.where(face == 255, texture, face).astype(np.float64)
+    noise = rng.normal(0, 3, face.shape)
+    return np.clip(face + noise, 0, 255).astype(np.uint8)
+
+
+def synthetic_frame(face):
+    """Tempel wajah ke frame BGR pada FACE_BOX, seperti frame kamera kiosk."""
+    x, y, w, h = FACE_BOX
+    gray = np.full(FRAME_SIZE, 40, dtype=np.uint8)
+    gray[y:y+h, x:x+w] = cv2.resize(face, (w, h))
+    return cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+
+
+def peak_rss_mb():
+    # ru_maxrss (KiB di Linux) adalah puncak seumur proses, jadi satu skala per proses
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _percentile(samples, percent):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _jpeg(frame):
+    _, buffer = cv2.imencode('.jpg', frame)
+    return buffer.tobytes()
+
+
+def create_owners(rng, owners, images_per_owner):
+    """Buat owner sintetis beserta gambar training-nya; mengembalikan {owner: [Datawajahnew]}."""
+    size = crop_cache.CROP_SIZE
+    users = User.objects.bulk_create([
+        User(
+            username=f'bench_owner_{owner}', email=f'bench_owner_{owner}@example.com', password='!',
+            role=User.Role.OWNER, face_id=str(owner), first_name='Bench', last_name=str(owner),
+        )
+        for owner in owners
+    ])
+    rows = {}
+    for owner, user in zip(owners, users):
+        rows[owner] = []
+        for index in range(images_per_owner):
+            row = Datawajahnew(user=user)
+            row.image_user.save(f'{index}.jpg', ContentFile(_jpeg(synthetic_frame(synthetic_face(rng, owner, size)))), save=True)
+            rows[owner].append(row)
+    return rows
+
+
+def _training_rows(rows):
+    return list(
+        Datawajahnew.objects.filter(pk__in=[row.pk for row in rows]).select_related('user', 'manifest')
+    )
+
+
+def run_scale(owner_count, model_path, images_per_owner=5, queries=100, enroll_samples=3, seed=0):
+    """
+    Ukur pipeline untuk `owner_count` owner sintetis (label 1..n):
+    - upload_s: `cache_upload_crops` untuk semua gambar (decode + deteksi + cache)
+    - initial_train_s: `train_user_images` untuk semua owner dari crop cache
+    - retrain_s: `rebuild_face_model` (generasi baru, dari crop cache)
+    - enroll_ms: rata-rata upload + training satu owner baru
+    - recognize p50/p99: `recognize_from_image` pada frame berwajah
+    Harus dijalankan di database test dan MEDIA_ROOT sementara.
+    """
+    from .views import recognize_from_image
+
+    rng = np.random.default_rng(seed)
+    size = crop_cache.CROP_SIZE
+    registry = FaceModelRegistry(model_path=model_path)
+    registry._cascade = FixedBoxCascade()
+    with _registries_lock:
+        _registries[model_path] = registry
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            owners = list(range(1, owner_count + 1))
+            rows_by_owner = create_owners(rng, owners, images_per_owner)
+            all_rows = [row for rows in rows_by_owner.values() for row in rows]
+
+            start = time.perf_counter()
+            cache_upload_crops(_training_rows(all_rows), model_path)
+            upload_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            train_user_images(_training_rows(all_rows), model_path)
+            initial_train_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            rebuild_face_model(model_path)
+            retrain_s = time.perf_counter() - start
+
+            enroll_times = []
+            new_owners = list(range(owner_count + 1, owner_count + enroll_samples + 1))
+            for owner, rows in create_owners(rng, new_owners, images_per_owner).items():
+                start = time.perf_counter()
+                cache_upload_crops(_training_rows(rows), model_path)
+                train_user_images(_training_rows(rows), model_path)
+                enroll_times.append((time.perf_counter() - start) * 1000)
+            model_size = get_backend(model_path).size_bytes()
+
+            label_to_user = {owner: f'bench_owner_{owner}' for owner in owners + new_owners}
+            recognize_from_image(synthetic_frame(synthetic_face(rng, 1, size)), model_path, label_to_user)
+            latencies = []
+            correct = 0
+            for _ in range(queries):
+                owner = int(rng.integers(1, owner_count + 1))
+                frame = synthetic_frame(synthetic_face(rng, owner, size))
+                start = time.perf_counter()
+                results = recognize_from_image(frame, model_path, label_to_user)
+                latencies.append((time.perf_counter() - start) * 1000)
+                correct += any(item['label'] == owner for item in results)
+    finally:
+        with _registries_lock:
+            _registries.pop(model_path, None)
+        with _backends_lock:
+            for key in [key for key in _backends if key[1] == model_path]:
+                _backends.pop(key, None)
+
+    return {
+        'owners': owner_count,
+        'images_per_owner': images_per_owner,
+        'upload_s': round(upload_s, 3),
+        'initial_train_s': round(initial_train_s, 3),
+        'retrain_s': round(retrain_s, 3),
+        'enroll_ms': round(statistics.mean(enroll_times), 2) if enroll_times else None,
+        'model_size_bytes': model_size,
+        'recognize_p50_ms': round(_percentile(latencies, 50), 2),
+        'recognize_p99_ms': round(_percentile(latencies, 99), 2),
+        'accuracy': round(correct / queries, 3),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
@@ -0,0 +1,113 @@
+import fcntl
+import os
+from contextlib import contextmanager
+
+from django.conf import settings
+
+try:
+    import numpy as np
+    import cv2
+except ModuleNotFoundError:
+    np = None
+    cv2 = None
+
+
+CROP_SIZE = getattr(settings, 'FACE_CROP_SIZE', 100)
+
+
+def cache_dir():
+    return os.path.join(settings.MEDIA_ROOT, 'facecrops')
+
+
+def _paths(face_id):
+    base = os.path.join(cache_dir(), str(face_id))
+    return f"{base}.npy", f"{base}.ids.npy"
+
+
+@contextmanager
+def owner_lock(face_id):
+    """Kunci per owner: upload dan training bisa menulis file crop yang sama."""
+    os.makedirs(cache_dir(), exist_ok=True)
+    with open(os.path.join(cache_dir(), f"{face_id}.lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def normalize_crop(face_image):
+    """Ubah crop wajah grayscale menjadi array uint8 berukuran tetap."""
+    return cv2.resize(face_image, (CROP_SIZE, CROP_SIZE), interpolation=cv2.INTER_AREA)
+
+
+def _save_atomic(path, array):
+    tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+    np.save(tmp_path, array)
+    os.replace(tmp_path, path)
+
+
+def load_owner_crops(face_id, mmap=True):
+    """
+    Kembalikan (crops, image_ids) untuk satu owner.
+    `crops` berbentuk (n, CROP_SIZE, CROP_SIZE) uint8 dan dibaca memory-mapped.
+    """
+    crops_path, ids_path = _paths(face_id)
+    if not (os.path.exists(crops_path) and os.path.exists(ids_path)):
+        return None, None
+    mode = 'r' if mmap else None
+    return np.load(crops_path, mmap_mode=mode), np.load(ids_path)
+
+
+def write_owner_crops(face_id, crops_by_image, keep_image_ids=None):
+    """
+    Simpan crop untuk owner: crop lama milik image id di `crops_by_image`
+    diganti, dan jika `keep_image_ids` diberikan, crop image lain dibuang.
+    """
+    with owner_lock(face_id):
+        return _write_owner_crops(face_id, crops_by_image, keep_image_ids)
+
+
+def _write_owner_crops(face_id, crops_by_image, keep_image_ids):
+    crops, image_ids = load_owner_crops(face_id, mmap=False)
+    replaced = set(crops_by_image)
+    kept_crops = []
+    kept_ids = []
+    if crops is not None:
+        mask = np.array([
+            image_id not in replaced and (keep_image_ids is None or image_id in keep_image_ids)
+            for image_id in image_ids.tolist()
+        ], dtype=bool)
+        if mask.any():
+            kept_crops.append(crops[mask])
+            kept_ids.append(image_ids[mask])
+    for image_id, image_crops in crops_by_image.items():
+        if len(image_crops):
+            kept_crops.append(np.asarray(image_crops, dtype=np.uint8).reshape(-1, CROP_SIZE, CROP_SIZE))
+            kept_ids.append(np.full(len(image_crops), image_id, dtype=np.int64))
+
+    crops_path, ids_path = _paths(face_id)
+    if not kept_crops:
+        for path in (crops_path, ids_path):
+            if os.path.exists(path):
+                os.remove(path)
+        return 0
+    all_crops = np.concatenate(kept_crops)
+    _save_atomic(crops_path, all_crops)
+    _save_atomic(ids_path, np.concatenate(kept_ids))
+    return len(all_crops)
+
+
+def crops_by_image_id(face_id):
+    """Peta image id -> array crop (view dari file memory-mapped)."""
+    crops, image_ids = load_owner_crops(face_id)
+    if crops is None:
+        return {}
+    lookup = {}
+    order = np.argsort(image_ids, kind='stable')
+    sorted_ids = image_ids[order]
+    unique_ids, starts = np.unique(sorted_ids, return_index=True)
+    bounds = list(starts[1:]) + [len(sorted_ids)]
+    for image_id, start, end in zip(unique_ids.tolist(), starts.tolist(), bounds):
+        lookup[image_id] = crops[order[start:end]]
+    return lookup
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.users.models import User
+
+
+LABEL_INDEX_CACHE_KEY = 'facerecognition:label-index'
+
+
+def build_label_index():
+    """Peta face_id (int) -> "first_last" hanya untuk user OWNER."""
+    rows = (
+        User.objects.filter(role=User.Role.OWNER, face_id__isnull=False)
+        .values_list('face_id', 'first_name', 'last_name')
+    )
+    return {
+        int(face_id): f"{first_name}_{last_name}"
+        for face_id, first_name, last_name in rows
+        if str(face_id).isdigit()
+    }
+
+
+def get_label_to_user():
+    """
+    Index label wajah dari cache bersama (Redis di produksi), dibangun ulang
+    hanya setelah di-invalidate oleh signal User.
+    """
+    label_to_user = cache.get(LABEL_INDEX_CACHE_KEY)
+    if label_to_user is None:
+        label_to_user = build_label_index()
+        cache.set(
+            LABEL_INDEX_CACHE_KEY,
+            label_to_user,
+            timeout=getattr(settings, 'FACE_LABEL_INDEX_TTL', None),
+        )
+    return label_to_user
+
+
+def invalidate_label_index():
+    cache.delete(LABEL_INDEX_CACHE_KEY)
@@ -0,0 +1,105 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from apps.facerecognition.backends import BACKENDS
+from apps.facerecognition.benchmark import cv2, run_scale
+
+
+COLUMNS = (
+    'backend',
+    'owners',
+    'upload_s',
+    'initial_train_s',
+    'retrain_s',
+    'enroll_ms',
+    'model_size_bytes',
+    'recognize_p50_ms',
+    'recognize_p99_ms',
+    'accuracy',
+    'peak_rss_mb',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks face upload, training, full retrain, model size, recognition latency and peak RSS '
+        'on synthetic owners. Each scale runs in its own process against a throwaway test database '
+        'and media directory, so the real model and database are never touched.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--owners', type=int, nargs='+', default=[10, 100, 1000],
+                            help='Owner counts to benchmark, in order.')
+        parser.add_argument('--images-per-owner', type=int, default=5)
+        parser.add_argument('--queries', type=int, default=200, help='recognize_from_image calls per scale.')
+        parser.add_argument('--enroll-samples', type=int, default=3,
+                            help='New owners uploaded and trained after the full retrain.')
+        parser.add_argument('--backend', nargs='+', default=['lbph'], choices=sorted(BACKENDS),
+                            help='Recognizer backends to compare.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--json', dest='json_path', help='Also write the results to this JSON file.')
+        parser.add_argument('--scale-worker', action='store_true', help='Internal: run one scale and print JSON.')
+
+    def handle(self, *args, **options):
+        if cv2 is None or not hasattr(cv2, 'face'):
+            raise CommandError('opencv-contrib-python is required for this benchmark.')
+        if options['queries'] < 1 or options['images_per_owner'] < 1:
+            raise CommandError('--queries and --images-per-owner must be at least 1.')
+        if options['scale_worker']:
+            self.stdout.write(json.dumps(self._run_worker(options)))
+            return
+
+        self.stdout.write(' | '.join(COLUMNS))
+        rows = []
+        for backend_name in options['backend']:
+            for owner_count in options['owners']:
+                row = self._spawn_scale(backend_name, owner_count, options)
+                rows.append(row)
+                self.stdout.write(' | '.join(str(row[column]) for column in COLUMNS))
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as file:
+                json.dump(rows, file, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['json_path']}"))
+
+    def _spawn_scale(self, backend_name, owner_count, options):
+        # Proses terpisah per skala: ru_maxrss adalah puncak seumur proses
+        command = [
+            sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'), 'bench_facerecognition', '--scale-worker',
+            '--owners', str(owner_count),
+            '--backend', backend_name,
+            '--images-per-owner', str(options['images_per_owner']),
+            '--queries', str(options['queries']),
+            '--enroll-samples', str(options['enroll_samples']),
+            '--seed', str(options['seed']),
+        ]
+        completed = subprocess.run(command, capture_output=True, text=True)
+        if completed.returncode != 0:
+            raise CommandError(f'Benchmark for {owner_count} owners ({backend_name}) failed:\n{completed.stderr}')
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+    def _run_worker(self, options):
+        backend_name = options['backend'][0]
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with tempfile.TemporaryDirectory() as tmpdir, \
+                    override_settings(MEDIA_ROOT=tmpdir, FACE_RECOGNIZER_BACKEND=backend_name):
+                row = run_scale(
+                    options['owners'][0],
+                    os.path.join(tmpdir, 'lbph_model.xml'),
+                    images_per_owner=options['images_per_owner'],
+                    queries=options['queries'],
+                    enroll_samples=options['enroll_samples'],
+                    seed=options['seed'],
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+        return {'backend': backend_name, **row}
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facerecognition', '0002_trainingjobwajah'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Manifesttrainingwajah',
+            fields=[
+                ('image', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='manifest', serialize=False, to='facerecognition.datawajahnew')),
+                ('content_hash', models.CharField(db_index=True, max_length=64)),
+                ('face_boxes', models.JSONField(blank=True, default=list)),
+                ('generation', models.PositiveIntegerField(db_index=True, default=1)),
+                ('trained_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Manifest Training Wajah',
+                'verbose_name_plural': 'Manifest Training Wajah',
+            },
+        ),
+    ]
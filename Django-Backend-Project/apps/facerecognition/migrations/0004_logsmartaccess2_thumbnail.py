@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:50
+
+import apps.facerecognition.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facerecognition', '0003_manifesttrainingwajah'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='logsmartaccess2',
+            name='thumbnail',
+            field=models.ImageField(blank=True, default='', null=True, upload_to=apps.facerecognition.models.upload_thumbnail_access_user),
+        ),
+    ]
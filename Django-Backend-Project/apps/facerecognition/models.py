@@ -11,6 +11,8 @@ def upload_image_training2(instance,filename):
 def upload_image_access_user(instance,filename):
     print(instance)
     return os.path.join('tracking',filename)
+def upload_thumbnail_access_user(instance,filename):
+    return os.path.join('tracking','thumbs',filename)
 class Datawajahnew(models.Model):
     """Face data model - hanya untuk User dengan role OWNER"""
 
@@ -54,5 +56,59 @@ class Logsmartaccess2(models.Model):
     log_id=models.CharField(default=uuid.uuid4,primary_key=True,editable=False,max_length=255)
     id_face_user=models.ForeignKey(User,on_delete=models.CASCADE,to_field='face_id',related_name='log_access_user',null=True)
     image=models.ImageField(upload_to=upload_image_access_user,default='',blank=True,null=True)
+    thumbnail=models.ImageField(upload_to=upload_thumbnail_access_user,default='',blank=True,null=True)
     access_time=models.DateTimeField(auto_now_add=True)
     status=models.CharField(max_length=255)
+
+
+class Trainingjobwajah(models.Model):
+    """Job training model wajah yang diproses oleh worker Celery."""
+
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Pending'
+        RUNNING = 'RUNNING', 'Running'
+        SUCCESS = 'SUCCESS', 'Success'
+        FAILED = 'FAILED', 'Failed'
+
+    job_id = models.UUIDField(default=uuid.uuid4, primary_key=True, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='face_training_jobs')
+    images = models.ManyToManyField(Datawajahnew, related_name='training_jobs', blank=True)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    total_images = models.PositiveIntegerField(default=0)
+    processed_images = models.PositiveIntegerField(default=0)
+    faces_detected = models.PositiveIntegerField(default=0)
+    error_message = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Diperbarui saat klaim dan setiap gambar selesai; job RUNNING tanpa heartbeat dianggap worker mati
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'status'], name='facejob_user_status_idx'),
+        ]
+
+
+class Manifesttrainingwajah(models.Model):
+    """
+    Manifest training per gambar wajah: hash konten, kotak wajah hasil deteksi
+    dan generasi model tempat gambar ini terakhir dilatih.
+    """
+
+    image = models.OneToOneField(
+        Datawajahnew,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='manifest',
+    )
+    content_hash = models.CharField(max_length=64, db_index=True)
+    face_boxes = models.JSONField(default=list, blank=True)
+    generation = models.PositiveIntegerField(default=1, db_index=True)
+    trained_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Manifest Training Wajah'
+        verbose_name_plural = 'Manifest Training Wajah'
@@ -0,0 +1,150 @@
+import fcntl
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import cv2
+except ModuleNotFoundError:
+    cv2 = None
+
+
+logger = logging.getLogger(__name__)
+
+MODEL_DIR = os.path.join('apps', 'hasiltraining')
+MODEL_PATH = os.path.join(MODEL_DIR, 'lbph_model.xml')
+CASCADE_PATH = os.path.join(MODEL_DIR, 'haarcascade_frontalface_default.xml')
+
+
+def _file_signature(path):
+    """Identitas file model; berubah setiap kali model disimpan ulang."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+def save_model_atomic(recognizer, model_path):
+    """
+    Simpan model ke file sementara lalu ganti file lama secara atomik,
+    sehingga worker lain tidak pernah membaca XML yang setengah tertulis.
+    """
+    os.makedirs(os.path.dirname(model_path) or '.', exist_ok=True)
+    root, ext = os.path.splitext(model_path)
+    tmp_path = f"{root}.{os.getpid()}.tmp{ext}"
+    recognizer.save(tmp_path)
+    os.replace(tmp_path, model_path)
+
+
+@contextmanager
+def model_write_lock(model_save_path):
+    """
+    Kunci eksklusif antar proses untuk siklus read-update-save model,
+    agar dua worker Celery tidak saling menimpa hasil training.
+    """
+    os.makedirs(os.path.dirname(model_save_path) or '.', exist_ok=True)
+    with open(f"{model_save_path}.lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class FaceModelRegistry:
+    """
+    Menyimpan recognizer LBPH di memori per proses worker dan cascade Haar
+    per thread.
+
+    Model dibaca ulang hanya jika signature file (mtime, size, inode) berubah
+    setelah training, sehingga request verifikasi tidak mem-parsing XML lagi.
+    `CascadeClassifier.detectMultiScale` tidak aman dipanggil bersamaan pada
+    satu instance, jadi setiap thread (gthread, pool frame batch) memuat
+    cascade-nya sendiri.
+    """
+
+    def __init__(self, model_path=MODEL_PATH, cascade_path=CASCADE_PATH):
+        self.model_path = model_path
+        self.cascade_path = cascade_path
+        self._lock = threading.Lock()
+        self._recognizer = None
+        self._local = threading.local()
+        self._signature = None
+        self._version = 0
+        self._load_time_ms = None
+        self._loaded_at = None
+        self._load_count = 0
+
+    def get_cascade(self):
+        """Cascade milik thread pemanggil; dimuat ulang jika file cascade berubah."""
+        key = (self.cascade_path, _file_signature(self.cascade_path))
+        if getattr(self._local, 'cascade_key', None) != key:
+            self._local.cascade = cv2.CascadeClassifier(self.cascade_path)
+            self._local.cascade_key = key
+        return self._local.cascade
+
+    def get_recognizer(self):
+        """Kembalikan recognizer aktif, reload otomatis jika file model berubah."""
+        signature = _file_signature(self.model_path)
+        if signature is None:
+            return None
+        if self._recognizer is not None and signature == self._signature:
+            return self._recognizer
+        with self._lock:
+            if self._recognizer is None or signature != self._signature:
+                self._load(signature)
+        return self._recognizer
+
+    def _load(self, signature):
+        start = time.perf_counter()
+        recognizer = cv2.face.LBPHFaceRecognizer.create()
+        recognizer.read(self.model_path)
+        self._load_time_ms = (time.perf_counter() - start) * 1000
+        self._recognizer = recognizer
+        self._signature = signature
+        self._version += 1
+        self._load_count += 1
+        self._loaded_at = time.time()
+        logger.info(
+            "Face model loaded from %s (%d bytes) in %.1fms, version %d",
+            self.model_path,
+            signature[1],
+            self._load_time_ms,
+            self._version,
+        )
+
+    def invalidate(self):
+        """Paksa reload pada request berikutnya (dipakai setelah training di proses yang sama)."""
+        with self._lock:
+            self._signature = None
+
+    def metrics(self):
+        signature = _file_signature(self.model_path)
+        return {
+            'model_path': self.model_path,
+            'model_exists': signature is not None,
+            'model_size_bytes': signature[1] if signature else 0,
+            'loaded': self._recognizer is not None,
+            'version': self._version,
+            'load_count': self._load_count,
+            'last_load_time_ms': round(self._load_time_ms, 2) if self._load_time_ms is not None else None,
+            'loaded_at': self._loaded_at,
+            'stale': self._recognizer is not None and signature != self._signature,
+            'pid': os.getpid(),
+        }
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(model_path=MODEL_PATH):
+    """Registry tunggal per path model di dalam satu proses worker."""
+    registry = _registries.get(model_path)
+    if registry is None:
+        with _registries_lock:
+            registry = _registries.setdefault(model_path, FaceModelRegistry(model_path=model_path))
+    return registry
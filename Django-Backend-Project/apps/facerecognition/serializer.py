@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Datawajahnew,Logsmartaccess2
+from .models import Datawajahnew,Logsmartaccess2,Trainingjobwajah
 class Imagedatawajahserializernew(serializers.ModelSerializer):
     class Meta:
         model=Datawajahnew
@@ -9,3 +9,24 @@ class Logsmartaccesserializernew(serializers.ModelSerializer):
     class Meta:
         model=Logsmartaccess2
         fields='__all__'
+class Trainingjobwajahserializer(serializers.ModelSerializer):
+    progress=serializers.SerializerMethodField()
+    class Meta:
+        model=Trainingjobwajah
+        fields=[
+            'job_id',
+            'user',
+            'status',
+            'total_images',
+            'processed_images',
+            'faces_detected',
+            'progress',
+            'error_message',
+            'created_at',
+            'started_at',
+            'finished_at',
+        ]
+    def get_progress(self,obj):
+        if not obj.total_images:
+            return 0
+        return round(100 * obj.processed_images / obj.total_images)
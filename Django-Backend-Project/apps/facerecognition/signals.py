@@ -0,0 +1,33 @@
+import logging
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.users.models import User
+
+from .backends import get_backend
+from .label_index import invalidate_label_index
+
+
+logger = logging.getLogger(__name__)
+
+# Field yang tidak memengaruhi index label wajah (mis. update saat login)
+IGNORED_UPDATE_FIELDS = {'last_login', 'password'}
+
+
+@receiver(post_save, sender=User)
+def invalidate_label_index_on_save(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= IGNORED_UPDATE_FIELDS:
+        return
+    invalidate_label_index()
+
+
+@receiver(post_delete, sender=User)
+def invalidate_label_index_on_delete(sender, instance, **kwargs):
+    invalidate_label_index()
+    # Backend histogram bisa membuang vektor owner tanpa retrain penuh
+    if instance.face_id:
+        try:
+            get_backend().remove_owner(instance.face_id)
+        except (OSError, ValueError) as exc:
+            logger.warning("Failed to remove face vectors for %s: %s", instance.face_id, exc)
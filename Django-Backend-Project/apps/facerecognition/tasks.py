@@ -0,0 +1,131 @@
+import logging
+
+from datetime import timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Datawajahnew, Trainingjobwajah
+from .registry import MODEL_PATH
+from .training import train_user_images
+
+
+logger = logging.getLogger(__name__)
+
+
+def _claim_pending_jobs(job_id):
+    """
+    Ambil job ini beserta semua job PENDING lain milik owner yang sama,
+    sehingga semua gambar yang menunggu dilatih dalam satu pass.
+    """
+    with transaction.atomic():
+        job = Trainingjobwajah.objects.select_for_update().select_related('user').get(job_id=job_id)
+        if job.status != Trainingjobwajah.Status.PENDING:
+            return job, []
+        jobs = list(
+            Trainingjobwajah.objects.select_for_update()
+            .filter(user=job.user, status=Trainingjobwajah.Status.PENDING)
+        )
+        now = timezone.now()
+        Trainingjobwajah.objects.filter(job_id__in=[item.job_id for item in jobs]).update(
+            status=Trainingjobwajah.Status.RUNNING,
+            started_at=now,
+            heartbeat_at=now,
+            attempts=F('attempts') + 1,
+        )
+    return job, jobs
+
+
+@shared_task
+def train_user_faces_task(job_id):
+    try:
+        job, jobs = _claim_pending_jobs(job_id)
+    except Trainingjobwajah.DoesNotExist:
+        logger.warning("Face training job %s not found", job_id)
+        return 'job_not_found'
+    if not jobs:
+        # Sudah digabung ke job lain milik owner yang sama
+        return job.status
+
+    job_ids = [item.job_id for item in jobs]
+    image_rows = list(
+        Datawajahnew.objects.filter(training_jobs__in=job_ids)
+        .exclude(image_user='')
+        .select_related('user', 'manifest')
+        .distinct()
+    )
+    jobs_by_image = {}
+    for image_id, training_job_id in Trainingjobwajah.images.through.objects.filter(
+        trainingjobwajah_id__in=job_ids
+    ).values_list('datawajahnew_id', 'trainingjobwajah_id'):
+        jobs_by_image.setdefault(image_id, []).append(training_job_id)
+
+    def _progress(row, face_count):
+        Trainingjobwajah.objects.filter(job_id__in=jobs_by_image.get(row.pk, [])).update(
+            processed_images=F('processed_images') + 1,
+            faces_detected=F('faces_detected') + face_count,
+            heartbeat_at=timezone.now(),
+        )
+
+    user = job.user
+    try:
+        face_count = train_user_images(image_rows, MODEL_PATH, progress=_progress)
+    except Exception as exc:
+        logger.exception("Face training failed for jobs %s", job_ids)
+        Trainingjobwajah.objects.filter(job_id__in=job_ids).update(
+            status=Trainingjobwajah.Status.FAILED,
+            error_message=str(exc),
+            finished_at=timezone.now(),
+        )
+        return 'failed'
+
+    Trainingjobwajah.objects.filter(job_id__in=job_ids).update(
+        status=Trainingjobwajah.Status.SUCCESS,
+        finished_at=timezone.now(),
+    )
+    logger.info(
+        "Face training for user %s finished: %d images, %d faces, jobs %s",
+        user.id, len(image_rows), face_count, job_ids,
+    )
+    return 'success'
+
+
+@shared_task
+def recover_stale_training_jobs_task():
+    """
+    Job RUNNING yang heartbeat-nya lewat `FACE_TRAINING_JOB_TIMEOUT` detik
+    ditinggal worker yang mati (OOM, SIGKILL, deploy). Job dikembalikan ke
+    PENDING dan dijadwalkan ulang; training inkremental (manifest) membuat
+    pengulangan aman. Setelah `FACE_TRAINING_MAX_ATTEMPTS` percobaan job
+    ditandai FAILED.
+    """
+    cutoff = timezone.now() - timedelta(seconds=getattr(settings, 'FACE_TRAINING_JOB_TIMEOUT', 1800))
+    max_attempts = getattr(settings, 'FACE_TRAINING_MAX_ATTEMPTS', 3)
+    with transaction.atomic():
+        stale = Trainingjobwajah.objects.filter(status=Trainingjobwajah.Status.RUNNING, heartbeat_at__lt=cutoff)
+        failed = stale.filter(attempts__gte=max_attempts).update(
+            status=Trainingjobwajah.Status.FAILED,
+            error_message='Worker stopped responding during training.',
+            finished_at=timezone.now(),
+        )
+        retry = list(stale.values_list('job_id', 'user_id'))
+        # Filter status diulang: job yang baru selesai di antara dua query tidak ikut direset
+        stale.filter(job_id__in=[job_id for job_id, _ in retry]).update(
+            status=Trainingjobwajah.Status.PENDING,
+            processed_images=0,
+            faces_detected=0,
+            started_at=None,
+            heartbeat_at=None,
+        )
+        # Satu task per owner; klaim menggabungkan job PENDING lainnya
+        first_job_by_user = {}
+        for job_id, user_id in retry:
+            first_job_by_user.setdefault(user_id, str(job_id))
+        for job_id in first_job_by_user.values():
+            transaction.on_commit(lambda job_id=job_id: train_user_faces_task.delay(job_id))
+    if failed or retry:
+        logger.warning("Recovered stale face training jobs: %d requeued, %d failed", len(retry), failed)
+    return {'requeued': len(retry), 'failed': failed}
@@ -1,3 +1,460 @@
-from django.test import TestCase
+import os
+import tempfile
+import threading
+from datetime import timedelta
+from unittest.mock import Mock, patch
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from apps.users.models import User
+
+from . import crop_cache
+from .access_log import AccessLogWriter, queue_access_log
+from .backends import HistogramIndexBackend
+from .label_index import get_label_to_user, invalidate_label_index
+from .models import Datawajahnew, Logsmartaccess2, Manifesttrainingwajah, Trainingjobwajah
+from .registry import CASCADE_PATH, FaceModelRegistry, model_write_lock, save_model_atomic
+from .tasks import recover_stale_training_jobs_task, train_user_faces_task
+from .training import rebuild_face_model, train_user_images
+from .views import fuse_face_results, recognize_from_image
+
+try:
+    import numpy as np
+    import cv2
+except ModuleNotFoundError:
+    np = None
+    cv2 = None
+
+
+def _train_model(path, labels):
+    recognizer = cv2.face.LBPHFaceRecognizer.create()
+    rng = np.random.default_rng(0)
+    faces = [rng.integers(0, 255, (64, 64), dtype=np.uint8) for _ in labels]
+    recognizer.train(faces, np.array(labels))
+    save_model_atomic(recognizer, path)
+
+
+class FaceModelRegistryTests(SimpleTestCase):
+    def setUp(self):
+        if cv2 is None:
+            self.skipTest('opencv-contrib is not installed')
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.model_path = os.path.join(self.tmpdir.name, 'lbph_model.xml')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_missing_model_returns_none(self):
+        registry = FaceModelRegistry(model_path=self.model_path)
+        self.assertIsNone(registry.get_recognizer())
+        self.assertFalse(registry.metrics()['model_exists'])
+
+    def test_cascade_is_per_thread(self):
+        registry = FaceModelRegistry(model_path=self.model_path, cascade_path=CASCADE_PATH)
+        with patch('apps.facerecognition.registry.cv2') as fake_cv2:
+            fake_cv2.CascadeClassifier.side_effect = lambda path: object()
+            main = registry.get_cascade()
+            other = []
+            worker = threading.Thread(target=lambda: other.extend([registry.get_cascade(), registry.get_cascade()]))
+            worker.start()
+            worker.join()
+
+        self.assertIs(registry.get_cascade(), main)
+        self.assertIs(other[0], other[1])
+        self.assertIsNot(other[0], main)
+
+    def test_model_is_loaded_once_and_reloaded_after_training(self):
+        _train_model(self.model_path, [1, 2])
+        registry = FaceModelRegistry(model_path=self.model_path)
+
+        first = registry.get_recognizer()
+        self.assertIs(registry.get_recognizer(), first)
+        self.assertEqual(registry.metrics()['load_count'], 1)
+
+        _train_model(self.model_path, [1, 2, 3])
+        second = registry.get_recognizer()
+        self.assertIsNot(second, first)
+        metrics = registry.metrics()
+        self.assertEqual(metrics['load_count'], 2)
+        self.assertEqual(metrics['model_size_bytes'], os.path.getsize(self.model_path))
+        self.assertFalse(metrics['stale'])
+
+
+class FaceTrainingPipelineTests(TestCase):
+    def setUp(self):
+        if cv2 is None:
+            self.skipTest('opencv-contrib is not installed')
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.media = override_settings(MEDIA_ROOT=self.tmpdir.name)
+        self.media.enable()
+        self.owner = User.objects.create_user(
+            email='face-owner@example.com',
+            username='face_owner',
+            password='testpass123',
+            role=User.Role.OWNER,
+            first_name='Face',
+            last_name='Owner',
+        )
+
+    def tearDown(self):
+        self.media.disable()
+        self.tmpdir.cleanup()
+
+    def _jpeg(self, name):
+        image = np.full((120, 120, 3), 127, dtype=np.uint8)
+        _, buffer = cv2.imencode('.jpg', image)
+        return SimpleUploadedFile(name, buffer.tobytes(), content_type='image/jpeg')
+
+    def test_upload_returns_job_and_queues_single_training_task(self):
+        with patch('apps.facerecognition.views.train_user_faces_task.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    '/api/v1/facerecognition/createimagetrainingusernew/',
+                    {'username': 'face_owner', 'image_list': [self._jpeg('a.jpg'), self._jpeg('b.jpg')]},
+                )
+        self.assertEqual(response.status_code, 202)
+        job = Trainingjobwajah.objects.get(job_id=response.data['job_id'])
+        self.assertEqual(job.total_images, 2)
+        self.assertEqual(job.images.count(), 2)
+        delay.assert_called_once_with(str(job.job_id))
+
+    def test_upload_caches_crops_so_training_skips_decoding(self):
+        model_path = os.path.join(self.tmpdir.name, 'lbph_model.xml')
+        with patch('apps.facerecognition.training._detect_boxes', return_value=[[10, 10, 60, 60]]), \
+                patch('apps.facerecognition.views.MODEL_PATH', model_path), \
+                patch('apps.facerecognition.views.train_user_faces_task.delay'):
+            response = self.client.post(
+                '/api/v1/facerecognition/createimagetrainingusernew/',
+                {'username': 'face_owner', 'image_list': [self._jpeg('a.jpg')]},
+            )
+        self.assertEqual(response.status_code, 202)
+        manifest = Manifesttrainingwajah.objects.get(image__user=self.owner)
+        self.assertEqual(manifest.generation, 0)
+        self.assertEqual(len(crop_cache.crops_by_image_id(self.owner.face_id)), 1)
+
+        queryset = Datawajahnew.objects.filter(user=self.owner).select_related('user', 'manifest')
+        with patch('apps.facerecognition.training._load_gray') as load_gray:
+            self.assertEqual(train_user_images(list(queryset), model_path), 1)
+            load_gray.assert_not_called()
+        manifest.refresh_from_db()
+        self.assertEqual(manifest.generation, 1)
+
+    def test_task_merges_pending_jobs_and_reports_progress(self):
+        jobs = []
+        for name in ('a.jpg', 'b.jpg'):
+            row = Datawajahnew.objects.create(user=self.owner, image_user=self._jpeg(name))
+            job = Trainingjobwajah.objects.create(user=self.owner, total_images=1)
+            job.images.add(row)
+            jobs.append(job)
+
+        model_path = os.path.join(self.tmpdir.name, 'lbph_model.xml')
+        with patch('apps.facerecognition.tasks.MODEL_PATH', model_path):
+            self.assertEqual(train_user_faces_task(str(jobs[0].job_id)), 'success')
+            self.assertEqual(train_user_faces_task(str(jobs[1].job_id)), Trainingjobwajah.Status.SUCCESS)
+
+        for job in jobs:
+            job.refresh_from_db()
+            self.assertEqual(job.status, Trainingjobwajah.Status.SUCCESS)
+            self.assertEqual(job.processed_images, 1)
+
+        response = self.client.get(f'/api/v1/facerecognition/trainingjobs/{jobs[0].job_id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['data']['progress'], 100)
+
+    @override_settings(FACE_TRAINING_JOB_TIMEOUT=60, FACE_TRAINING_MAX_ATTEMPTS=2)
+    def test_jobs_of_dead_worker_are_requeued_then_failed(self):
+        stale_at = timezone.now() - timedelta(minutes=5)
+        running = dict(status=Trainingjobwajah.Status.RUNNING, heartbeat_at=stale_at, processed_images=1)
+        retry = Trainingjobwajah.objects.create(user=self.owner, attempts=1, **running)
+        exhausted = Trainingjobwajah.objects.create(user=self.owner, attempts=2, **running)
+        alive = Trainingjobwajah.objects.create(
+            user=self.owner, attempts=1, status=Trainingjobwajah.Status.RUNNING, heartbeat_at=timezone.now(),
+        )
+
+        with patch.object(train_user_faces_task, 'delay') as delay, self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(recover_stale_training_jobs_task(), {'requeued': 1, 'failed': 1})
+
+        delay.assert_called_once_with(str(retry.job_id))
+        statuses = {job.job_id: (job.status, job.processed_images) for job in Trainingjobwajah.objects.all()}
+        self.assertEqual(statuses[retry.job_id], (Trainingjobwajah.Status.PENDING, 0))
+        self.assertEqual(statuses[exhausted.job_id][0], Trainingjobwajah.Status.FAILED)
+        self.assertEqual(statuses[alive.job_id][0], Trainingjobwajah.Status.RUNNING)
+
+    def test_manifest_skips_trained_images_and_reuses_boxes_on_rebuild(self):
+        rows = [
+            Datawajahnew.objects.create(user=self.owner, image_user=self._jpeg(name))
+            for name in ('a.jpg', 'b.jpg')
+        ]
+        model_path = os.path.join(self.tmpdir.name, 'lbph_model.xml')
+        queryset = Datawajahnew.objects.filter(user=self.owner).select_related('user', 'manifest')
+
+        with patch('apps.facerecognition.training._detect_boxes', return_value=[[10, 10, 60, 60]]) as detect:
+            self.assertEqual(train_user_images(list(queryset), model_path), 2)
+            self.assertEqual(train_user_images(list(queryset), model_path), 0)
+            self.assertEqual(detect.call_count, 2)
+
+            self.assertEqual(rebuild_face_model(model_path), 2)
+            self.assertEqual(detect.call_count, 2)
+
+        manifests = Manifesttrainingwajah.objects.filter(image__in=rows)
+        self.assertEqual(manifests.count(), 2)
+        self.assertEqual(set(manifests.values_list('generation', flat=True)), {2})
+        self.assertEqual(manifests.first().face_boxes, [[10, 10, 60, 60]])
+
+    def test_rebuild_uses_crop_cache_without_decoding(self):
+        Datawajahnew.objects.create(user=self.owner, image_user=self._jpeg('a.jpg'))
+        model_path = os.path.join(self.tmpdir.name, 'lbph_model.xml')
+        queryset = Datawajahnew.objects.filter(user=self.owner).select_related('user', 'manifest')
+
+        with patch('apps.facerecognition.training._detect_boxes', return_value=[[0, 0, 80, 80], [20, 20, 40, 40]]):
+            train_user_images(list(queryset), model_path)
+
+        crops, image_ids = crop_cache.load_owner_crops(self.owner.face_id)
+        self.assertEqual(crops.shape, (2, crop_cache.CROP_SIZE, crop_cache.CROP_SIZE))
+        self.assertEqual(crops.dtype, np.uint8)
+        self.assertEqual(len(image_ids), 2)
+
+        with patch('apps.facerecognition.training._load_gray') as load_gray:
+            self.assertEqual(rebuild_face_model(model_path), 2)
+            load_gray.assert_not_called()
+
+
+def _face(label, distance):
+    authorized = label is not None
+    return {
+        'id_face_user': label,
+        'username': f'user_{label}' if authorized else 'Unknown',
+        'status': 'Authorized' if authorized else 'Unauthorized',
+        'confidence': f'  {round(100 - distance)}%',
+        'distance': distance,
+        'box': (0, 0, 60, 60),
+    }
+
+
+class FaceFusionTests(SimpleTestCase):
+    def test_majority_vote_ignores_single_blurry_frame(self):
+        frames = [[_face(101, 40)], [_face(None, 70)], [_face(101, 35)], []]
+        decision = fuse_face_results(frames)
+        self.assertEqual(decision['result']['id_face_user'], 101)
+        self.assertEqual(decision['result']['distance'], 35)
+        self.assertEqual(decision['votes'], {'101': 2})
+        self.assertEqual(decision['frames_with_faces'], 3)
+
+    def test_majority_without_quorum_is_unauthorized(self):
+        frames = [[_face(101, 30)], [_face(None, 60)], [_face(None, 55)]]
+        decision = fuse_face_results(frames)
+        self.assertIsNone(decision['result']['id_face_user'])
+        self.assertEqual(decision['result']['status'], 'Unauthorized')
+
+    def test_best_strategy_uses_lowest_distance(self):
+        frames = [[_face(101, 30)], [_face(None, 60)], [_face(None, 55)]]
+        decision = fuse_face_results(frames, strategy='best')
+        self.assertEqual(decision['result']['id_face_user'], 101)
+
+    def test_no_faces_returns_none(self):
+        self.assertIsNone(fuse_face_results([[], []]))
+
+
+class FaceLabelIndexTests(TestCase):
+    def setUp(self):
+        invalidate_label_index()
+        self.owner = User.objects.create_user(
+            email='index-owner@example.com',
+            username='index_owner',
+            password='testpass123',
+            role=User.Role.OWNER,
+            first_name='Index',
+            last_name='Owner',
+        )
+        User.objects.create_user(
+            email='index-buyer@example.com',
+            username='index_buyer',
+            password='testpass123',
+        )
+
+    def test_index_contains_owners_only_and_is_served_from_cache(self):
+        self.assertEqual(get_label_to_user(), {int(self.owner.face_id): 'Index_Owner'})
+        with self.assertNumQueries(0):
+            get_label_to_user()
+
+    def test_user_save_invalidates_index(self):
+        get_label_to_user()
+        self.owner.first_name = 'Renamed'
+        self.owner.save()
+        self.assertEqual(get_label_to_user()[int(self.owner.face_id)], 'Renamed_Owner')
+
+        self.owner.save(update_fields=['last_login'])
+        with self.assertNumQueries(0):
+            get_label_to_user()
+
+
+class FaceAccessLogTests(TestCase):
+    def setUp(self):
+        if cv2 is None:
+            self.skipTest('opencv-contrib is not installed')
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.media = override_settings(MEDIA_ROOT=self.tmpdir.name)
+        self.media.enable()
+        self.owner = User.objects.create_user(
+            email='log-owner@example.com',
+            username='log_owner',
+            password='testpass123',
+            role=User.Role.OWNER,
+            first_name='Log',
+            last_name='Owner',
+        )
+
+    def tearDown(self):
+        self.media.disable()
+        self.tmpdir.cleanup()
+
+    def _frame(self):
+        return np.full((480, 640, 3), 90, dtype=np.uint8)
+
+    def _result(self, authorized=True):
+        return {
+            'box': (100, 100, 120, 120),
+            'id_face_user': self.owner.face_id if authorized else None,
+            'username': 'Log_Owner' if authorized else 'Unknown',
+            'status': 'Authorized' if authorized else 'Unauthorized',
+        }
+
+    @override_settings(FACE_ACCESS_LOG_ASYNC=False, FACE_THUMBNAIL_SIZE=160)
+    def test_log_is_saved_with_thumbnail(self):
+        data = queue_access_log(self._result(), self._frame())
+
+        log = Logsmartaccess2.objects.get(log_id=data['log_id'])
+        self.assertEqual(log.id_face_user_id, self.owner.face_id)
+        self.assertTrue(log.image.name.startswith('tracking/Log_Owner_Authorized_'))
+        thumbnail = cv2.imread(log.thumbnail.path)
+        self.assertEqual(thumbnail.shape[:2], (120, 160))
+
+    def test_full_queue_writes_synchronously(self):
+        writer = AccessLogWriter(maxsize=1, put_timeout=0, start=False)
+        jobs = [
+            {
+                'log_id': f'00000000-0000-0000-0000-00000000000{index}',
+                'id_face_user': None,
+                'status': 'Unauthorized',
+                'frame': self._frame(),
+                'faces': [],
+                'file_prefix': 'Unknown',
+                'timestamp': str(index),
+            }
+            for index in range(2)
+        ]
+
+        self.assertTrue(writer.submit(jobs[0]))
+        self.assertFalse(writer.submit(jobs[1]))
+        self.assertEqual(writer.queue.qsize(), 1)
+        self.assertEqual(
+            list(Logsmartaccess2.objects.values_list('log_id', flat=True)),
+            [jobs[1]['log_id']],
+        )
+
+    @override_settings(FACE_ACCESS_LOG_ASYNC=False)
+    def test_jpeg_bytes_are_annotated_when_persisted(self):
+        _, buffer = cv2.imencode('.jpg', self._frame())
+        result = self._result()
+        data = queue_access_log(result, buffer.tobytes(), faces=[result])
+
+        image = cv2.imread(Logsmartaccess2.objects.get(log_id=data['log_id']).image.path)
+        # Garis kotak biru digambar di tepi kiri atas wajah
+        self.assertGreater(int(image[100, 150, 0]), 200)
+
+
+class FaceRecognitionResultTests(SimpleTestCase):
+    def setUp(self):
+        if cv2 is None:
+            self.skipTest('opencv-contrib is not installed')
+
+    def test_results_are_compact_and_frame_is_untouched(self):
+        backend = Mock(threshold=50)
+        backend.exists.return_value = True
+        backend.predict_many.return_value = [(7, 20.0), (8, 80.0)]
+        registry = Mock()
+        registry.get_cascade.return_value.detectMultiScale.return_value = np.array(
+            [[10, 10, 60, 60], [200, 50, 60, 60]]
+        )
+        image = np.full((240, 320, 3), 90, dtype=np.uint8)
+        original = image.copy()
+
+        with patch('apps.facerecognition.views.get_registry', return_value=registry), \
+                patch('apps.facerecognition.views.get_backend', return_value=backend):
+            results = recognize_from_image(image, 'model.xml', {7: 'Seven_Owner'})
+
+        # Semua wajah dalam frame diprediksi dalam satu panggilan backend
+        backend.predict_many.assert_called_once()
+        self.assertEqual(len(backend.predict_many.call_args.args[0]), 2)
+        self.assertTrue(np.array_equal(image, original))
+        self.assertEqual({item['box'] for item in results}, {(10, 10, 60, 60), (200, 50, 60, 60)})
+        self.assertEqual(
+            [(item['id_face_user'], item['username']) for item in results],
+            [(7, 'Seven_Owner'), (None, 'Unknown')],
+        )
+        for item in results:
+            self.assertFalse(any(isinstance(value, np.ndarray) for value in item.values()))
+
+
+class HistogramIndexBackendTests(SimpleTestCase):
+    def setUp(self):
+        if cv2 is None:
+            self.skipTest('opencv-contrib is not installed')
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.index_dir = os.path.join(self.tmpdir.name, 'embeddings')
+        self.rng = np.random.default_rng(0)
+        self.textures = {
+            label: cv2.GaussianBlur(self.rng.integers(0, 255, (100, 100)).astype(np.uint8), (5, 5), 0)
+            for label in (11, 22, 33)
+        }
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _faces(self, label, count=3):
+        noise = self.rng.normal(0, 3, (count, 100, 100))
+        return list(np.clip(self.textures[label] + noise, 0, 255).astype(np.uint8))
+
+    def test_predicts_nearest_owner_for_all_faces_at_once(self):
+        backend = HistogramIndexBackend(self.index_dir)
+        faces = self._faces(11) + self._faces(22)
+        backend.rebuild(faces, [11] * 3 + [22] * 3)
+
+        predictions = backend.predict_many([self._faces(22, 1)[0], self._faces(11, 1)[0]])
+
+        self.assertEqual([label for label, _ in predictions], [22, 11])
+        self.assertTrue(all(distance < backend.threshold for _, distance in predictions))
+
+    def test_add_and_remove_only_touch_one_owner_file(self):
+        backend = HistogramIndexBackend(self.index_dir)
+        backend.rebuild(self._faces(11), [11] * 3)
+        owner_11 = os.path.join(self.index_dir, '11.npy')
+        signature = os.stat(owner_11).st_mtime_ns
+
+        # Worker lain memuat ulang index setelah enroll owner baru
+        reader = HistogramIndexBackend(self.index_dir)
+        self.assertEqual(reader.predict_many(self._faces(11, 1))[0][0], 11)
+        backend.add(self._faces(33), [33] * 3)
+        self.assertEqual(os.stat(owner_11).st_mtime_ns, signature)
+        self.assertEqual(reader.predict_many(self._faces(33, 1))[0][0], 33)
+        self.assertEqual(reader.metrics()['owners'], 2)
+
+        self.assertTrue(backend.remove_owner(33))
+        self.assertFalse(os.path.exists(os.path.join(self.index_dir, '33.npy')))
+        self.assertEqual(reader.predict_many(self._faces(33, 1))[0][0], 11)
+
+    def test_remove_owner_waits_for_training_lock(self):
+        backend = HistogramIndexBackend(self.index_dir)
+        backend.rebuild(self._faces(11), [11] * 3)
+        remover = threading.Thread(target=backend.remove_owner, args=(11,))
+
+        with model_write_lock(backend.lock_path):
+            remover.start()
+            remover.join(timeout=0.2)
+            self.assertTrue(remover.is_alive())
+            self.assertTrue(os.path.exists(os.path.join(self.index_dir, '11.npy')))
+        remover.join(timeout=5)
+
+        self.assertFalse(os.path.exists(os.path.join(self.index_dir, '11.npy')))
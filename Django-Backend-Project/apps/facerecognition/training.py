@@ -0,0 +1,233 @@
+import hashlib
+import os
+
+from django.db.models import Max
+from PIL import Image
+
+from . import crop_cache
+from .models import Datawajahnew, Manifesttrainingwajah
+from .backends import get_backend
+from .registry import get_registry, model_write_lock
+
+try:
+    import numpy as np
+    import cv2
+except ModuleNotFoundError:
+    np = None
+    cv2 = None
+
+
+TRAINING_DIR = os.path.join('media', 'imagetraining')
+IMAGE_EXTENSIONS = ("jpg", "jpeg", "png")
+# Generasi manifest untuk gambar yang sudah dideteksi saat upload tapi belum dilatih
+UPLOAD_GENERATION = 0
+
+
+def file_content_hash(path, chunk_size=65536):
+    """SHA-256 isi file gambar, dipakai untuk mendeteksi gambar yang berubah."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def current_generation():
+    """Generasi model aktif; naik satu setiap kali model dibangun ulang penuh."""
+    return Manifesttrainingwajah.objects.aggregate(value=Max('generation'))['value'] or 1
+
+
+def _load_gray(image_path):
+    return np.array(Image.open(image_path).convert("L"), "uint8")
+
+
+def _detect_boxes(face_cascade, gray):
+    return [
+        [int(x), int(y), int(w), int(h)]
+        for (x, y, w, h) in face_cascade.detectMultiScale(gray, 1.2, 5)
+    ]
+
+
+def collect_training_faces(rows, face_cascade, generation, force=False, progress=None, cached_crops=None):
+    """
+    Siapkan crop wajah ternormalisasi untuk baris Datawajahnew.
+
+    Gambar yang hash-nya sama dan sudah dilatih pada `generation` dilewati
+    (kecuali `force`). Untuk gambar yang tidak berubah, crop diambil dari
+    `cached_crops` (image id -> array) tanpa decode JPEG, atau kotak wajah
+    dari manifest dipakai ulang tanpa menjalankan Haar lagi.
+    `progress(row, face_count)` dipanggil per gambar.
+    Mengembalikan (faces, labels, manifest_updates, new_crops) dengan
+    `new_crops` berbentuk {face_id: {image_id: [crop, ...]}} untuk gambar
+    yang baru di-decode.
+    """
+    faces = []
+    labels = []
+    manifest_updates = []
+    new_crops = {}
+    cached_crops = cached_crops or {}
+    for row in rows:
+        face_count = 0
+        try:
+            image_path = row.image_user.path
+            content_hash = file_content_hash(image_path)
+            manifest = getattr(row, 'manifest', None)
+            unchanged = manifest is not None and manifest.content_hash == content_hash
+            if unchanged and not force and manifest.generation == generation:
+                if progress:
+                    progress(row, 0)
+                continue
+
+            label = int(row.user.face_id)
+            if unchanged and (row.pk in cached_crops or not manifest.face_boxes):
+                crops = list(cached_crops.get(row.pk, []))
+                boxes = manifest.face_boxes
+            else:
+                gray = _load_gray(image_path)
+                boxes = manifest.face_boxes if unchanged else _detect_boxes(face_cascade, gray)
+                crops = [crop_cache.normalize_crop(gray[y:y+h, x:x+w]) for (x, y, w, h) in boxes]
+                new_crops.setdefault(row.user.face_id, {})[row.pk] = crops
+            faces.extend(crops)
+            labels.extend([label] * len(crops))
+            face_count = len(crops)
+            manifest_updates.append((row, content_hash, boxes))
+        except (OSError, ValueError, TypeError) as e:
+            print(f"Gagal memproses gambar {row.pk}: {e}")
+        if progress:
+            progress(row, face_count)
+    return faces, labels, manifest_updates, new_crops
+
+
+def cache_upload_crops(rows, model_save_path):
+    """
+    Deteksi wajah saat gambar diunggah: crop ternormalisasi ditulis ke cache
+    dan manifest dicatat dengan generasi `UPLOAD_GENERATION`, sehingga
+    training berikutnya memakai crop tersebut tanpa decode + Haar lagi.
+    Mengembalikan jumlah wajah yang di-cache.
+    """
+    face_cascade = get_registry(model_save_path).get_cascade()
+    new_crops = {}
+    manifest_updates = []
+    for row in rows:
+        try:
+            image_path = row.image_user.path
+            content_hash = file_content_hash(image_path)
+            gray = _load_gray(image_path)
+            boxes = _detect_boxes(face_cascade, gray)
+        except (OSError, ValueError, TypeError) as e:
+            print(f"Gagal memproses gambar {row.pk}: {e}")
+            continue
+        crops = [crop_cache.normalize_crop(gray[y:y+h, x:x+w]) for (x, y, w, h) in boxes]
+        new_crops.setdefault(row.user.face_id, {})[row.pk] = crops
+        manifest_updates.append((row, content_hash, boxes))
+    _save_crops(new_crops)
+    _save_manifests(manifest_updates, UPLOAD_GENERATION)
+    return sum(len(crops) for by_image in new_crops.values() for crops in by_image.values())
+
+
+def _cached_crops_for(face_ids):
+    cached_crops = {}
+    for face_id in face_ids:
+        cached_crops.update(crop_cache.crops_by_image_id(face_id))
+    return cached_crops
+
+
+def _save_manifests(manifest_updates, generation):
+    for row, content_hash, boxes in manifest_updates:
+        Manifesttrainingwajah.objects.update_or_create(
+            image=row,
+            defaults={
+                'content_hash': content_hash,
+                'face_boxes': boxes,
+                'generation': generation,
+            },
+        )
+
+
+def _save_crops(new_crops):
+    for face_id, crops_by_image in new_crops.items():
+        crop_cache.write_owner_crops(face_id, crops_by_image)
+
+
+def _training_rows(queryset):
+    return queryset.exclude(image_user='').exclude(image_user__isnull=True).select_related('user', 'manifest')
+
+
+def train_user_images(rows, model_save_path, progress=None):
+    """
+    Latih gambar baru/berubah dalam satu pass: deteksi semua gambar, lalu
+    satu kali update backend (LBPH: satu kali simpan XML; histogram: hanya
+    file owner terkait). Crop yang sudah di-cache saat upload dipakai
+    langsung; crop hasil decode baru disimpan ke cache agar retrain penuh
+    tidak perlu decode ulang.
+    Mengembalikan jumlah wajah yang ditambahkan ke model.
+    """
+    face_cascade = get_registry(model_save_path).get_cascade()
+    backend = get_backend(model_save_path)
+    rows = list(rows)
+    with model_write_lock(backend.lock_path):
+        generation = current_generation()
+        cached_crops = _cached_crops_for({row.user.face_id for row in rows})
+        faces, labels, manifest_updates, new_crops = collect_training_faces(
+            rows, face_cascade, generation, progress=progress, cached_crops=cached_crops
+        )
+        if faces:
+            backend.add(faces, labels)
+            print(f"Model diperbarui dengan {len(faces)} wajah baru.")
+        else:
+            print("Tidak ada wajah baru untuk dilatih.")
+        _save_crops(new_crops)
+        _save_manifests(manifest_updates, generation)
+    return len(faces)
+
+
+def rebuild_face_model(model_save_path, progress=None):
+    """
+    Bangun ulang model dari seluruh gambar owner sebagai generasi baru.
+
+    Crop dari cache `.npy` per owner dipakai langsung; hanya gambar yang
+    belum ada di cache atau berubah yang di-decode. Model dilatih dengan
+    satu panggilan `rebuild(faces, labels)` pada backend aktif.
+    """
+    face_cascade = get_registry(model_save_path).get_cascade()
+    backend = get_backend(model_save_path)
+    rows = list(_training_rows(Datawajahnew.objects.all()))
+    image_ids_by_owner = {}
+    for row in rows:
+        image_ids_by_owner.setdefault(row.user.face_id, set()).add(row.pk)
+    cached_crops = _cached_crops_for(image_ids_by_owner)
+
+    with model_write_lock(backend.lock_path):
+        generation = current_generation() + 1
+        faces, labels, manifest_updates, new_crops = collect_training_faces(
+            rows, face_cascade, generation, force=True, progress=progress, cached_crops=cached_crops
+        )
+        # Tulis ulang cache per owner sekaligus membuang crop gambar yang sudah dihapus
+        for face_id, image_ids in image_ids_by_owner.items():
+            crop_cache.write_owner_crops(face_id, new_crops.get(face_id, {}), keep_image_ids=image_ids)
+        if not faces:
+            print("Tidak ada data wajah yang valid untuk dilatih.")
+            return 0
+        backend.rebuild(faces, labels)
+        _save_manifests(manifest_updates, generation)
+    print(f"Model generasi {generation} dibangun ulang dengan {len(faces)} wajah.")
+    return len(faces)
+
+
+def train_or_update_user_data(training_dir, model_save_path, target_user, target_label):
+    """Latih gambar owner `target_label` yang belum tercatat di manifest."""
+    rows = _training_rows(Datawajahnew.objects.filter(user__face_id=str(target_label)))
+    return train_user_images(rows, model_save_path)
+
+
+def train_replace_user_data(training_dir, model_save_path, target_user, target_label):
+    """
+    Ganti data wajah owner dengan gambar terbaru. Backend histogram cukup
+    menulis ulang vektor owner itu; LBPH tidak bisa menghapus histogram lama
+    per label, sehingga model dibangun ulang penuh.
+    """
+    backend = get_backend(model_save_path)
+    if backend.remove_owner(target_label):
+        Manifesttrainingwajah.objects.filter(image__user__face_id=str(target_label)).delete()
+        return train_or_update_user_data(training_dir, model_save_path, target_user, target_label)
+    return rebuild_face_model(model_save_path)
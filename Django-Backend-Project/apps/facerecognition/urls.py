@@ -4,5 +4,8 @@ urlpatterns = [
     path('createimagetrainingusernew/',views.Createimagetrainingusernew.as_view(),name="createimagetrainingusernew"),
     path('getuserimageexists/',views.Getimageexistsuser.as_view(),name="getuserimageexists"),
     path('createlogusersmartnew/',views.Createlogusersmartnew.as_view(),name="createlogusersmartnew"),
-    path('getuserlogsmartnew/',views.Getuserlogsmartnews.as_view(),name="createlogusersmartnew")
+    path('createlogusersmartbatch/',views.Createlogusersmartbatch.as_view(),name="createlogusersmartbatch"),
+    path('getuserlogsmartnew/',views.Getuserlogsmartnews.as_view(),name="createlogusersmartnew"),
+    path('trainingjobs/<uuid:job_id>/',views.Gettrainingjobstatus.as_view(),name="trainingjobstatus"),
+    path('facemodelmetrics/',views.Facemodelmetrics.as_view(),name="facemodelmetrics"),
 ]
\ No newline at end of file
@@ -1,9 +1,10 @@
 import os
-from datetime import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 from django.shortcuts import render
 from PIL import Image
-from django.core.files.base import ContentFile
+from django.db import transaction as db_transaction
 from rest_framework import status,permissions
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework.response import Response
@@ -12,6 +13,13 @@ from django.conf import settings
 from apps.users.models import User
 
 from . import models, serializer
+from .access_log import queue_access_log
+from .backends import get_backend
+from .label_index import get_label_to_user
+from .registry import MODEL_PATH, get_registry
+from .tasks import train_user_faces_task
+from .training import cache_upload_crops
+from .training import train_or_update_user_data, train_replace_user_data  # noqa: F401 - kompatibilitas
 
 try:
     import numpy as np
@@ -34,27 +42,6 @@ def _dependency_missing_response():
         status=status.HTTP_503_SERVICE_UNAVAILABLE,
     )
 # Create your views here.
-def get_trained_images(log_file, user_folder):
-    """Membaca daftar gambar yang sudah dilatih dari file log."""
-    trained_images = set()
-    if os.path.exists(log_file):
-        with open(log_file, "r") as file:
-            trained_images = set(file.read().splitlines())
-    return trained_images
-
-def update_trained_images(log_file, new_images):
-    """Menambahkan gambar baru yang telah dilatih ke file log."""
-    with open(log_file, "a") as file:
-        for image in new_images:
-            file.write(f"{image}\n")
-def update_trained_images2(log_file, new_images):
-    """
-    Menulis ulang log file dengan gambar baru yang telah dilatih.
-    """
-    with open(log_file, "w") as file:  # Gunakan mode "w" untuk menimpa log lama
-        for image in new_images:
-            file.write(f"{image}\n")
-
 def non_max_suppression_fast(boxes, overlapThresh=0.3):
     if len(boxes) == 0:
         return []
@@ -89,163 +76,35 @@ def non_max_suppression_fast(boxes, overlapThresh=0.3):
         idxs = np.delete(idxs, np.concatenate(([len(idxs)-1], np.where(overlap > overlapThresh)[0])))
 
     return boxes[pick].astype("int")
-def train_or_update_user_data(training_dir, model_save_path, target_user, target_label):
-    print(target_user)
-    print(target_label)
-    base_dir=settings.BASE_DIR
-
-    face_recognizer = cv2.face.LBPHFaceRecognizer.create()
-    haar_name='haarcascade_frontalface_default.xml'
-    haar_loc=os.path.join('apps','hasiltraining',haar_name)
-    face_cascade = cv2.CascadeClassifier(haar_loc)
-
-    log_file = f"{target_user}_trained_images.log"
-    trained_images = get_trained_images(log_file, target_user)
-    faces = []
-    labels = []
-
-    user_path = os.path.join(training_dir, target_user)
-    new_images = []
-
-    # Pastikan folder user ada
-    if os.path.isdir(user_path):
-        for file in os.listdir(user_path):
-            if file.endswith(("jpg", "jpeg", "png")):
-                image_path = os.path.join(user_path, file)
-                if image_path in trained_images:
-                    continue  # Skip image yang sudah dilatih sebelumnya
-
-                image = Image.open(image_path).convert("L")
-                image_np = np.array(image, "uint8")
-                detected_faces = face_cascade.detectMultiScale(image_np, 1.2, 5)
-                for (x, y, w, h) in detected_faces:
-                    faces.append(image_np[y:y+h, x:x+w])
-                    labels.append(target_label)
-                    print(labels)
-                    print(f"Detected faces in {file}: {detected_faces}")
-                    new_images.append(image_path)
-
-        print(f"Data wajah ditemukan untuk user {target_user}: {len(faces)} gambar baru.")
-    else:
-        print(f"Folder user {target_user} tidak ditemukan.")
-
-    if faces:
-        # Update model dengan data baru
-        model_exists = os.path.exists(model_save_path)
-        
-        if model_exists:
-            # Jika model sudah ada, load dan update
-            print(f"Loading existing model from {model_save_path}")
-            face_recognizer.read(model_save_path)
-            face_recognizer.update(faces, np.array(labels))
-        else:
-            # ✅ Jika model belum ada, train dari awal
-            print(f"Creating new model at {model_save_path}")
-            # Pastikan direktori exists
-            os.makedirs(os.path.dirname(model_save_path), exist_ok=True)
-            face_recognizer.train(faces, np.array(labels))
-        
-        # Save model
-        face_recognizer.save(model_save_path)
-        print(f"Model saved successfully at {model_save_path}")
-        
-        # Update daftar gambar yang telah dilatih
-        update_trained_images(log_file, new_images)
-    else:
-        print(f"Tidak ada wajah baru untuk user {target_user}.")
-
-def train_replace_user_data(training_dir, model_save_path, target_user, target_label):
-    """
-    Mengganti semua data wajah user yang ada di log dan menggantinya dengan gambar baru dari folder user.
-    """
-    face_recognizer = cv2.face.LBPHFaceRecognizer.create()
-    haar_name='haarcascade_frontalface_default.xml'
-    haar_loc=os.path.join('apps','hasiltraining',haar_name)
-    face_cascade = cv2.CascadeClassifier(haar_loc)
-
-    log_file = f"{target_user}_trained_images.log"
-    faces = []
-    labels = []
-
-    user_path = os.path.join(training_dir, target_user)
-    new_images = []
-
-    # Pastikan folder user ada
-    if os.path.isdir(user_path):
-        # Hapus semua entri lama di log
-        if os.path.exists(log_file):
-            os.remove(log_file)
-            print(f"Log file lama untuk {target_user} dihapus.")
-
-        # Proses semua gambar di folder user
-        for file in os.listdir(user_path):
-            if file.endswith(("jpg", "jpeg", "png")):
-                image_path = os.path.join(user_path, file)
-                image = Image.open(image_path).convert("L")
-                image_np = np.array(image, "uint8")
-                detected_faces = face_cascade.detectMultiScale(image_np, 1.2, 5)
-                for (x, y, w, h) in detected_faces:
-                    faces.append(image_np[y:y+h, x:x+w])
-                    labels.append(target_label)
-                    new_images.append(image_path)
-
-        print(f"Data wajah ditemukan untuk user {target_user}: {len(faces)} gambar.")
-    else:
-        print(f"Folder user {target_user} tidak ditemukan.")
-        return  # Tidak ada folder, tidak ada pelatihan
-
-    if faces:
-        # Latih ulang model dari awal atau update model
-        if os.path.exists(model_save_path):
-            face_recognizer.read(model_save_path)
-        else:
-            print("Model baru akan dibuat.")
-
-        face_recognizer.train(faces, np.array(labels))
-        face_recognizer.save(model_save_path)
-        print(f"Model untuk user {target_user} disimpan di {model_save_path}.")
-
-        # Update log file dengan gambar baru
-        update_trained_images2(log_file, new_images)
-    else:
-        print(f"Tidak ada data wajah yang valid untuk user {target_user}.")
-
-def clear_log_for_user(log_file):
-    """Hapus semua referensi log untuk user tertentu."""
-    if os.path.exists(log_file):
-        os.remove(log_file)
-
 def recognize_from_image(image, model_path, label_to_user):
     """
     Melakukan proses pengenalan wajah pada gambar yang diberikan.
-    """
-    # Load the trained model
-    recognizer = cv2.face.LBPHFaceRecognizer.create()
-    recognizer.read(model_path)
 
-    # Load the face detection model
-    haar_name='haarcascade_frontalface_default.xml'
-    haar_loc=os.path.join('apps','hasiltraining',haar_name)
-    face_cascade = cv2.CascadeClassifier(haar_loc)
+    Mengembalikan hasil ringkas per wajah (kotak, label, distance) tanpa
+    salinan frame; gambar tidak diubah. Anotasi kotak/nama baru digambar
+    saat frame disimpan ke log akses (lihat `access_log.annotate_frame`).
+    """
+    # Backend (LBPH/histogram) dan cascade resident di memori worker
+    backend = get_backend(model_path)
+    if not backend.exists():
+        print(f"Model belum tersedia di {model_path}")
+        return []
+    face_cascade = get_registry(model_path).get_cascade()
 
     # Konversi gambar ke grayscale
     gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
 
     # Deteksi wajah pada gambar
     raw_faces = face_cascade.detectMultiScale(gray, scaleFactor=1.2, minNeighbors=5, minSize=(50, 50))
-    faces=non_max_suppression_fast(raw_faces,overlapThresh=0.3)
+    faces=[tuple(int(value) for value in box) for box in non_max_suppression_fast(raw_faces,overlapThresh=0.3)]
+    # Semua wajah diprediksi sekaligus; crop adalah view dari `gray` (tanpa copy)
+    predictions = backend.predict_many([gray[y:y+h, x:x+w] for (x, y, w, h) in faces])
     results = []
-    for (x, y, w, h) in faces:
-        face_image = gray[y:y+h, x:x+w]
-        try:
-            label, confidence = recognizer.predict(face_image)
-            print(label)
-            print(confidence)
-        except Exception as e:
-            # Jika error saat prediksi
-            print(f"Error predicting face: {e}")
+    for box, prediction in zip(faces, predictions):
+        if prediction is None:
             continue
-        if confidence >= 50:
+        label, confidence = prediction
+        if confidence >= backend.threshold:
             username = 'Unknown'
             id_user=None
             status = "Unauthorized"
@@ -253,21 +112,82 @@ def recognize_from_image(image, model_path, label_to_user):
             username = label_to_user.get(label, "Unknown")
             id_user=label
             status = "Authorized"
-        print(id_user)
-        print(username)
-        color= (0, 255, 0) if confidence < 50 else (0, 0, 255)
-        cv2.putText(image, username, (x+100,y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
-        cv2.rectangle(image, (x, y), (x + w, y + h), (255, 0, 0), 2)
         results.append({
+            "box": box,
+            "label": label,
             "id_face_user": id_user,
             "username":username,
             "status": status,
             "confidence":"  {0}%".format(round(100 - confidence)),
-            "face_image": image
+            "distance": confidence,
         })
     print('result from def recognize image',results)
     return results
 
+FUSION_STRATEGIES={'majority','best'}
+_executor=None
+_executor_lock=threading.Lock()
+
+
+def _frame_executor():
+    """Thread pool per worker untuk decode + recognize frame batch."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor=ThreadPoolExecutor(
+                    max_workers=getattr(settings,'FACE_BATCH_WORKERS',4),
+                    thread_name_prefix='face-batch',
+                )
+    return _executor
+
+
+def _decode_image_bytes(image_byte):
+    np_image=np.frombuffer(image_byte,dtype=np.uint8)
+    return cv2.imdecode(np_image,cv2.IMREAD_COLOR)
+
+
+def fuse_face_results(frame_results, strategy='majority'):
+    """
+    Gabungkan hasil pengenalan dari beberapa frame menjadi satu keputusan.
+
+    - majority: label yang dikenali di lebih dari separuh frame berwajah
+      dinyatakan Authorized; hasil terbaiknya (distance terkecil) dipakai.
+    - best: hasil dengan distance terkecil di semua frame yang menentukan.
+    Mengembalikan None jika tidak ada wajah di frame mana pun.
+    """
+    frames_with_faces=[results for results in frame_results if results]
+    if not frames_with_faces:
+        return None
+    all_results=[item for results in frames_with_faces for item in results]
+    votes={}
+    best_by_label={}
+    for results in frames_with_faces:
+        # Satu suara per label per frame
+        for label in {item['id_face_user'] for item in results if item['id_face_user'] is not None}:
+            votes[label]=votes.get(label,0)+1
+    for item in all_results:
+        current=best_by_label.get(item['id_face_user'])
+        if current is None or item['distance']<current['distance']:
+            best_by_label[item['id_face_user']]=item
+    chosen=min(all_results,key=lambda item: item['distance'])
+
+    if strategy=='majority':
+        # Suara terbanyak menang; seri diputus oleh distance terkecil
+        winner=max(votes,key=lambda label: (votes[label],-best_by_label[label]['distance']),default=None)
+        if winner is not None and votes[winner]*2>len(frames_with_faces):
+            chosen=best_by_label[winner]
+        elif None in best_by_label:
+            chosen=best_by_label[None]
+        else:
+            chosen=dict(chosen,id_face_user=None,username='Unknown',status='Unauthorized')
+    return {
+        'result':chosen,
+        'votes':{str(label):count for label,count in votes.items()},
+        'frames_with_faces':len(frames_with_faces),
+    }
+
+
 def get_true_label_from_path(image_path):
     # Assuming the label is the first part of the filename, split by "_"
     label_str = os.path.basename(image_path).split("_")[0]
@@ -294,41 +214,56 @@ class Createimagetrainingusernew(APIView):
                 "error":"username does not exist"
             },status=status.HTTP_403_FORBIDDEN)
 
-        savedimage=[]
+        serials=[]
         for image in images:
             serial=serializer.Imagedatawajahserializernew(data={
                 "user":items.id,
                 "image_user":image
             })
-            if serial.is_valid():
-                serial.save()
-                training_dir=os.path.join('media','imagetraining')
-                model_save='lbph_model.xml'
-                model_hasil='haarcascade_frontalface_default.xml'
-                model_save_path=os.path.join('apps','hasiltraining',model_save)
-                # print(f"Training dir: {training_dir}")
-                # print(f"Model path: {model_save_path}")
-                print(f"Folder exists: {os.path.exists(training_dir)}")
-                # print(f"Folder exists: {os.path.exists(model_haar)}")
-                train_or_update_user_data(
-                    training_dir=training_dir,
-                    model_save_path=model_save_path,
-                    target_user=items.first_name + items.last_name,
-                    target_label=int(items.face_id)
-                )
-                savedimage.append(serial.data)
-            else:
+            if not serial.is_valid():
                 return Response(
                     data={
                         "status":"error",
                         "message":serial.errors
                     },status=status.HTTP_400_BAD_REQUEST
                 )
+            serials.append(serial)
+
+        # Simpan gambar lalu serahkan training ke worker Celery
+        with db_transaction.atomic():
+            saved_rows=[serial.save() for serial in serials]
+            # Crop wajah disimpan sekarang agar worker training tidak decode ulang
+            cache_upload_crops(saved_rows,MODEL_PATH)
+            job=models.Trainingjobwajah.objects.create(
+                user=items,
+                total_images=len(saved_rows)
+            )
+            job.images.set(saved_rows)
+            db_transaction.on_commit(lambda: train_user_faces_task.delay(str(job.job_id)))
         return Response(
             data={
                 'status':'success',
-                'message':'berhasil mendaftar gambar wajah untuk user baru',
-                'data':savedimage
+                'message':'gambar wajah diterima, training diproses di background',
+                'job_id':str(job.job_id),
+                'job_status':job.status,
+                'data':[serial.data for serial in serials]
+            },status=status.HTTP_202_ACCEPTED
+        )
+
+
+class Gettrainingjobstatus(APIView):
+    permission_classes=(permissions.AllowAny,)
+    def get(self,request,job_id):
+        try:
+            job=models.Trainingjobwajah.objects.get(job_id=job_id)
+        except models.Trainingjobwajah.DoesNotExist:
+            return Response({
+                "error":"job training tidak ditemukan"
+            },status=status.HTTP_404_NOT_FOUND)
+        return Response(
+            data={
+                'status':'success',
+                'data':serializer.Trainingjobwajahserializer(job).data
             },status=status.HTTP_200_OK
         )
 
@@ -391,64 +326,113 @@ class Createlogusersmartnew(APIView):
                 'status':"error",
                 "message":"Selain gambar tidak diperbolehkan"
             },status=status.HTTP_400_BAD_REQUEST)
-        image_byte=image_file.read()
-        np_image=np.frombuffer(image_byte,dtype=np.uint8)
-        image=cv2.imdecode(np_image,cv2.IMREAD_COLOR)
-        label_to_user = {
-            int(items.face_id): f"{items.first_name}_{items.last_name}"
-            for items in User.objects.all()
-            if items.face_id is not None and str(items.face_id).isdigit()
-        }
-        model_name='lbph_model.xml'
-        model_path=os.path.join('apps','hasiltraining',model_name)
-        result=recognize_from_image(image,model_path,label_to_user)
-        image_result=[]
+        image=_decode_image_bytes(image_file.read())
+        if image is None:
+            return Response(data={
+                'status':"error",
+                "message":"Gambar tidak dapat dibaca"
+            },status=status.HTTP_400_BAD_REQUEST)
+        result=recognize_from_image(image,MODEL_PATH,get_label_to_user())
         for results in result:
-            if not results['id_face_user']:
-                waktu=datetime.now().strftime('%Y%m%d_%H%M%S_%f')
-                _,imagebuffer=cv2.imencode('.jpeg',results['face_image'])
-                file_name = f"Unknown_{waktu}.jpeg"
-                log_serial=serializer.Logsmartaccesserializernew(data={
-                    'id_face_user':None,
-                    'image':ContentFile(imagebuffer.tobytes(),name=file_name),
-                    'status':results['status']
-                })
-                if log_serial.is_valid():
-                    log_serial.save()
-                    image_result.append(log_serial.data)
-                else:
-                    print(f"Error saving log for unknown user: {log_serial.errors}")
-                    return Response(data={
-                        "status":"error",
-                        "message":log_serial.errors
-                    }, status=status.HTTP_400_BAD_REQUEST)
-                return Response(data={
-                    "result":image_result,
-                    "confidence":results['confidence']
-                })
-            _, image_buffer = cv2.imencode(".jpeg", results['face_image'])
-            waktu=datetime.now().strftime('%Y%m%d_%H%M%S_%f')
-            file_name = f"{results['username']}_{results['status']}_{waktu}.jpeg"
-            log_serial=serializer.Logsmartaccesserializernew(data={
-                'id_face_user':results['id_face_user'],
-                'image':ContentFile(image_buffer.tobytes(),name=file_name),
-                'status':results['status']
-            })
-            if log_serial.is_valid():
-                log_serial.save()
-                image_result.append(log_serial.data)
-            else:
-                print(f"Error saving log for unknown user: {log_serial.errors}")
-                return Response(data={
-                    "status":"error",
-                    "message":log_serial.errors
-                }, status=status.HTTP_400_BAD_REQUEST)
+            log_data=queue_access_log(results,image,faces=result)
             return Response(
                 data={
-                    "result":image_result,
+                    "result":[log_data],
                     "confidence":results['confidence']
                 },status=status.HTTP_200_OK
             )
+        return Response(data={
+            "result":[],
+            "message":"Wajah tidak terdeteksi"
+        },status=status.HTTP_200_OK)
+
+
+class Createlogusersmartbatch(APIView):
+    """
+    Verifikasi wajah dari beberapa frame satu burst kamera.
+    Frame di-decode dan dikenali paralel dengan model bersama, lalu hasilnya
+    digabung menjadi satu keputusan (`fusion=majority` atau `fusion=best`).
+    """
+    permission_classes=(permissions.AllowAny,)
+    parser_classes = [MultiPartParser,FormParser]
+    def post(self,request):
+        if not _dependencies_available():
+            return _dependency_missing_response()
+        image_files=request.FILES.getlist('image_list')
+        max_frames=getattr(settings,'FACE_BATCH_MAX_FRAMES',10)
+        if not image_files:
+            return Response(data={
+                'status':"error",
+                "message":"image_list wajib berisi minimal satu gambar"
+            },status=status.HTTP_400_BAD_REQUEST)
+        if len(image_files)>max_frames:
+            return Response(data={
+                'status':"error",
+                "message":f"Maksimal {max_frames} frame per request"
+            },status=status.HTTP_400_BAD_REQUEST)
+        strategy=request.data.get('fusion','majority')
+        if strategy not in FUSION_STRATEGIES:
+            return Response(data={
+                'status':"error",
+                "message":f"fusion harus salah satu dari {sorted(FUSION_STRATEGIES)}"
+            },status=status.HTTP_400_BAD_REQUEST)
+
+        label_to_user=get_label_to_user()
+        payloads=[image_file.read() for image_file in image_files]
+
+        def _process(index):
+            image=_decode_image_bytes(payloads[index])
+            if image is None:
+                return []
+            results=recognize_from_image(image,MODEL_PATH,label_to_user)
+            for item in results:
+                item['frame_index']=index
+            # Frame hasil decode dilepas di sini; hanya JPEG asli yang disimpan
+            return results
+
+        frame_results=list(_frame_executor().map(_process,range(len(payloads))))
+        decision=fuse_face_results(frame_results,strategy=strategy)
+        if decision is None:
+            return Response(data={
+                "result":[],
+                "frames":len(payloads),
+                "message":"Wajah tidak terdeteksi"
+            },status=status.HTTP_200_OK)
+
+        chosen_index=decision['result']['frame_index']
+        log_data=queue_access_log(
+            decision['result'],
+            payloads[chosen_index],
+            faces=frame_results[chosen_index],
+        )
+        return Response(
+            data={
+                "decision":decision['result']['status'],
+                "id_face_user":decision['result']['id_face_user'],
+                "username":decision['result']['username'],
+                "confidence":decision['result']['confidence'],
+                "fusion":strategy,
+                "votes":decision['votes'],
+                "frames":len(payloads),
+                "frames_with_faces":decision['frames_with_faces'],
+                "result":[log_data]
+            },status=status.HTTP_200_OK
+        )
+
+
+class Facemodelmetrics(APIView):
+    permission_classes=(permissions.AllowAny,)
+    def get(self,request):
+        if not _dependencies_available():
+            return _dependency_missing_response()
+        return Response(
+            data={
+                'status':'success',
+                'data':get_backend(MODEL_PATH).metrics()
+            },status=status.HTTP_200_OK
+        )
+
+
 class Getuserlogsmartnews(APIView):
     permission_classes=(permissions.AllowAny,)
     def get(self,request):
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import IoTEvent
+from .models import DeviceKey, IoTEvent, IoTEventHourlyRollup
 
 
 @admin.register(IoTEvent)
@@ -8,3 +8,18 @@ class IoTEventAdmin(admin.ModelAdmin):
     list_display = ('id', 'event_type', 'user', 'created_at')
     list_filter = ('event_type', 'created_at')
     search_fields = ('event_type', 'user__email')
+
+
+@admin.register(IoTEventHourlyRollup)
+class IoTEventHourlyRollupAdmin(admin.ModelAdmin):
+    list_display = ('bucket', 'locker', 'event', 'count', 'updated_at')
+    list_filter = ('event', 'locker')
+    date_hierarchy = 'bucket'
+
+
+@admin.register(DeviceKey)
+class DeviceKeyAdmin(admin.ModelAdmin):
+    list_display = ('name', 'prefix', 'is_active', 'rate_per_second', 'burst', 'last_used_at')
+    list_filter = ('is_active',)
+    search_fields = ('name', 'prefix')
+    readonly_fields = ('prefix', 'key_hash', 'created_at', 'last_used_at')
@@ -0,0 +1,170 @@
+"""
+Deteksi anomali getaran: sliding window bitmask per locker.
+
+State window disimpan di Redis dan diperbarui oleh satu skrip Lua per
+locker, jadi worker Celery yang memproses event locker yang sama secara
+bersamaan tidak saling menimpa bit. Tanpa Redis state hanya valid di satu
+proses, sehingga deteksi dimatikan kecuali `IOT_TAMPER_LOCAL_STATE` aktif
+(development/test dengan satu worker).
+"""
+import logging
+import threading
+
+from django.conf import settings
+
+from smartlocker.redis_client import get_redis
+
+
+logger = logging.getLogger(__name__)
+
+TAMPER_STATE_CACHE_PREFIX = 'iot:tamper-window:'
+TAMPER_EVENT = 'TAMPER_DETECTED'
+
+TAMPER_WINDOW_LUA = """
+local size = tonumber(ARGV[1])
+local threshold = tonumber(ARGV[2])
+local ttl = tonumber(ARGV[3])
+local modulo = 2 ^ size
+local state = redis.call('HMGET', KEYS[1], 'bits', 'seen')
+local bits = tonumber(state[1]) or 0
+local seen = tonumber(state[2]) or 0
+local flags = {}
+for i = 4, #ARGV do
+    local tamper = tonumber(ARGV[i])
+    bits = (bits * 2 + tamper) % modulo
+    seen = math.min(seen + 1, size)
+    local count = 0
+    local rest = bits
+    while rest > 0 do
+        count = count + rest % 2
+        rest = math.floor(rest / 2)
+    end
+    if tamper == 1 and seen >= size and count >= threshold then
+        flags[#flags + 1] = 1
+    else
+        flags[#flags + 1] = 0
+    end
+end
+redis.call('HSET', KEYS[1], 'bits', string.format('%d', bits), 'seen', string.format('%d', seen))
+redis.call('EXPIRE', KEYS[1], ttl)
+return flags
+"""
+
+
+def _window_size():
+    return getattr(settings, 'IOT_TAMPER_WINDOW_SIZE', 7)
+
+
+def _threshold():
+    return getattr(settings, 'IOT_TAMPER_THRESHOLD', 7)
+
+
+def state_key(locker) -> str:
+    return f"{TAMPER_STATE_CACHE_PREFIX}{locker}"
+
+
+def push_observation(state, is_tamper, window_size):
+    """
+    Geser sliding window satu langkah. State = (bits, seen): bit terendah
+    adalah event terbaru (1 = tamper), `seen` dibatasi ukuran window.
+    """
+    bits, seen = state or (0, 0)
+    mask = (1 << window_size) - 1
+    bits = ((bits << 1) | int(is_tamper)) & mask
+    return bits, min(seen + 1, window_size)
+
+
+def is_anomaly(state, window_size, threshold) -> bool:
+    bits, seen = state
+    return seen >= window_size and bin(bits).count('1') >= threshold
+
+
+class LocalTamperWindows:
+    """State window in-process (hanya untuk satu proses: development dan test)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._states = {}
+
+    def observe(self, locker, flags, window_size, threshold):
+        results = []
+        with self._lock:
+            state = self._states.get(locker)
+            for is_tamper in flags:
+                state = push_observation(state, is_tamper, window_size)
+                results.append(is_tamper and is_anomaly(state, window_size, threshold))
+            self._states[locker] = state
+        return results
+
+    def reset(self, locker):
+        with self._lock:
+            self._states.pop(locker, None)
+
+    def clear(self):
+        with self._lock:
+            self._states.clear()
+
+
+local_windows = LocalTamperWindows()
+_script = None
+_warned_unshared = False
+
+
+def _redis_observe(client, locker, flags, window_size, threshold):
+    global _script
+    if _script is None:
+        _script = client.register_script(TAMPER_WINDOW_LUA)
+    ttl = getattr(settings, 'IOT_TAMPER_STATE_TTL', 86400)
+    reply = _script(keys=[state_key(locker)], args=[window_size, threshold, ttl, *(int(flag) for flag in flags)])
+    return [bool(int(flag)) for flag in reply]
+
+
+def _observe_locker(locker, flags, window_size, threshold):
+    global _warned_unshared
+    client = get_redis()
+    if client is not None:
+        try:
+            return _redis_observe(client, locker, flags, window_size, threshold)
+        except Exception as exc:
+            logger.error("Tamper window update failed, anomaly detection skipped for locker %s: %s", locker, exc)
+            return [False] * len(flags)
+    if getattr(settings, 'IOT_TAMPER_LOCAL_STATE', False):
+        return local_windows.observe(locker, flags, window_size, threshold)
+    if not _warned_unshared:
+        _warned_unshared = True
+        logger.error(
+            "Tamper anomaly detection disabled: REDIS_CACHE_URL is not set and IOT_TAMPER_LOCAL_STATE is off"
+        )
+    return [False] * len(flags)
+
+
+def observe(observations):
+    """
+    Perbarui window per locker untuk urutan (locker, is_tamper) dan kembalikan
+    daftar bool anomali per observasi, dengan urutan yang sama. Setiap locker
+    diperbarui atomik dalam satu panggilan skrip.
+    """
+    if not observations:
+        return []
+    window_size = _window_size()
+    threshold = _threshold()
+    positions = {}
+    for index, (locker, is_tamper) in enumerate(observations):
+        positions.setdefault(locker, []).append(index)
+
+    results = [False] * len(observations)
+    for locker, indexes in positions.items():
+        flags = [observations[index][1] for index in indexes]
+        for index, hit in zip(indexes, _observe_locker(locker, flags, window_size, threshold)):
+            results[index] = hit
+    return results
+
+
+def reset(locker) -> None:
+    local_windows.reset(locker)
+    client = get_redis()
+    if client is not None:
+        try:
+            client.delete(state_key(locker))
+        except Exception as exc:
+            logger.warning("Failed to reset tamper window for locker %s: %s", locker, exc)
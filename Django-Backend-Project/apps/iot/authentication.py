@@ -0,0 +1,111 @@
+"""
+Autentikasi device lewat header `X-Device-Token`.
+
+Kunci dicari berdasarkan prefix di tabel DeviceKey lalu hash secret
+dibandingkan constant-time. Kunci yang sudah tervalidasi disimpan di LRU
+in-process selama `DEVICE_AUTH_CACHE_TTL` detik, jadi request berikutnya
+dari device yang sama tidak menyentuh database. Menyimpan atau menghapus
+DeviceKey membuang entri kunci itu dari LRU proses yang menyimpannya
+(signal); worker lain baru menolak kunci yang dicabut setelah TTL habis,
+jadi TTL sengaja pendek. `SMARTLOCKER_DEVICE_TOKEN` lama tetap diterima
+sebagai device `legacy`.
+"""
+import hashlib
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.utils import timezone
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from .models import DeviceKey
+
+
+HEADER = 'X-Device-Token'
+LEGACY_DEVICE = DeviceKey(name='legacy', prefix='legacy')
+
+
+class ValidatedKeyCache:
+    """LRU kecil: sha256(token) -> (DeviceKey, waktu kedaluwarsa)."""
+
+    def __init__(self, maxsize=256, ttl=60, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            device_key, expires_at = item
+            if expires_at <= self.clock():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return device_key
+
+    def set(self, key, device_key):
+        with self._lock:
+            self._items[key] = (device_key, self.clock() + self.ttl)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def discard_prefix(self, prefix):
+        """Buang semua entri milik DeviceKey dengan prefix ini (kunci dicabut atau diubah)."""
+        with self._lock:
+            for key in [key for key, (device_key, _) in self._items.items() if device_key.prefix == prefix]:
+                del self._items[key]
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+validated_keys = ValidatedKeyCache(
+    maxsize=getattr(settings, 'DEVICE_AUTH_CACHE_SIZE', 256),
+    ttl=getattr(settings, 'DEVICE_AUTH_CACHE_TTL', 15),
+)
+
+
+def _is_legacy_token(token):
+    legacy = getattr(settings, 'SMARTLOCKER_DEVICE_TOKEN', None)
+    return bool(legacy) and secrets.compare_digest(token.encode(), legacy.encode())
+
+
+def _lookup(token):
+    prefix, _, secret = token.partition('.')
+    if not secret:
+        return None
+    device_key = DeviceKey.objects.filter(prefix=prefix, is_active=True).first()
+    if device_key is None or not secrets.compare_digest(device_key.key_hash, DeviceKey.hash_secret(secret)):
+        return None
+    # last_used_at cukup diperbarui saat cache miss (paling sering sekali per TTL)
+    DeviceKey.objects.filter(pk=device_key.pk).update(last_used_at=timezone.now())
+    return device_key
+
+
+class DeviceTokenAuthentication(BaseAuthentication):
+    """`request.user` tetap AnonymousUser; `request.auth` berisi DeviceKey."""
+
+    def authenticate(self, request):
+        token = request.headers.get(HEADER)
+        if not token:
+            return None
+        if _is_legacy_token(token):
+            return AnonymousUser(), LEGACY_DEVICE
+        cache_key = hashlib.sha256(token.encode()).hexdigest()
+        device_key = validated_keys.get(cache_key)
+        if device_key is None:
+            device_key = _lookup(token)
+            if device_key is None:
+                raise AuthenticationFailed('Invalid device token')
+            validated_keys.set(cache_key, device_key)
+        return AnonymousUser(), device_key
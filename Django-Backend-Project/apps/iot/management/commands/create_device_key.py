@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from apps.iot.models import DeviceKey
+
+
+class Command(BaseCommand):
+    help = 'Creates a device API key for the X-Device-Token header. The raw key is printed once and never stored.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', help='Device name, e.g. kiosk-lobby or sensor-locker-1.')
+        parser.add_argument('--rate', type=float, help='Sustained requests per second (default DEVICE_THROTTLE_RATE).')
+        parser.add_argument('--burst', type=int, help='Bucket size (default DEVICE_THROTTLE_BURST).')
+
+    def handle(self, *args, **options):
+        device_key, raw_key = DeviceKey.generate(
+            options['name'],
+            rate_per_second=options['rate'],
+            burst=options['burst'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Created device key {device_key}"))
+        self.stdout.write(raw_key)
@@ -0,0 +1,78 @@
+import time
+
+import paho.mqtt.client as mqtt
+from paho.mqtt.packettypes import PacketTypes
+from paho.mqtt.properties import Properties
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.iot.mqtt_ingest import EventBatcher, topic_prefix
+
+
+class Command(BaseCommand):
+    help = (
+        'Long-running MQTT consumer: subscribes to the device event topic tree with QoS 1, '
+        'micro-batches events into IoTEvent and acknowledges them after each commit.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default=settings.MQTT_BROKER_HOST)
+        parser.add_argument('--port', type=int, default=settings.MQTT_BROKER_PORT)
+        parser.add_argument('--topic', default=settings.MQTT_TOPIC_EVENTS)
+        parser.add_argument('--client-id', default=settings.MQTT_INGEST_CLIENT_ID,
+                            help='Stable id so the broker keeps the session and redelivers unacked events.')
+        parser.add_argument('--batch-size', type=int, default=settings.MQTT_INGEST_BATCH_SIZE)
+        parser.add_argument('--flush-interval', type=float, default=settings.MQTT_INGEST_FLUSH_INTERVAL)
+        parser.add_argument('--receive-maximum', type=int, default=settings.MQTT_INGEST_RECEIVE_MAXIMUM,
+                            help='Unacked QoS 1 messages the broker may send; batches never exceed this. '
+                                 'Lower it to the broker limit if the broker caps in-flight messages.')
+
+    def handle(self, *args, **options):
+        client = mqtt.Client(
+            mqtt.CallbackAPIVersion.VERSION2,
+            client_id=options['client_id'],
+            protocol=mqtt.MQTTv5,
+            manual_ack=True,
+        )
+        batcher = EventBatcher(
+            ack=lambda message: client.ack(message.mid, message.qos),
+            max_batch=options['batch_size'],
+            max_delay=options['flush_interval'],
+            prefix=topic_prefix(options['topic']),
+            max_inflight=options['receive_maximum'],
+        )
+        connect_properties = Properties(PacketTypes.CONNECT)
+        connect_properties.ReceiveMaximum = options['receive_maximum']
+        connect_properties.SessionExpiryInterval = settings.MQTT_INGEST_SESSION_EXPIRY
+
+        def on_connect(client, userdata, flags, reason_code, properties):
+            if reason_code.is_failure:
+                self.stderr.write(f"MQTT connect failed: {reason_code}")
+                return
+            client.subscribe(options['topic'], qos=1)
+            self.stdout.write(f"Subscribed to {options['topic']} on {options['host']}:{options['port']}")
+
+        def on_message(client, userdata, message):
+            batcher.add(message)
+
+        client.on_connect = on_connect
+        client.on_message = on_message
+        client.reconnect_delay_set(min_delay=1, max_delay=30)
+        client.connect(
+            options['host'], options['port'], keepalive=60,
+            clean_start=False, properties=connect_properties,
+        )
+        client.loop_start()
+        self.stdout.write(f"Batch limit {batcher.batch_limit} events (receive maximum {options['receive_maximum']})")
+        tick = min(0.1, options['flush_interval'] or 0.1)
+        try:
+            while True:
+                if batcher.due():
+                    batcher.flush()
+                time.sleep(tick)
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping MQTT ingest')
+        finally:
+            batcher.flush()
+            client.loop_stop()
+            client.disconnect()
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.db import migrations
+
+from apps.iot.partitions import convert_to_partitioned
+
+
+def _partition_iotevent(apps, schema_editor):
+    # Partisi range hanya didukung PostgreSQL; database lain (sqlite dev/test) tetap tabel biasa
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    convert_to_partitioned(schema_editor, User._meta.db_table)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('iot', '0002_remove_face_match_event'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(_partition_iotevent, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:03
+
+import django.db.models.fields.json
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('iot', '0003_partition_iotevent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IoTEventHourlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField()),
+                ('locker', models.CharField(blank=True, default='', max_length=50)),
+                ('event', models.CharField(max_length=100)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-bucket', 'locker', 'event'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='iotevent',
+            index=models.Index(fields=['-created_at'], name='iotevent_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='iotevent',
+            index=models.Index(fields=['event_type', '-created_at'], name='iotevent_type_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='iotevent',
+            index=models.Index(django.db.models.fields.json.KeyTextTransform('event', 'payload'), models.OrderBy(models.F('created_at'), descending=True), name='iotevent_payload_event_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='iotevent',
+            index=models.Index(django.db.models.fields.json.KeyTextTransform('locker_number', 'payload'), models.OrderBy(models.F('created_at'), descending=True), name='iotevent_payload_locker_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ioteventhourlyrollup',
+            index=models.Index(fields=['locker', 'event', '-bucket'], name='iot_rollup_locker_event_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='ioteventhourlyrollup',
+            constraint=models.UniqueConstraint(fields=('bucket', 'locker', 'event'), name='iot_rollup_bucket_locker_event_uniq'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:44
+
+import django.db.models.fields.json
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('iot', '0005_devicekey'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='iotevent',
+            name='iotevent_payload_locker_idx',
+        ),
+        migrations.AddIndex(
+            model_name='iotevent',
+            index=models.Index(django.db.models.fields.json.KeyTextTransform('event', 'payload'), django.db.models.fields.json.KeyTextTransform('locker_number', 'payload'), models.OrderBy(models.F('created_at'), descending=True), name='iotevent_event_locker_idx'),
+        ),
+    ]
@@ -1,5 +1,9 @@
+import hashlib
+import secrets
+
 from django.conf import settings
 from django.db import models
+from django.db.models.fields.json import KT
 
 
 class IoTEvent(models.Model):
@@ -24,6 +28,76 @@ class IoTEvent(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        # Di PostgreSQL tabel ini dipartisi per `created_at` (lihat apps/iot/partitions.py)
+        indexes = [
+            models.Index(fields=['-created_at'], name='iotevent_created_idx'),
+            models.Index(fields=['event_type', '-created_at'], name='iotevent_type_created_idx'),
+            models.Index(KT('payload__event'), models.F('created_at').desc(), name='iotevent_payload_event_idx'),
+            # Lookup event terbaru per locker: filter event + locker, urut created_at
+            models.Index(
+                KT('payload__event'), KT('payload__locker_number'), models.F('created_at').desc(),
+                name='iotevent_event_locker_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.event_type} @ {self.created_at.isoformat()}"
+
+
+class IoTEventHourlyRollup(models.Model):
+    """Jumlah event per jam per locker per jenis event, untuk dashboard tanpa scan event mentah."""
+
+    bucket = models.DateTimeField()
+    locker = models.CharField(max_length=50, blank=True, default='')
+    event = models.CharField(max_length=100)
+    count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-bucket', 'locker', 'event']
+        constraints = [
+            models.UniqueConstraint(fields=['bucket', 'locker', 'event'], name='iot_rollup_bucket_locker_event_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['locker', 'event', '-bucket'], name='iot_rollup_locker_event_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.bucket:%Y-%m-%d %H}:00 locker {self.locker or '-'} {self.event} = {self.count}"
+
+
+class DeviceKey(models.Model):
+    """
+    Kunci API per device (kiosk, sensor). Format kunci `<prefix>.<secret>`;
+    hanya prefix dan SHA-256 dari secret yang disimpan.
+    """
+
+    PREFIX_LENGTH = 8
+
+    name = models.CharField(max_length=100)
+    prefix = models.CharField(max_length=PREFIX_LENGTH, unique=True)
+    key_hash = models.CharField(max_length=64)
+    is_active = models.BooleanField(default=True)
+    # Token bucket per device; kosong = DEVICE_THROTTLE_RATE / DEVICE_THROTTLE_BURST
+    rate_per_second = models.FloatField(null=True, blank=True)
+    burst = models.PositiveIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return f"{self.name} ({self.prefix})"
+
+    @staticmethod
+    def hash_secret(secret):
+        return hashlib.sha256(secret.encode()).hexdigest()
+
+    @classmethod
+    def generate(cls, name, **fields):
+        """Buat kunci baru; mengembalikan (DeviceKey, kunci mentah). Kunci mentah hanya tampil sekali."""
+        prefix = secrets.token_hex(cls.PREFIX_LENGTH // 2)
+        secret = secrets.token_urlsafe(32)
+        device_key = cls.objects.create(name=name, prefix=prefix, key_hash=cls.hash_secret(secret), **fields)
+        return device_key, f"{prefix}.{secret}"
@@ -0,0 +1,142 @@
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .services import ingest_valid_events
+
+
+logger = logging.getLogger(__name__)
+
+LOCKER = 'locker'
+GENERIC = 'generic'
+
+
+def topic_prefix(topic_filter=None):
+    """`penlok/events/#` -> `penlok/events/`."""
+    topic_filter = topic_filter or getattr(settings, 'MQTT_TOPIC_EVENTS', 'penlok/events/#')
+    return topic_filter.rstrip('#').rstrip('/') + '/'
+
+
+def parse_message(topic, raw_payload, prefix):
+    """
+    Ubah pesan MQTT menjadi (jenis, data serializer).
+
+    - `<prefix>locker/<nomor>`: data LockerSensorEventSerializer; nomor locker
+      diambil dari topic jika tidak ada di body.
+    - topic lain di bawah prefix: data IoTIngestSerializer. Body tanpa key
+      `payload` dianggap payload mentah dengan event_type DEVICE.
+    ValueError jika body bukan objek JSON.
+    """
+    try:
+        body = json.loads(raw_payload)
+    except (TypeError, ValueError, UnicodeDecodeError) as exc:
+        raise ValueError(f'invalid JSON: {exc}')
+    if not isinstance(body, dict):
+        raise ValueError('payload must be a JSON object')
+
+    parts = topic[len(prefix):].split('/') if topic.startswith(prefix) else []
+    if len(parts) == 2 and parts[0] == LOCKER:
+        body.setdefault('locker_number', parts[1])
+        return LOCKER, body
+    if 'payload' in body:
+        return GENERIC, body
+    return GENERIC, {'event_type': 'DEVICE', 'payload': body}
+
+
+class EventBatcher:
+    """
+    Kumpulkan pesan MQTT lalu simpan per micro-batch.
+
+    Pesan baru di-ack (QoS 1) setelah batch-nya ter-commit ke database, jadi
+    jika proses mati sebelum flush, broker mengirim ulang pesan tersebut.
+    Pesan yang tidak bisa di-parse atau ditolak validasi tetap di-ack agar
+    tidak dikirim ulang terus-menerus.
+
+    Broker berhenti mengirim setelah `max_inflight` pesan QoS 1 belum di-ack,
+    jadi batch dianggap penuh pada min(max_batch, max_inflight). Jika simpan
+    ke database gagal, batch dikembalikan ke antrean tanpa di-ack dan flush
+    berikutnya ditunda dengan backoff eksponensial.
+    """
+
+    def __init__(self, ack, max_batch=None, max_delay=None, prefix=None, clock=time.monotonic,
+                 max_inflight=None, retry_delay=1.0, max_retry_delay=30.0):
+        self.ack = ack
+        self.max_batch = max_batch or getattr(settings, 'MQTT_INGEST_BATCH_SIZE', 200)
+        self.max_inflight = max_inflight or getattr(settings, 'MQTT_INGEST_RECEIVE_MAXIMUM', None) or self.max_batch
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.max_delay = max_delay if max_delay is not None else getattr(settings, 'MQTT_INGEST_FLUSH_INTERVAL', 0.5)
+        self.prefix = prefix or topic_prefix()
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._pending = []
+        self._first_at = None
+        self._failures = 0
+        self._retry_at = None
+
+    @property
+    def batch_limit(self):
+        return min(self.max_batch, self.max_inflight)
+
+    def add(self, message):
+        try:
+            kind, data = parse_message(message.topic, message.payload, self.prefix)
+        except ValueError as exc:
+            logger.warning("Dropping MQTT message on %s: %s", message.topic, exc)
+            self.ack(message)
+            return
+        with self._lock:
+            if not self._pending:
+                self._first_at = self.clock()
+            self._pending.append((kind, data, message))
+
+    def due(self):
+        with self._lock:
+            if not self._pending:
+                return False
+            now = self.clock()
+            if self._retry_at is not None:
+                return now >= self._retry_at
+            return len(self._pending) >= self.batch_limit or now - self._first_at >= self.max_delay
+
+    def flush(self):
+        """Simpan batch yang tertunda; mengembalikan (jumlah tersimpan, jumlah ditolak)."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._first_at = None
+        if not pending:
+            return 0, 0
+        close_old_connections()
+        try:
+            created, rejected = ingest_valid_events(
+                generic_items=[data for kind, data, _ in pending if kind == GENERIC],
+                locker_items=[data for kind, data, _ in pending if kind == LOCKER],
+            )
+        except Exception:
+            self._requeue(pending)
+            return 0, 0
+        self._failures = 0
+        self._retry_at = None
+        for item, errors in rejected:
+            logger.warning("Rejected MQTT event %s: %s", item, errors)
+        for _, _, message in pending:
+            self.ack(message)
+        logger.info("MQTT ingest flushed %d events (%d rejected)", len(created), len(rejected))
+        return len(created), len(rejected)
+
+    def _requeue(self, pending):
+        """Kembalikan batch gagal ke depan antrean (belum di-ack) dan jadwalkan retry."""
+        self._failures += 1
+        delay = min(self.retry_delay * 2 ** (self._failures - 1), self.max_retry_delay)
+        logger.exception(
+            "MQTT ingest flush of %d events failed (attempt %d), retrying in %.1fs",
+            len(pending), self._failures, delay,
+        )
+        with self._lock:
+            self._pending = pending + self._pending
+            self._first_at = self.clock()
+            self._retry_at = self._first_at + delay
@@ -0,0 +1,192 @@
+"""
+Partisi range `created_at` untuk tabel IoTEvent (khusus PostgreSQL).
+
+Tabel induk `iot_iotevent` dipartisi per bulan (atau per hari lewat
+`IOT_EVENT_PARTITION_INTERVAL`). Nama partisi menyimpan batas bawahnya,
+mis. `iot_iotevent_p202611` atau `iot_iotevent_p20261118`, sehingga job
+retensi cukup membaca nama partisi untuk menentukan mana yang dibuang.
+Baris di luar rentang partisi masuk ke `iot_iotevent_default`.
+"""
+import logging
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+
+logger = logging.getLogger(__name__)
+
+
+TABLE = 'iot_iotevent'
+DEFAULT_PARTITION = f'{TABLE}_default'
+
+
+def interval():
+    value = getattr(settings, 'IOT_EVENT_PARTITION_INTERVAL', 'month')
+    if value not in ('day', 'month'):
+        raise ValueError(f"IOT_EVENT_PARTITION_INTERVAL tidak dikenal: {value}")
+    return value
+
+
+def partition_start(day, unit=None):
+    unit = unit or interval()
+    return day if unit == 'day' else day.replace(day=1)
+
+
+def next_start(start, unit=None):
+    unit = unit or interval()
+    if unit == 'day':
+        return start + timedelta(days=1)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def partition_name(start, unit=None):
+    unit = unit or interval()
+    suffix = start.strftime('%Y%m%d') if unit == 'day' else start.strftime('%Y%m')
+    return f'{TABLE}_p{suffix}'
+
+
+def parse_partition_start(name):
+    """Kebalikan `partition_name`; None untuk nama yang bukan partisi rentang."""
+    prefix = f'{TABLE}_p'
+    if not name.startswith(prefix):
+        return None
+    suffix = name[len(prefix):]
+    try:
+        if len(suffix) == 8:
+            return datetime.strptime(suffix, '%Y%m%d').date()
+        if len(suffix) == 6:
+            return datetime.strptime(suffix, '%Y%m').date()
+    except ValueError:
+        return None
+    return None
+
+
+def is_partitioned():
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = %s",
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = %s
+            """,
+            [TABLE],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def create_partition_sql(start, unit=None):
+    unit = unit or interval()
+    end = next_start(start, unit)
+    return (
+        f'CREATE TABLE IF NOT EXISTS "{partition_name(start, unit)}" PARTITION OF "{TABLE}" '
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+
+
+def ensure_partitions(ahead=None, today=None):
+    """Buat partisi periode berjalan + `ahead` periode berikutnya. Mengembalikan nama partisi baru."""
+    if not is_partitioned():
+        return []
+    unit = interval()
+    ahead = getattr(settings, 'IOT_EVENT_PARTITIONS_AHEAD', 2) if ahead is None else ahead
+    existing = set(list_partitions())
+    start = partition_start(today or date.today(), unit)
+    created = []
+    for _ in range(ahead + 1):
+        name = partition_name(start, unit)
+        if name not in existing:
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute(create_partition_sql(start, unit))
+                created.append(name)
+            except DatabaseError as exc:
+                # Biasanya karena partisi default sudah berisi baris pada rentang ini
+                logger.error("Failed to create IoT event partition %s: %s", name, exc)
+        start = next_start(start, unit)
+    if created:
+        logger.info("Created IoT event partitions: %s", created)
+    return created
+
+
+def drop_partitions_before(cutoff):
+    """DETACH + DROP partisi yang seluruh rentangnya lebih lama dari `cutoff` (date)."""
+    if not is_partitioned():
+        return []
+    dropped = []
+    for name in sorted(list_partitions()):
+        start = parse_partition_start(name)
+        if start is None:
+            continue
+        unit = 'day' if len(name) - len(f'{TABLE}_p') == 8 else 'month'
+        if next_start(start, unit) > cutoff:
+            continue
+        with connection.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{name}"')
+            cursor.execute(f'DROP TABLE "{name}"')
+        dropped.append(name)
+    if dropped:
+        logger.info("Dropped IoT event partitions older than %s: %s", cutoff, dropped)
+    return dropped
+
+
+def convert_to_partitioned(schema_editor, user_table):
+    """
+    Ubah `iot_iotevent` biasa menjadi tabel partisi. Data lama disalin ke
+    partisi bulanan/harian; id tetap dan sequence dilanjutkan dari id terbesar.
+    Primary key menjadi (id, created_at) karena PostgreSQL mewajibkan kunci
+    partisi ada di setiap constraint unik.
+    """
+    legacy = f'{TABLE}_legacy'
+    # Nama baru untuk sequence/constraint: nama lama masih dipakai tabel legacy sampai di-drop
+    sequence = f'{TABLE}_pk_seq'
+    execute = schema_editor.execute
+    execute(f'ALTER TABLE "{TABLE}" RENAME TO "{legacy}"')
+    execute(f'CREATE SEQUENCE "{sequence}"')
+    execute(
+        f"""
+        CREATE TABLE "{TABLE}" (
+            "id" bigint NOT NULL DEFAULT nextval('{sequence}'),
+            "event_type" varchar(50) NOT NULL,
+            "payload" jsonb NOT NULL,
+            "created_at" timestamp with time zone NOT NULL,
+            "user_id" bigint NULL REFERENCES "{user_table}" ("id") DEFERRABLE INITIALLY DEFERRED,
+            CONSTRAINT "{TABLE}_part_pkey" PRIMARY KEY ("id", "created_at")
+        ) PARTITION BY RANGE ("created_at")
+        """
+    )
+    execute(f'CREATE INDEX "{TABLE}_user_id_part_idx" ON "{TABLE}" ("user_id")')
+    execute(f'CREATE TABLE "{DEFAULT_PARTITION}" PARTITION OF "{TABLE}" DEFAULT')
+
+    unit = interval()
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'SELECT MIN("created_at") FROM "{legacy}"')
+        oldest = cursor.fetchone()[0]
+    today = date.today()
+    start = partition_start(oldest.date() if oldest else today, unit)
+    last = partition_start(today, unit)
+    for _ in range(getattr(settings, 'IOT_EVENT_PARTITIONS_AHEAD', 2)):
+        last = next_start(last, unit)
+    while start <= last:
+        execute(create_partition_sql(start, unit))
+        start = next_start(start, unit)
+
+    execute(
+        f'INSERT INTO "{TABLE}" ("id", "event_type", "payload", "created_at", "user_id") '
+        f'SELECT "id", "event_type", "payload", "created_at", "user_id" FROM "{legacy}"'
+    )
+    execute(f"""SELECT setval('{sequence}', COALESCE((SELECT MAX("id") FROM "{legacy}"), 0) + 1, false)""")
+    execute(f'ALTER SEQUENCE "{sequence}" OWNED BY "{TABLE}"."id"')
+    execute(f'DROP TABLE "{legacy}"')
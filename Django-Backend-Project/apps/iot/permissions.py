@@ -0,0 +1,30 @@
+from django.conf import settings
+from rest_framework.permissions import BasePermission
+
+from .models import DeviceKey
+
+
+class IsDevice(BasePermission):
+    """
+    Request harus terautentikasi sebagai device (DeviceTokenAuthentication).
+    Selama `SMARTLOCKER_DEVICE_TOKEN` kosong dan `DEVICE_AUTH_REQUIRED` False,
+    endpoint device tetap terbuka seperti sebelumnya (mode development).
+    """
+
+    def has_permission(self, request, view):
+        if isinstance(request.auth, DeviceKey):
+            return True
+        return not (
+            getattr(settings, 'SMARTLOCKER_DEVICE_TOKEN', None)
+            or getattr(settings, 'DEVICE_AUTH_REQUIRED', False)
+        )
+
+
+class IsRegisteredDevice(BasePermission):
+    """
+    Hanya DeviceKey terdaftar: token legacy bersama dan mode development
+    tanpa token ditolak. Untuk endpoint yang mengirim data sensitif ke device.
+    """
+
+    def has_permission(self, request, view):
+        return isinstance(request.auth, DeviceKey) and request.auth.pk is not None
@@ -16,7 +16,7 @@ class IoTIngestSerializer(serializers.Serializer):
     payload = serializers.JSONField()
 
     def create(self, validated_data):
-        user_id = validated_data.pop('user_id', None)
+        user_id = validated_data.get('user_id')
         user = None
         if user_id is not None:
             from django.contrib.auth import get_user_model
@@ -24,10 +24,16 @@ class IoTIngestSerializer(serializers.Serializer):
             User = get_user_model()
             user = User.objects.filter(id=user_id).first()
 
-        event_type = validated_data.get('event_type') or IoTEvent.EventType.GENERIC
-        return IoTEvent.objects.create(
-            user=user,
-            event_type=event_type,
+        event = self.build_event(validated_data, user_id=user.id if user else None)
+        event.save()
+        return event
+
+    @staticmethod
+    def build_event(validated_data, user_id=None):
+        """IoTEvent belum disimpan; dipakai juga oleh ingest batch (bulk_create)."""
+        return IoTEvent(
+            user_id=user_id,
+            event_type=validated_data.get('event_type') or IoTEvent.EventType.GENERIC,
             payload=validated_data['payload'],
         )
 
@@ -49,6 +55,12 @@ class LockerSensorEventSerializer(serializers.Serializer):
     timestamp = serializers.DateTimeField(required=False)
 
     def create(self, validated_data):
+        event = self.build_event(validated_data)
+        event.save()
+        return event
+
+    @staticmethod
+    def build_event(validated_data):
         locker_number = validated_data['locker_number']
         event = validated_data['event']
         timestamp = validated_data.get('timestamp')
@@ -60,7 +72,7 @@ class LockerSensorEventSerializer(serializers.Serializer):
         if timestamp:
             payload['timestamp'] = timestamp.isoformat()
 
-        return IoTEvent.objects.create(
+        return IoTEvent(
             event_type=IoTEvent.EventType.DEVICE,
             payload=payload,
         )
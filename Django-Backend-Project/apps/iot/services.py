@@ -0,0 +1,88 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from .models import IoTEvent
+from .serializers import IoTIngestSerializer, LockerSensorEventSerializer
+from .tasks import schedule_event_notifications
+
+
+def batch_items(data):
+    """
+    Ambil daftar event dari body batch: array JSON, NDJSON (sudah jadi list
+    oleh parser), atau objek `{"events": [...]}`.
+    """
+    if isinstance(data, dict):
+        data = data.get('events')
+    if not isinstance(data, list):
+        raise ValidationError({'events': 'Expected a list of events.'})
+    if not data:
+        raise ValidationError({'events': 'At least one event is required.'})
+    max_batch = getattr(settings, 'IOT_INGEST_MAX_BATCH', 500)
+    if len(data) > max_batch:
+        raise ValidationError({'events': f'At most {max_batch} events per batch.'})
+    return data
+
+
+def _save_batch(events):
+    """Simpan event dengan satu bulk_create lalu jadwalkan notifikasi sekali per batch."""
+    with transaction.atomic():
+        created = IoTEvent.objects.bulk_create(events)
+        schedule_event_notifications(event.id for event in created)
+    return created
+
+
+def _build_ingest_events(validated_items):
+    """IoTEvent generic dari data tervalidasi; user_id yang tidak ada diabaikan (satu query)."""
+    user_ids = {item['user_id'] for item in validated_items if item.get('user_id') is not None}
+    existing_user_ids = set()
+    if user_ids:
+        existing_user_ids = set(
+            get_user_model().objects.filter(id__in=user_ids).values_list('id', flat=True)
+        )
+    return [
+        IoTIngestSerializer.build_event(
+            item,
+            user_id=item.get('user_id') if item.get('user_id') in existing_user_ids else None,
+        )
+        for item in validated_items
+    ]
+
+
+def ingest_events(items):
+    """Validasi semua event generic dalam satu pass lalu simpan sekaligus."""
+    serializer = IoTIngestSerializer(data=items, many=True)
+    serializer.is_valid(raise_exception=True)
+    return _save_batch(_build_ingest_events(serializer.validated_data))
+
+
+def ingest_locker_events(items):
+    serializer = LockerSensorEventSerializer(data=items, many=True)
+    serializer.is_valid(raise_exception=True)
+    return _save_batch([LockerSensorEventSerializer.build_event(item) for item in serializer.validated_data])
+
+
+def ingest_valid_events(generic_items=(), locker_items=()):
+    """
+    Versi toleran untuk ingest streaming (MQTT): setiap item divalidasi
+    sendiri, item tidak valid dilewati, sisanya disimpan dalam satu batch.
+    Mengembalikan (created, rejected) dengan `rejected` = [(item, errors)].
+    """
+    rejected = []
+    generic_valid = []
+    for item in generic_items:
+        serializer = IoTIngestSerializer(data=item)
+        if serializer.is_valid():
+            generic_valid.append(serializer.validated_data)
+        else:
+            rejected.append((item, serializer.errors))
+    events = _build_ingest_events(generic_valid)
+    for item in locker_items:
+        serializer = LockerSensorEventSerializer(data=item)
+        if serializer.is_valid():
+            events.append(LockerSensorEventSerializer.build_event(serializer.validated_data))
+        else:
+            rejected.append((item, serializer.errors))
+    created = _save_batch(events) if events else []
+    return created, rejected
@@ -1,10 +1,13 @@
 from django.contrib.auth import get_user_model
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 from apps.notifications.tasks import push_notification_task
 
-from .models import IoTEvent
+from . import anomaly
+from .authentication import validated_keys
+from .models import DeviceKey, IoTEvent
+from .tasks import schedule_event_notifications
 
 
 EVENT_MESSAGES = {
@@ -44,47 +47,82 @@ def _resolve_message(event_key: str, payload: dict) -> str | None:
     return EVENT_MESSAGES.get(event_key)
 
 
-@receiver(post_save, sender=IoTEvent)
-def notify_priority_events(sender, instance: IoTEvent, created: bool, **kwargs) -> None:
-    if not created:
-        return
+def _event_key(event: IoTEvent, payload: dict) -> str:
+    return (payload.get('event') or event.event_type or '').upper()
 
-    payload = instance.payload or {}
-    if instance.user_id and not payload.get('user_id'):
-        payload['user_id'] = instance.user_id
-    event_key = (payload.get('event') or instance.event_type or '').upper()
-    message = None
 
-    # Deteksi anomali getaran: 7 event terakhir semuanya tamper
-    if event_key == 'TAMPER_DETECTED':
-        last_payloads = list(
-            IoTEvent.objects.order_by('-created_at').values_list('payload', flat=True)[:7]
-        )
-        if len(last_payloads) == 7 and all(
-            (p or {}).get('event', '').upper() == 'TAMPER_DETECTED' for p in last_payloads
-        ):
+def notify_events(events) -> int:
+    """
+    Kirim notifikasi untuk sekumpulan IoTEvent yang baru dibuat. Dijalankan
+    di worker Celery (`dispatch_event_notifications_task`), bukan di request.
+
+    Daftar owner/superuser di-query sekali per batch, dan event dengan pesan
+    serta penerima yang sama digabung menjadi satu notifikasi.
+    Mengembalikan jumlah pemanggilan push notification.
+    """
+    User = get_user_model()
+    owner_ids = None
+    superuser_ids = None
+    grouped = {}
+    keyed = []
+    for instance in events:
+        payload = instance.payload or {}
+        if instance.user_id and not payload.get('user_id'):
+            payload['user_id'] = instance.user_id
+        keyed.append((instance, payload, _event_key(instance, payload)))
+
+    # Deteksi anomali getaran: sliding window per locker, O(1) per event
+    anomalies = anomaly.observe([
+        (_locker_label(payload), event_key == anomaly.TAMPER_EVENT)
+        for _, payload, event_key in keyed
+    ])
+
+    for (instance, payload, event_key), is_anomaly in zip(keyed, anomalies):
+        message = None
+        if is_anomaly:
             message = "WARNING!! SENSOR MENDETEKSI ANOMALI GETARAN"
 
-    if not message:
-        message = _resolve_message(event_key, payload)
+        if not message:
+            message = _resolve_message(event_key, payload)
+
+        if not message:
+            continue
+
+        target_ids = []
+        if event_key in OWNER_BROADCAST_EVENTS:
+            if owner_ids is None:
+                owner_ids = list(
+                    User.objects.filter(role=User.Role.OWNER).values_list('id', flat=True)
+                )
+            target_ids = list(owner_ids)
+
+        if instance.user_id:
+            target_ids.append(instance.user_id)
+        if not target_ids:
+            if superuser_ids is None:
+                superuser_ids = list(User.objects.filter(is_superuser=True).values_list('id', flat=True))
+            target_ids = list(superuser_ids)
+
+        grouped.setdefault((message, tuple(sorted(set(target_ids)))), None)
+
+    for message, target_ids in grouped:
+        push_notification_task(
+            user_ids=list(target_ids),
+            title='SmartLocker Event',
+            body=message,
+        )
+    return len(grouped)
 
-    if not message:
-        return
 
-    target_ids = []
-    User = get_user_model()
-    if event_key in OWNER_BROADCAST_EVENTS:
-        target_ids = list(
-            User.objects.filter(role=User.Role.OWNER).values_list('id', flat=True)
-        )
+@receiver(post_save, sender=IoTEvent)
+def notify_priority_events(sender, instance: IoTEvent, created: bool, **kwargs) -> None:
+    if not created:
+        return
+    schedule_event_notifications([instance.id])
 
-    if instance.user_id:
-        target_ids.append(instance.user_id)
-    if not target_ids:
-        target_ids = list(User.objects.filter(is_superuser=True).values_list('id', flat=True))
 
-    push_notification_task(
-        user_ids=target_ids,
-        title='SmartLocker Event',
-        body=message,
-    )
+@receiver(post_save, sender=DeviceKey)
+@receiver(post_delete, sender=DeviceKey)
+def forget_validated_device_key(sender, instance: DeviceKey, **kwargs):
+    # Kunci yang dinonaktifkan/dihapus tidak boleh tetap lolos dari LRU autentikasi
+    validated_keys.discard_prefix(instance.prefix)
@@ -1,6 +1,106 @@
+import logging
+from datetime import timedelta
+
 from celery import shared_task
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, TextField, Value
+from django.db.models.fields.json import KT
+from django.db.models.functions import Coalesce, TruncHour, Upper
+from django.utils import timezone
+
+from . import partitions
+from .models import IoTEvent, IoTEventHourlyRollup
+
+
+logger = logging.getLogger(__name__)
 
 
 @shared_task
 def noop_iot_task():
     return 'iot ready'
+
+
+@shared_task
+def dispatch_event_notifications_task(event_ids):
+    """Klasifikasi event, deteksi anomali, dan fan-out notifikasi di worker Celery."""
+    from .signals import notify_events
+
+    events = list(IoTEvent.objects.filter(id__in=event_ids).order_by('id'))
+    if not events:
+        logger.warning("IoT events %s not found for notification dispatch", event_ids)
+        return 0
+    return notify_events(events)
+
+
+def schedule_event_notifications(event_ids):
+    """Jadwalkan dispatch setelah transaksi ingest commit, agar request device tidak menunggu."""
+    event_ids = list(event_ids)
+    if event_ids:
+        transaction.on_commit(lambda: dispatch_event_notifications_task.delay(event_ids))
+
+
+@shared_task
+def rollup_iot_events_task(hours_back=2):
+    """
+    Hitung ulang rollup per jam (locker, event) untuk `hours_back` jam
+    terakhir ditambah jam berjalan. Idempoten: baris rollup di-upsert.
+    """
+    now = timezone.now()
+    start = now.replace(minute=0, second=0, microsecond=0) - timedelta(hours=hours_back)
+    rows = (
+        IoTEvent.objects.filter(created_at__gte=start, created_at__lte=now)
+        .order_by()
+        .annotate(
+            bucket=TruncHour('created_at'),
+            locker=Coalesce(
+                KT('payload__locker_number'), KT('payload__locker'), KT('payload__locker_id'), Value(''),
+                output_field=TextField(),
+            ),
+            event_key=Upper(Coalesce(KT('payload__event'), 'event_type', output_field=TextField())),
+        )
+        .values('bucket', 'locker', 'event_key')
+        .annotate(total=Count('id'))
+    )
+    rollups = [
+        IoTEventHourlyRollup(bucket=row['bucket'], locker=row['locker'], event=row['event_key'], count=row['total'])
+        for row in rows
+    ]
+    if rollups:
+        IoTEventHourlyRollup.objects.bulk_create(
+            rollups,
+            update_conflicts=True,
+            unique_fields=['bucket', 'locker', 'event'],
+            update_fields=['count', 'updated_at'],
+        )
+    logger.info("IoT rollup refreshed %d buckets since %s", len(rollups), start.isoformat())
+    return len(rollups)
+
+
+@shared_task
+def ensure_iot_event_partitions_task():
+    return partitions.ensure_partitions()
+
+
+@shared_task
+def purge_old_iot_events_task(batch_size=5000):
+    """
+    Buang event lebih lama dari IOT_EVENT_RETENTION_DAYS. Di PostgreSQL
+    partisi lama di-drop utuh; sisanya (partisi default / database tanpa
+    partisi) dihapus bertahap per `batch_size` baris.
+    """
+    cutoff = timezone.now() - timedelta(days=getattr(settings, 'IOT_EVENT_RETENTION_DAYS', 90))
+    dropped = partitions.drop_partitions_before(cutoff.date())
+    deleted = 0
+    while True:
+        ids = list(IoTEvent.objects.filter(created_at__lt=cutoff).order_by().values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        deleted += IoTEvent.objects.filter(id__in=ids, created_at__lt=cutoff).delete()[0]
+    rollup_cutoff = timezone.now() - timedelta(days=getattr(settings, 'IOT_ROLLUP_RETENTION_DAYS', 365))
+    IoTEventHourlyRollup.objects.filter(bucket__lt=rollup_cutoff).delete()
+    logger.info(
+        "IoT retention on %s: dropped partitions %s, deleted %d rows older than %s",
+        connection.vendor, dropped, deleted, cutoff.isoformat(),
+    )
+    return {'dropped_partitions': dropped, 'deleted_rows': deleted}
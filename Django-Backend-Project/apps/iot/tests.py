@@ -0,0 +1,339 @@
+import json
+from unittest.mock import Mock, patch
+
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from datetime import date, timedelta
+
+from django.utils import timezone
+
+from . import anomaly, partitions
+from .authentication import ValidatedKeyCache, validated_keys
+from .models import DeviceKey, IoTEvent, IoTEventHourlyRollup
+from .mqtt_ingest import EventBatcher
+from .tasks import purge_old_iot_events_task, rollup_iot_events_task
+from .throttling import LocalTokenBuckets, local_buckets
+
+
+@override_settings(SMARTLOCKER_DEVICE_TOKEN=None)
+class IoTBatchIngestTests(APITestCase):
+    def setUp(self):
+        user_model = get_user_model()
+        self.owner = user_model.objects.create_user(
+            email='iot-owner@example.com',
+            username='iot_owner',
+            password='testpass123',
+            role=user_model.Role.OWNER,
+        )
+
+    def test_batch_is_bulk_created_with_one_notification_dispatch(self):
+        events = [
+            {'event_type': 'DEVICE', 'payload': {'event': 'RFID_ACCEPTED'}, 'user_id': self.owner.id},
+            {'payload': {'event': 'HEARTBEAT'}},
+            {'payload': {'event': 'RFID_ACCEPTED'}, 'user_id': self.owner.id},
+        ]
+        with patch('apps.iot.signals.push_notification_task') as push, \
+                self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = self.client.post(reverse('iot-events-batch'), events, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual(IoTEvent.objects.filter(user=self.owner).count(), 2)
+        self.assertEqual(len(callbacks), 1)
+        # Dua event RFID identik digabung menjadi satu notifikasi
+        push.assert_called_once()
+        self.assertEqual(push.call_args.kwargs['user_ids'], [self.owner.id])
+
+    def test_invalid_item_rejects_whole_batch(self):
+        events = {'events': [{'payload': {'event': 'X'}}, {'event_type': 'NOPE', 'payload': {}}]}
+        response = self.client.post(reverse('iot-events-batch'), events, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(IoTEvent.objects.exists())
+
+    def test_locker_events_accept_ndjson(self):
+        body = '\n'.join(json.dumps(item) for item in [
+            {'locker_number': '1', 'event': 'door_closed'},
+            {'locker_number': '3', 'event': 'package_detected'},
+        ])
+        with patch('apps.iot.signals.push_notification_task') as push, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('iot-locker-events-batch'), body, content_type='application/x-ndjson'
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            sorted(IoTEvent.objects.values_list('payload__event', flat=True)),
+            ['LOCKER_DOOR_CLOSED', 'LOCKER_PACKAGE_DETECTED'],
+        )
+        self.assertEqual(push.call_count, 2)
+
+    def test_single_event_notification_is_deferred_to_celery(self):
+        payload = {'payload': {'event': 'RFID_DENIED'}, 'user_id': self.owner.id}
+        with patch('apps.iot.tasks.dispatch_event_notifications_task.delay') as delay:
+            with self.captureOnCommitCallbacks() as callbacks:
+                response = self.client.post(reverse('iot-events-ingest'), payload, format='json')
+            delay.assert_not_called()
+            for callback in callbacks:
+                callback()
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        delay.assert_called_once_with([response.data['id']])
+
+
+@override_settings(IOT_TAMPER_LOCAL_STATE=True)
+class TamperAnomalyTests(SimpleTestCase):
+    def setUp(self):
+        anomaly.local_windows.clear()
+
+    def test_window_is_tracked_per_locker(self):
+        observations = []
+        for _ in range(7):
+            observations += [('1', True), ('3', False)]
+        results = anomaly.observe(observations)
+
+        # Event locker 3 tidak memutus rangkaian tamper locker 1
+        self.assertEqual([index for index, hit in enumerate(results) if hit], [12])
+        self.assertEqual(anomaly.observe([('1', True)]), [True])
+        self.assertEqual(anomaly.observe([('1', False), ('1', True)]), [False, False])
+
+    @override_settings(IOT_TAMPER_WINDOW_SIZE=5, IOT_TAMPER_THRESHOLD=4)
+    def test_window_size_and_threshold_are_configurable(self):
+        results = anomaly.observe([('2', True), ('2', False), ('2', True), ('2', True), ('2', True)])
+        self.assertEqual(results, [False, False, False, False, True])
+
+    @override_settings(IOT_TAMPER_LOCAL_STATE=False)
+    def test_detection_is_disabled_without_shared_state(self):
+        with patch('apps.iot.anomaly._warned_unshared', False), self.assertLogs('apps.iot.anomaly', level='ERROR'):
+            results = anomaly.observe([('1', True)] * 8)
+        self.assertEqual(results, [False] * 8)
+
+    def test_redis_window_is_updated_by_one_script_call_per_locker(self):
+        script = Mock(side_effect=lambda keys, args: [0] * (len(args) - 3))
+        client = Mock(register_script=Mock(return_value=script))
+        with patch('apps.iot.anomaly.get_redis', return_value=client), patch('apps.iot.anomaly._script', None):
+            results = anomaly.observe([('1', True), ('3', False), ('1', False)])
+
+        self.assertEqual(results, [False, False, False])
+        calls = {call.kwargs['keys'][0]: call.kwargs['args'][3:] for call in script.call_args_list}
+        self.assertEqual(calls, {anomaly.state_key('1'): [1, 0], anomaly.state_key('3'): [0]})
+
+
+class IoTEventStorageTests(APITestCase):
+    def _event(self, payload, created_at=None):
+        event = IoTEvent.objects.create(payload=payload)
+        if created_at:
+            IoTEvent.objects.filter(id=event.id).update(created_at=created_at)
+        return event
+
+    def test_hourly_rollup_counts_per_locker_and_event(self):
+        with patch('apps.iot.signals.schedule_event_notifications'):
+            self._event({'event': 'tamper_detected', 'locker_number': '1'})
+            self._event({'event': 'TAMPER_DETECTED', 'locker_number': '1'})
+            self._event({'event': 'LOCKER_DOOR_CLOSED', 'locker_number': 3})
+            self._event({'event': 'HEARTBEAT'})
+
+        self.assertEqual(rollup_iot_events_task(), 3)
+        self.assertEqual(rollup_iot_events_task(), 3)
+        counts = {
+            (row.locker, row.event): row.count for row in IoTEventHourlyRollup.objects.all()
+        }
+        self.assertEqual(counts, {
+            ('1', 'TAMPER_DETECTED'): 2,
+            ('3', 'LOCKER_DOOR_CLOSED'): 1,
+            ('', 'HEARTBEAT'): 1,
+        })
+
+    @override_settings(IOT_EVENT_RETENTION_DAYS=30)
+    def test_retention_deletes_old_events(self):
+        with patch('apps.iot.signals.schedule_event_notifications'):
+            old = self._event({'event': 'OLD'}, created_at=timezone.now() - timedelta(days=31))
+            recent = self._event({'event': 'RECENT'})
+
+        result = purge_old_iot_events_task(batch_size=1)
+
+        self.assertEqual(result['deleted_rows'], 1)
+        self.assertFalse(IoTEvent.objects.filter(id=old.id).exists())
+        self.assertTrue(IoTEvent.objects.filter(id=recent.id).exists())
+
+
+class IoTPartitionNamingTests(SimpleTestCase):
+    def test_monthly_and_daily_partition_names_round_trip(self):
+        self.assertEqual(partitions.next_start(date(2026, 12, 1), 'month'), date(2027, 1, 1))
+        self.assertEqual(partitions.partition_name(date(2026, 11, 1), 'month'), 'iot_iotevent_p202611')
+        self.assertEqual(partitions.parse_partition_start('iot_iotevent_p20261118'), date(2026, 11, 18))
+        self.assertIsNone(partitions.parse_partition_start(partitions.DEFAULT_PARTITION))
+        self.assertIn(
+            "FROM ('2026-11-18') TO ('2026-11-19')",
+            partitions.create_partition_sql(date(2026, 11, 18), 'day'),
+        )
+
+
+class _StubMessage:
+    def __init__(self, mid, topic, body):
+        self.mid = mid
+        self.qos = 1
+        self.topic = topic
+        self.payload = body if isinstance(body, bytes) else json.dumps(body).encode()
+
+
+class MqttIngestTests(APITestCase):
+    def setUp(self):
+        self.acked = []
+        self.now = 0.0
+        self.batcher = EventBatcher(
+            ack=lambda message: self.acked.append(message.mid),
+            max_batch=3,
+            max_delay=1.0,
+            prefix='penlok/events/',
+            clock=lambda: self.now,
+        )
+
+    def test_micro_batch_is_saved_then_acked(self):
+        self.batcher.add(_StubMessage(1, 'penlok/events/locker/3', {'event': 'door_closed'}))
+        self.batcher.add(_StubMessage(2, 'penlok/events/rpi-1', {'event': 'TAMPER_DETECTED', 'locker_number': '1'}))
+        self.assertFalse(self.batcher.due())
+        self.assertEqual(self.acked, [])
+
+        self.now = 1.5
+        self.assertTrue(self.batcher.due())
+        with patch('apps.iot.services.schedule_event_notifications') as schedule:
+            self.assertEqual(self.batcher.flush(), (2, 0))
+
+        self.assertEqual(sorted(self.acked), [1, 2])
+        schedule.assert_called_once()
+        self.assertEqual(
+            sorted(IoTEvent.objects.values_list('payload__event', flat=True)),
+            ['LOCKER_DOOR_CLOSED', 'TAMPER_DETECTED'],
+        )
+        self.assertEqual(
+            IoTEvent.objects.get(payload__event='LOCKER_DOOR_CLOSED').payload['locker_number'], '3'
+        )
+
+    def test_invalid_messages_are_acked_without_blocking_batch(self):
+        self.batcher.add(_StubMessage(1, 'penlok/events/rpi-1', b'not json'))
+        self.batcher.add(_StubMessage(2, 'penlok/events/locker/9', {'event': 'door_closed'}))
+        self.batcher.add(_StubMessage(3, 'penlok/events/rpi-1', {'event': 'HEARTBEAT'}))
+        self.assertEqual(self.acked, [1])
+
+        with patch('apps.iot.services.schedule_event_notifications'):
+            self.assertEqual(self.batcher.flush(), (1, 1))
+        self.assertEqual(sorted(self.acked), [1, 2, 3])
+        self.assertEqual(IoTEvent.objects.get().event_type, 'DEVICE')
+
+    def test_batch_is_full_at_broker_inflight_limit(self):
+        batcher = EventBatcher(ack=self.acked.append, max_batch=200, max_delay=60,
+                               prefix='penlok/events/', clock=lambda: self.now, max_inflight=2)
+        batcher.add(_StubMessage(1, 'penlok/events/rpi-1', {'event': 'HEARTBEAT'}))
+        self.assertFalse(batcher.due())
+        batcher.add(_StubMessage(2, 'penlok/events/rpi-1', {'event': 'HEARTBEAT'}))
+        self.assertTrue(batcher.due())
+
+    def test_failed_flush_keeps_batch_unacked_and_backs_off(self):
+        self.batcher.add(_StubMessage(1, 'penlok/events/locker/3', {'event': 'door_closed'}))
+        with patch('apps.iot.mqtt_ingest.ingest_valid_events', side_effect=DatabaseError('db down')), \
+                self.assertLogs('apps.iot.mqtt_ingest', level='ERROR'):
+            self.assertEqual(self.batcher.flush(), (0, 0))
+        self.assertEqual(self.acked, [])
+
+        # Retry pertama setelah 1 detik meski batch belum penuh
+        self.now = 0.5
+        self.assertFalse(self.batcher.due())
+        self.now = 1.0
+        self.assertTrue(self.batcher.due())
+        with patch('apps.iot.services.schedule_event_notifications'):
+            self.assertEqual(self.batcher.flush(), (1, 0))
+        self.assertEqual(self.acked, [1])
+
+
+@override_settings(SMARTLOCKER_DEVICE_TOKEN=None, DEVICE_AUTH_REQUIRED=True, REDIS_CACHE_URL=None)
+class DeviceTokenAuthenticationTests(APITestCase):
+    def setUp(self):
+        validated_keys.clear()
+        local_buckets.clear()
+        self.device, self.raw_key = DeviceKey.generate('sensor-1')
+        self.url = reverse('iot-events-ingest')
+        self.body = {'payload': {'event': 'HEARTBEAT'}}
+
+    def _post(self, token=None):
+        headers = {'HTTP_X_DEVICE_TOKEN': token} if token else {}
+        return self.client.post(self.url, self.body, format='json', **headers)
+
+    def test_valid_key_is_cached_after_first_lookup(self):
+        self.assertEqual(self._post(self.raw_key).status_code, status.HTTP_201_CREATED)
+        self.device.refresh_from_db()
+        self.assertIsNotNone(self.device.last_used_at)
+
+        # Kunci sudah di LRU: tidak ada query DeviceKey lagi, hanya insert event
+        with patch('apps.iot.authentication._lookup') as lookup:
+            self.assertEqual(self._post(self.raw_key).status_code, status.HTTP_201_CREATED)
+        lookup.assert_not_called()
+
+    def test_missing_wrong_or_inactive_key_is_rejected(self):
+        self.assertEqual(self._post().status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self._post(f'{self.device.prefix}.salah').status_code, status.HTTP_403_FORBIDDEN)
+        self.device.is_active = False
+        self.device.save()
+        self.assertEqual(self._post(self.raw_key).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(IoTEvent.objects.exists())
+
+    @override_settings(SMARTLOCKER_DEVICE_TOKEN='rahasia-lama')
+    def test_legacy_shared_token_still_accepted(self):
+        self.assertEqual(self._post('rahasia-lama').status_code, status.HTTP_201_CREATED)
+
+    def test_deactivated_key_is_dropped_from_cache(self):
+        self.assertEqual(self._post(self.raw_key).status_code, status.HTTP_201_CREATED)
+        self.device.is_active = False
+        self.device.save()
+        self.assertEqual(self._post(self.raw_key).status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(SMARTLOCKER_DEVICE_TOKEN='rahasia-lama', DEVICE_THROTTLE_RATE=0.001, DEVICE_THROTTLE_BURST=1)
+    def test_legacy_devices_get_separate_buckets(self):
+        def post(ip, device_id='kiosk-1'):
+            return self.client.post(self.url, self.body, format='json', REMOTE_ADDR=ip,
+                                    HTTP_X_DEVICE_TOKEN='rahasia-lama', HTTP_X_DEVICE_ID=device_id)
+
+        self.assertEqual(post('10.0.0.1').status_code, status.HTTP_201_CREATED)
+        self.assertEqual(post('10.0.0.1', device_id='kiosk-2').status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(post('10.0.0.2').status_code, status.HTTP_201_CREATED)
+
+    def test_token_bucket_limits_each_device(self):
+        self.device.rate_per_second = 0.001
+        self.device.burst = 2
+        self.device.save()
+        other, other_key = DeviceKey.generate('sensor-2')
+
+        codes = [self._post(self.raw_key).status_code for _ in range(3)]
+        self.assertEqual(codes, [201, 201, status.HTTP_429_TOO_MANY_REQUESTS])
+        self.assertEqual(self._post(other_key).status_code, status.HTTP_201_CREATED)
+
+
+class DeviceAuthPrimitiveTests(SimpleTestCase):
+    def test_lru_evicts_oldest_and_expires(self):
+        now = [0.0]
+        lru = ValidatedKeyCache(maxsize=2, ttl=10, clock=lambda: now[0])
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.get('a'), 1)
+        now[0] = 11
+        self.assertIsNone(lru.get('a'))
+
+    def test_local_bucket_refills_over_time(self):
+        now = [0.0]
+        buckets = LocalTokenBuckets(clock=lambda: now[0])
+        self.assertTrue(buckets.take('d', rate=1, burst=1)[0])
+        allowed, wait = buckets.take('d', rate=1, burst=1)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(wait, 1.0)
+        now[0] = 1.0
+        self.assertTrue(buckets.take('d', rate=1, burst=1)[0])
+
@@ -0,0 +1,114 @@
+"""
+Rate limit token bucket per device untuk endpoint device.
+
+State bucket disimpan di Redis (satu skrip Lua atomik, jadi semua worker
+berbagi bucket yang sama). Tanpa Redis, atau jika Redis gagal, bucket
+disimpan in-process per worker.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+
+from smartlocker.redis_client import get_redis
+
+from .models import DeviceKey
+
+
+logger = logging.getLogger(__name__)
+
+TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(wait)}
+"""
+
+
+class LocalTokenBuckets:
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def take(self, key, rate, burst):
+        """Mengembalikan (diizinkan, detik tunggu)."""
+        now = self.clock()
+        with self._lock:
+            tokens, ts = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + max(0.0, now - ts) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                return True, 0.0
+            self._buckets[key] = (tokens, now)
+            return False, (1 - tokens) / rate
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+local_buckets = LocalTokenBuckets()
+_script = None
+
+
+def _redis_take(client, key, rate, burst):
+    global _script
+    if _script is None:
+        _script = client.register_script(TOKEN_BUCKET_LUA)
+    allowed, wait = _script(keys=[key], args=[rate, burst])
+    return bool(int(allowed)), float(wait)
+
+
+def take_token(key, rate, burst):
+    client = get_redis()
+    if client is not None:
+        try:
+            return _redis_take(client, key, rate, burst)
+        except Exception as exc:
+            logger.warning("Device throttle Redis unavailable, using local bucket: %s", exc)
+    return local_buckets.take(key, rate, burst)
+
+
+class DeviceTokenBucketThrottle(BaseThrottle):
+    """
+    Satu bucket per DeviceKey; request tanpa device (mode development) tidak
+    dibatasi. Semua device legacy memakai token yang sama, jadi bucket-nya
+    dipisah per IP client. Identitas dari header tidak dipakai karena bisa
+    diganti client untuk mendapat bucket baru; bucket per device yang
+    sebenarnya butuh DeviceKey terdaftar.
+    """
+
+    def bucket_key(self, request, device_key):
+        if device_key.pk is None:
+            return f'throttle:device:{device_key.prefix}:{self.get_ident(request)}'
+        return f'throttle:device:{device_key.prefix}'
+
+    def allow_request(self, request, view):
+        device_key = request.auth
+        if not isinstance(device_key, DeviceKey):
+            return True
+        rate = device_key.rate_per_second or getattr(settings, 'DEVICE_THROTTLE_RATE', 20)
+        burst = device_key.burst or getattr(settings, 'DEVICE_THROTTLE_BURST', 100)
+        allowed, self._wait = take_token(self.bucket_key(request, device_key), rate, burst)
+        return allowed
+
+    def wait(self):
+        return getattr(self, '_wait', None)
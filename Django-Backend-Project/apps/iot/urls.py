@@ -1,8 +1,15 @@
 from django.urls import path
 
-from .views import DeviceEventIngestView, LockerSensorEventView
+from .views import (
+    DeviceEventBatchIngestView,
+    DeviceEventIngestView,
+    LockerSensorEventBatchView,
+    LockerSensorEventView,
+)
 
 urlpatterns = [
     path('events/', DeviceEventIngestView.as_view(), name='iot-events-ingest'),
+    path('events/batch/', DeviceEventBatchIngestView.as_view(), name='iot-events-batch'),
     path('locker-events/', LockerSensorEventView.as_view(), name='iot-locker-events'),
+    path('locker-events/batch/', LockerSensorEventBatchView.as_view(), name='iot-locker-events-batch'),
 ]
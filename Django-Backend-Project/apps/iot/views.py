@@ -1,19 +1,28 @@
-from django.conf import settings
 from drf_spectacular.utils import extend_schema
-from rest_framework import permissions, status
-from rest_framework.exceptions import PermissionDenied
+from rest_framework import status
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from .authentication import DeviceTokenAuthentication
+from .parsers import NDJSONParser
+from .permissions import IsDevice
 from .serializers import IoTEventSerializer, IoTIngestSerializer, LockerSensorEventSerializer
+from .services import batch_items, ingest_events, ingest_locker_events
+from .throttling import DeviceTokenBucketThrottle
 
 
-class DeviceEventIngestView(APIView):
-    permission_classes = [permissions.AllowAny]
+class DeviceAPIView(APIView):
+    """Basis endpoint yang dipanggil device: autentikasi X-Device-Token + rate limit per device."""
 
+    authentication_classes = [DeviceTokenAuthentication]
+    permission_classes = [IsDevice]
+    throttle_classes = [DeviceTokenBucketThrottle]
+
+
+class DeviceEventIngestView(DeviceAPIView):
     @extend_schema(request=IoTIngestSerializer, responses=IoTEventSerializer)
     def post(self, request, *args, **kwargs):
-        _require_device_token(request)
         serializer = IoTIngestSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         event = serializer.save()
@@ -21,17 +30,14 @@ class DeviceEventIngestView(APIView):
         return Response(output.data, status=status.HTTP_201_CREATED)
 
 
-class LockerSensorEventView(APIView):
+class LockerSensorEventView(DeviceAPIView):
     """
     Ingest hardware signals for locker door/package detection.
     Intended for lockers 1 and 3 where both sensors agree before sending.
     """
 
-    permission_classes = [permissions.AllowAny]
-
     @extend_schema(request=LockerSensorEventSerializer, responses=IoTEventSerializer)
     def post(self, request, *args, **kwargs):
-        _require_device_token(request)
         serializer = LockerSensorEventSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         event = serializer.save()
@@ -39,10 +45,31 @@ class LockerSensorEventView(APIView):
         return Response(output.data, status=status.HTTP_201_CREATED)
 
 
-def _require_device_token(request) -> None:
-    expected = getattr(settings, 'SMARTLOCKER_DEVICE_TOKEN', None)
-    if not expected:
-        return
-    provided = request.headers.get('X-Device-Token')
-    if provided != expected:
-        raise PermissionDenied('Invalid device token')
+class DeviceEventBatchIngestView(DeviceAPIView):
+    """
+    Ingest banyak event sekaligus: array JSON, `{"events": [...]}`, atau
+    NDJSON (`Content-Type: application/x-ndjson`). Semua event divalidasi
+    dulu; jika satu gagal, tidak ada yang disimpan.
+    """
+
+    parser_classes = [JSONParser, NDJSONParser]
+    ingest = staticmethod(ingest_events)
+
+    @extend_schema(request=IoTIngestSerializer(many=True), responses=None)
+    def post(self, request, *args, **kwargs):
+        events = self.ingest(batch_items(request.data))
+        return Response(
+            {'created': len(events), 'ids': [event.id for event in events]},
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class LockerSensorEventBatchView(DeviceEventBatchIngestView):
+    """Versi batch dari LockerSensorEventView."""
+
+    ingest = staticmethod(ingest_locker_events)
+
+    @extend_schema(request=LockerSensorEventSerializer(many=True), responses=None)
+    def post(self, request, *args, **kwargs):
+        return super().post(request, *args, **kwargs)
+
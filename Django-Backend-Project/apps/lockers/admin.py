@@ -1,10 +1,17 @@
 from django.contrib import admin
 
 # Register your models here.
-from .models import Locker, LockerLog, Delivery, Package # Import model-model Anda                                                                            
+from .models import Locker, LockerLog, LockerOtp, Delivery, Package # Import model-model Anda                                                                            
                                                                                  
 # Daftarkan model Anda di sini.                                                 
 admin.site.register(Locker)                                                     
 admin.site.register(LockerLog)                                                  
 admin.site.register(Delivery)                                                   
-admin.site.register(Package)
\ No newline at end of file
+admin.site.register(Package)
+
+
+@admin.register(LockerOtp)
+class LockerOtpAdmin(admin.ModelAdmin):
+    list_display = ('transaction', 'is_active', 'attempts', 'expires_at', 'used_at')
+    list_filter = ('is_active',)
+    exclude = ('code',)
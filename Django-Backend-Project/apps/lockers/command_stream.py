@@ -0,0 +1,138 @@
+"""
+Kanal perintah buka locker untuk device (pengganti polling `lockers_lockerrequest`).
+
+Trigger PostgreSQL (migration 0006) mengirim `NOTIFY locker_requests` setiap
+kali LockerRequest dibuat. Endpoint stream SSE memegang satu koneksi `LISTEN`
+dan mengirim request yang belum dipenuhi begitu notifikasi datang; di
+database tanpa LISTEN/NOTIFY (sqlite dev/test) stream kembali ke polling.
+Device menandai request selesai lewat API fulfill, bukan UPDATE langsung.
+"""
+import json
+import logging
+import select
+import time
+
+from django.conf import settings
+from django.db import connection
+from rest_framework.renderers import BaseRenderer
+
+from smartlocker.streaming import release_db_connections
+
+from .models import LockerRequest
+
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'locker_requests'
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Agar negosiasi konten DRF menerima `Accept: text/event-stream`."""
+
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Hanya dipakai untuk respons error; stream sendiri dikirim sebagai StreamingHttpResponse
+        return json.dumps(data).encode(self.charset)
+
+
+def sse_event(data, event=None, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    if event:
+        lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data, default=str)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def pending_requests(after_id=0):
+    return list(
+        LockerRequest.objects.filter(fulfilled=False, id__gt=after_id)
+        .order_by('id')
+        .values('id', 'locker_number', 'requested_at')
+    )
+
+
+class RequestListener:
+    """Koneksi psycopg2 khusus (autocommit) yang menjalankan `LISTEN locker_requests`."""
+
+    def __init__(self):
+        self.conn = connection.get_new_connection(connection.get_connection_params())
+        self.conn.autocommit = True
+        with self.conn.cursor() as cursor:
+            cursor.execute(f'LISTEN {CHANNEL}')
+
+    def wait(self, timeout):
+        """True jika ada notifikasi dalam `timeout` detik."""
+        if not self.conn.notifies:
+            readable, _, _ = select.select([self.conn], [], [], timeout)
+            if not readable:
+                return False
+            self.conn.poll()
+        notified = bool(self.conn.notifies)
+        self.conn.notifies.clear()
+        return notified
+
+    def close(self):
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+
+def open_listener():
+    if connection.vendor != 'postgresql':
+        return None
+    try:
+        return RequestListener()
+    except Exception as exc:
+        logger.warning("LISTEN %s unavailable, falling back to polling: %s", CHANNEL, exc)
+        return None
+
+
+def stream_locker_requests(last_id=0, max_seconds=None, heartbeat=None, poll_interval=None, listener_factory=open_listener):
+    """
+    Generator SSE: kirim semua request yang belum dipenuhi dengan id > `last_id`,
+    lalu tunggu NOTIFY (atau polling) sampai `max_seconds`. Koneksi database
+    Django dilepas selama menunggu. Stream ditutup berkala agar thread worker
+    tidak tertahan selamanya; EventSource device tersambung ulang dengan
+    `Last-Event-ID`.
+    """
+    max_seconds = getattr(settings, 'LOCKER_STREAM_MAX_SECONDS', 300) if max_seconds is None else max_seconds
+    heartbeat = getattr(settings, 'LOCKER_STREAM_HEARTBEAT', 15) if heartbeat is None else heartbeat
+    poll_interval = getattr(settings, 'LOCKER_STREAM_POLL_INTERVAL', 1) if poll_interval is None else poll_interval
+
+    deadline = time.monotonic() + max_seconds
+    listener = listener_factory()
+    wait_seconds = heartbeat if listener else poll_interval
+    last_write = time.monotonic()
+    yield 'retry: 1000\n\n'
+    try:
+        while True:
+            for item in pending_requests(last_id):
+                last_id = item['id']
+                last_write = time.monotonic()
+                yield sse_event(item, event='open', event_id=item['id'])
+            release_db_connections()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if listener:
+                try:
+                    listener.wait(min(wait_seconds, remaining))
+                except Exception as exc:
+                    logger.warning("LISTEN %s connection lost, falling back to polling: %s", CHANNEL, exc)
+                    listener.close()
+                    listener = None
+                    wait_seconds = poll_interval
+            else:
+                time.sleep(min(wait_seconds, remaining))
+            if time.monotonic() - last_write >= heartbeat:
+                last_write = time.monotonic()
+                yield ': keepalive\n\n'
+    finally:
+        if listener:
+            listener.close()
@@ -0,0 +1,93 @@
+"""
+Endpoint verifikasi keypad untuk kiosk (pengganti query psycopg2 langsung di cobaface.py).
+
+`pending-codes` mengirim hash akhiran resi yang masih aktif agar device bisa
+menyimpan cache lokal ber-TTL dan memberi feedback keypad tanpa menunggu
+server; kode yang tidak ada di cache tetap dicek lewat `verify-*`. Endpoint
+ini hanya untuk DeviceKey terdaftar.
+"""
+import hashlib
+import secrets
+
+from django.conf import settings
+from django.db.models.functions import Right
+from drf_spectacular.utils import extend_schema
+from rest_framework import status
+from rest_framework.response import Response
+
+from apps.iot.permissions import IsRegisteredDevice
+from apps.iot.views import DeviceAPIView
+from apps.package_center.models import PackageEntry
+
+from .otp import find_active_otp
+
+
+TRACKING_SUFFIX_LENGTH = 5
+OTP_LENGTH = 6
+
+
+def hash_code(code, salt):
+    return hashlib.sha256(f'{salt}:{code}'.encode()).hexdigest()
+
+
+def tracking_suffix_queryset():
+    # Ekspresi harus sama persis dengan index `packageentry_tracking_sfx_idx`
+    return PackageEntry.objects.annotate(tracking_suffix=Right('tracking_number', TRACKING_SUFFIX_LENGTH))
+
+
+def tracking_suffix_exists(code):
+    return tracking_suffix_queryset().filter(tracking_suffix=code).exists()
+
+
+def otp_exists(code):
+    return find_active_otp(code) is not None
+
+
+def _read_code(request, length):
+    code = str(request.data.get('code', '')).strip()
+    if len(code) != length:
+        return None
+    return code
+
+
+@extend_schema(exclude=True)
+class DeviceVerifyTrackingView(DeviceAPIView):
+
+    def post(self, request, *args, **kwargs):
+        code = _read_code(request, TRACKING_SUFFIX_LENGTH)
+        if code is None:
+            return Response({'error': f'code must be {TRACKING_SUFFIX_LENGTH} characters.'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'valid': tracking_suffix_exists(code)}, status=status.HTTP_200_OK)
+
+
+@extend_schema(exclude=True)
+class DeviceVerifyOtpView(DeviceAPIView):
+
+    def post(self, request, *args, **kwargs):
+        code = _read_code(request, OTP_LENGTH)
+        if code is None:
+            return Response({'error': f'code must be {OTP_LENGTH} characters.'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'valid': otp_exists(code)}, status=status.HTTP_200_OK)
+
+
+@extend_schema(exclude=True)
+class DevicePendingCodesView(DeviceAPIView):
+    """
+    Hash SHA-256 (dengan salt per respons) dari akhiran resi yang belum
+    diterima. OTP sengaja tidak ikut: ruang kodenya kecil sehingga hash
+    bersalt pun mudah di-brute-force, dan OTP harus dikonsumsi di server.
+    """
+    permission_classes = [IsRegisteredDevice]
+
+    def get(self, request, *args, **kwargs):
+        salt = secrets.token_hex(8)
+        suffixes = set(
+            tracking_suffix_queryset()
+            .exclude(status=PackageEntry.Status.DELIVERED)
+            .values_list('tracking_suffix', flat=True)
+        )
+        return Response({
+            'salt': salt,
+            'ttl': getattr(settings, 'DEVICE_CODE_CACHE_TTL', 30),
+            'tracking_suffixes': sorted(hash_code(code, salt) for code in suffixes),
+        }, status=status.HTTP_200_OK)
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+from apps.lockers.command_stream import CHANNEL
+
+
+def _create_notify_trigger(apps, schema_editor):
+    # LISTEN/NOTIFY hanya ada di PostgreSQL; database lain memakai polling di stream
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f"""
+        CREATE OR REPLACE FUNCTION lockers_lockerrequest_notify() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('{CHANNEL}', json_build_object('id', NEW.id, 'locker_number', NEW.locker_number)::text);
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    schema_editor.execute(
+        'CREATE TRIGGER lockers_lockerrequest_notify_trg AFTER INSERT ON "lockers_lockerrequest" '
+        'FOR EACH ROW EXECUTE FUNCTION lockers_lockerrequest_notify()'
+    )
+
+
+def _drop_notify_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP TRIGGER IF EXISTS lockers_lockerrequest_notify_trg ON "lockers_lockerrequest"')
+    schema_editor.execute('DROP FUNCTION IF EXISTS lockers_lockerrequest_notify()')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lockers', '0005_lockerrequest'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lockerrequest',
+            index=models.Index(condition=models.Q(('fulfilled', False)), fields=['id'], name='lockerrequest_pending_idx'),
+        ),
+        migrations.RunPython(_create_notify_trigger, _drop_notify_trigger),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lockers', '0006_lockerrequest_notify'),
+        ('marketplace', '0011_transaction_otp_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LockerOtp',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=6)),
+                ('is_active', models.BooleanField(default=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField()),
+                ('used_at', models.DateTimeField(blank=True, null=True)),
+                ('transaction', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='locker_otps', to='marketplace.transaction')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(condition=models.Q(('is_active', True)), fields=['expires_at'], name='lockerotp_active_expiry_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('is_active', True)), fields=('code',), name='lockerotp_active_code_uniq')],
+            },
+        ),
+    ]
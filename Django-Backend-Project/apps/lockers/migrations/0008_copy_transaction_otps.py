@@ -0,0 +1,46 @@
+# Data OTP dipisah dari 0007: di PostgreSQL index dan constraint LockerOtp baru dibuat di akhir
+# migration, dan INSERT dengan FK deferred sebelumnya membuat CREATE INDEX gagal
+# ("pending trigger events").
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations
+from django.utils import timezone
+
+
+CLOSED_STATUSES = ('RELEASED', 'COMPLETED', 'FAILED', 'REJECTED')
+
+
+def copy_transaction_otps(apps, schema_editor):
+    # OTP lama di Transaction.otp dipindah ke LockerOtp; jika kode bertabrakan, hanya transaksi terbaru yang aktif
+    Transaction = apps.get_model('marketplace', 'Transaction')
+    LockerOtp = apps.get_model('lockers', 'LockerOtp')
+    now = timezone.now()
+    default_expiry = now + timedelta(hours=getattr(settings, 'LOCKER_OTP_TTL_HOURS', 6))
+    seen = set()
+    otps = []
+    rows = (
+        Transaction.objects.filter(otp__isnull=False)
+        .exclude(otp='')
+        .exclude(status__in=CLOSED_STATUSES)
+        .order_by('-updated_at', '-id')
+        .values_list('id', 'otp', 'payment_expires_at')
+    )
+    for transaction_id, code, expires_at in rows.iterator():
+        expires_at = expires_at or default_expiry
+        active = code not in seen and expires_at > now
+        seen.add(code)
+        otps.append(LockerOtp(transaction_id=transaction_id, code=code, expires_at=expires_at, is_active=active))
+    LockerOtp.objects.bulk_create(otps, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lockers', '0007_lockerotp'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_transaction_otps, migrations.RunPython.noop),
+    ]
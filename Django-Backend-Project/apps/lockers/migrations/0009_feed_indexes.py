@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lockers', '0008_copy_transaction_otps'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lockerlog',
+            index=models.Index(fields=['user', '-timestamp', '-id'], name='lockerlog_user_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lockerlog',
+            index=models.Index(fields=['-timestamp', '-id'], name='lockerlog_feed_idx'),
+        ),
+    ]
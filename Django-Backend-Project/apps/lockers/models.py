@@ -18,6 +18,38 @@ class LockerRequest(models.Model):
 
     class Meta:
         ordering = ['-requested_at']
+        indexes = [
+            # Stream/fallback polling hanya membaca request yang belum dipenuhi
+            models.Index(fields=['id'], condition=models.Q(fulfilled=False), name='lockerrequest_pending_idx'),
+        ]
+
+class LockerOtp(models.Model):
+    """
+    OTP pengambilan barang marketplace di locker.
+
+    Kode aktif unik (partial unique index), punya masa berlaku dan dipakai
+    sekali; `Transaction.otp` tetap diisi untuk tampilan ke buyer.
+    """
+    transaction = models.ForeignKey('marketplace.Transaction', on_delete=models.CASCADE, related_name='locker_otps')
+    code = models.CharField(max_length=6)
+    is_active = models.BooleanField(default=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    used_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['code'], condition=models.Q(is_active=True), name='lockerotp_active_code_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['expires_at'], condition=models.Q(is_active=True), name='lockerotp_active_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"OTP transaksi {self.transaction_id} ({'aktif' if self.is_active else 'nonaktif'})"
+
 
 class Locker(models.Model):
     class LockerType(models.TextChoices):
@@ -50,6 +82,12 @@ class LockerLog(models.Model):
     is_successful = models.BooleanField(default=True)
     details = models.TextField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-timestamp', '-id'], name='lockerlog_user_feed_idx'),
+            models.Index(fields=['-timestamp', '-id'], name='lockerlog_feed_idx'),
+        ]
+
 class Delivery(models.Model):
     class DeliveryStatus(models.TextChoices):
         PENDING = 'PENDING', 'Pending Verification'
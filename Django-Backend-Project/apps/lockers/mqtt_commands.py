@@ -0,0 +1,162 @@
+"""
+Publisher perintah locker lewat MQTT.
+
+Satu client paho persisten per proses worker (dibuat ulang setelah fork),
+loop jaringan berjalan di thread sendiri dan reconnect otomatis. Perintah
+dikirim QoS 1 ke `MQTT_TOPIC_COMMAND` dengan `command_id`; device membalas
+ke `MQTT_TOPIC_COMMAND_ACK` dengan `command_id` yang sama sehingga pemanggil
+bisa menunggu ack dengan timeout.
+"""
+import json
+import logging
+import os
+import threading
+import uuid
+
+from django.conf import settings
+
+try:
+    import paho.mqtt.client as mqtt
+except ModuleNotFoundError:
+    mqtt = None
+
+
+logger = logging.getLogger(__name__)
+
+
+class LockerCommandError(Exception):
+    pass
+
+
+class LockerCommandTimeout(LockerCommandError):
+    pass
+
+
+def _default_client_factory(client_id):
+    if mqtt is None:
+        raise LockerCommandError('paho-mqtt belum terpasang')
+    return mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=client_id)
+
+
+class LockerCommandPublisher:
+    def __init__(self, host=None, port=None, command_topic=None, ack_topic=None, client_factory=None):
+        self.host = host or settings.MQTT_BROKER_HOST
+        self.port = port or settings.MQTT_BROKER_PORT
+        self.command_topic = command_topic or settings.MQTT_TOPIC_COMMAND
+        self.ack_topic = ack_topic or getattr(settings, 'MQTT_TOPIC_COMMAND_ACK', 'penlok/command/ack')
+        self.client_factory = client_factory or _default_client_factory
+        self.client = None
+        self.pid = None
+        self._lock = threading.Lock()
+        self._connected = threading.Event()
+        # command_id -> {'event': Event, 'reply': dict|None}
+        self._pending = {}
+
+    def _ensure_client(self):
+        if self.client is not None and self.pid == os.getpid():
+            return self.client
+        with self._lock:
+            if self.client is not None and self.pid == os.getpid():
+                return self.client
+            self._connected.clear()
+            self._pending = {}
+            prefix = getattr(settings, 'MQTT_COMMAND_CLIENT_ID', 'smartlocker-cmd')
+            client = self.client_factory(f"{prefix}-{os.getpid()}-{uuid.uuid4().hex[:6]}")
+            client.on_connect = self._on_connect
+            client.on_disconnect = self._on_disconnect
+            client.on_message = self._on_message
+            client.reconnect_delay_set(min_delay=1, max_delay=30)
+            # connect_async: koneksi (dan reconnect) ditangani thread loop, broker mati tidak memblokir request
+            client.connect_async(self.host, self.port, keepalive=60)
+            client.loop_start()
+            self.client = client
+            self.pid = os.getpid()
+        return self.client
+
+    def _on_connect(self, client, userdata, flags, reason_code, properties):
+        if reason_code.is_failure:
+            logger.warning("MQTT command publisher connect failed: %s", reason_code)
+            return
+        client.subscribe(self.ack_topic, qos=1)
+        self._connected.set()
+        logger.info("MQTT command publisher connected to %s:%s", self.host, self.port)
+
+    def _on_disconnect(self, client, userdata, flags, reason_code, properties):
+        self._connected.clear()
+        logger.warning("MQTT command publisher disconnected: %s", reason_code)
+
+    def _on_message(self, client, userdata, message):
+        try:
+            reply = json.loads(message.payload)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            logger.warning("Invalid command ack on %s: %r", message.topic, message.payload)
+            return
+        if not isinstance(reply, dict):
+            return
+        pending = self._pending.get(reply.get('command_id'))
+        if pending is None:
+            return
+        pending['reply'] = reply
+        pending['event'].set()
+
+    def publish(self, locker_number, action, wait_ack=False, timeout=None, **extra):
+        """
+        Kirim perintah ke device. Mengembalikan `command_id`, atau payload ack
+        device jika `wait_ack`. LockerCommandTimeout jika broker/device tidak
+        merespons dalam `timeout` detik.
+        """
+        timeout = getattr(settings, 'MQTT_COMMAND_ACK_TIMEOUT', 5) if timeout is None else timeout
+        client = self._ensure_client()
+        if not self._connected.wait(timeout):
+            raise LockerCommandTimeout(f'MQTT broker {self.host}:{self.port} tidak terhubung')
+
+        command_id = uuid.uuid4().hex
+        payload = dict(extra, command_id=command_id, locker_number=str(locker_number), action=action)
+        pending = {'event': threading.Event(), 'reply': None}
+        if wait_ack:
+            self._pending[command_id] = pending
+        try:
+            info = client.publish(self.command_topic, json.dumps(payload), qos=1)
+            try:
+                info.wait_for_publish(timeout)
+            except (RuntimeError, ValueError) as exc:
+                raise LockerCommandError(f'Gagal mengirim perintah ke locker {locker_number}: {exc}')
+            if not info.is_published():
+                raise LockerCommandTimeout(f'Broker tidak mengonfirmasi perintah ke locker {locker_number}')
+            logger.info("Locker command %s sent: locker=%s action=%s", command_id, locker_number, action)
+            if not wait_ack:
+                return command_id
+            if not pending['event'].wait(timeout):
+                raise LockerCommandTimeout(f'Locker {locker_number} tidak mengirim ack dalam {timeout} detik')
+        finally:
+            self._pending.pop(command_id, None)
+
+        reply = pending['reply']
+        if reply.get('status', 'ok') != 'ok':
+            raise LockerCommandError(reply.get('detail') or f'Locker {locker_number} menolak perintah {action}')
+        return reply
+
+    def close(self):
+        with self._lock:
+            if self.client is not None and self.pid == os.getpid():
+                self.client.loop_stop()
+                self.client.disconnect()
+            self.client = None
+            self._connected.clear()
+
+
+_publisher = None
+_publisher_lock = threading.Lock()
+
+
+def get_command_publisher():
+    global _publisher
+    if _publisher is None:
+        with _publisher_lock:
+            if _publisher is None:
+                _publisher = LockerCommandPublisher()
+    return _publisher
+
+
+def publish_locker_command(locker_number, action, wait_ack=False, timeout=None, **extra):
+    return get_command_publisher().publish(locker_number, action, wait_ack=wait_ack, timeout=timeout, **extra)
@@ -0,0 +1,197 @@
+"""
+Penerbitan dan validasi OTP locker (`LockerOtp`).
+
+Lookup kode memakai partial unique index `code WHERE is_active`, jadi satu
+kode aktif selalu menunjuk tepat satu transaksi. Cache menyimpan
+kode -> (id, transaction_id, expires_at) sebagai jalur cepat; validasi
+tetap menandai OTP terpakai dengan satu UPDATE atomik di database.
+"""
+import logging
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction as db_transaction
+from django.utils import timezone
+
+from .models import LockerOtp
+
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = 'locker_otp:'
+ATTEMPTS_PREFIX = 'locker_otp_fail:'
+ISSUE_RETRIES = 10
+
+VALID = 'valid'
+INVALID = 'invalid'
+EXPIRED = 'expired'
+LOCKED = 'locked'
+
+
+def _cache_key(code):
+    return f'{CACHE_PREFIX}{code}'
+
+
+def _ttl():
+    return timedelta(hours=getattr(settings, 'LOCKER_OTP_TTL_HOURS', 6))
+
+
+def generate_code():
+    return f'{secrets.randbelow(1000000):06d}'
+
+
+def issue_otp(transaction, ttl=None):
+    """
+    Buat OTP baru untuk transaksi; OTP aktif sebelumnya dinonaktifkan.
+    Tabrakan dengan kode aktif lain diulang dengan kode baru.
+    """
+    expires_at = timezone.now() + (ttl or _ttl())
+    with db_transaction.atomic():
+        revoke_transaction_otps(transaction.id)
+        for _ in range(ISSUE_RETRIES):
+            code = generate_code()
+            try:
+                with db_transaction.atomic():
+                    otp = LockerOtp.objects.create(transaction=transaction, code=code, expires_at=expires_at)
+                break
+            except IntegrityError:
+                continue
+        else:
+            raise RuntimeError('Gagal membuat OTP unik')
+        transaction.otp = code
+        transaction.save(update_fields=['otp', 'updated_at'])
+
+    def _cache():
+        cache.set(
+            _cache_key(code),
+            {'id': otp.id, 'transaction_id': transaction.id, 'expires_at': expires_at.timestamp()},
+            timeout=max(1, int((expires_at - timezone.now()).total_seconds())),
+        )
+
+    db_transaction.on_commit(_cache)
+    return otp
+
+
+def revoke_transaction_otps(transaction_id):
+    codes = list(
+        LockerOtp.objects.filter(transaction_id=transaction_id, is_active=True).values_list('code', flat=True)
+    )
+    if codes:
+        LockerOtp.objects.filter(transaction_id=transaction_id, is_active=True).update(is_active=False)
+        cache.delete_many([_cache_key(code) for code in codes])
+    return len(codes)
+
+
+def find_active_otp(code):
+    """OTP aktif & belum kedaluwarsa untuk `code` tanpa menandainya terpakai."""
+    return LockerOtp.objects.filter(code=code, is_active=True, expires_at__gt=timezone.now()).first()
+
+
+def _mark_used(otp_id, now):
+    # UPDATE bersyarat: dua device yang memakai kode sama bersamaan hanya satu yang menang
+    return LockerOtp.objects.filter(pk=otp_id, is_active=True, expires_at__gt=now).update(
+        is_active=False, used_at=now,
+    )
+
+
+def _attempts_key(source):
+    return f'{ATTEMPTS_PREFIX}{source}'
+
+
+def _attempts_exhausted(source):
+    return cache.get(_attempts_key(source), 0) >= getattr(settings, 'LOCKER_OTP_MAX_ATTEMPTS', 5)
+
+
+def _record_failure(source):
+    # Jendela tetap sejak salah pertama; incr mempertahankan TTL key
+    key = _attempts_key(source)
+    window = getattr(settings, 'LOCKER_OTP_ATTEMPT_WINDOW_SECONDS', 900)
+    if cache.add(key, 1, timeout=window):
+        return
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=window)
+
+
+def consume_otp(code, source=None):
+    """
+    Validasi dan pakai OTP. Mengembalikan (status, LockerOtp|None) dengan
+    status VALID, INVALID, EXPIRED atau LOCKED.
+
+    `source` mengidentifikasi pemanggil (device/IP). Kode salah dihitung per
+    source; setelah `LOCKER_OTP_MAX_ATTEMPTS` dalam
+    `LOCKER_OTP_ATTEMPT_WINDOW_SECONDS` semua percobaan ditolak LOCKED
+    sampai jendela habis, jadi kode 6 digit tidak bisa ditebak beruntun.
+    """
+    if source is not None and _attempts_exhausted(source):
+        return LOCKED, None
+    result, otp = _consume(code)
+    if result == INVALID and source is not None:
+        _record_failure(source)
+    return result, otp
+
+
+def _consume(code):
+    now = timezone.now()
+    cached = cache.get(_cache_key(code))
+    if cached is not None:
+        cache.delete(_cache_key(code))
+        if cached['expires_at'] > now.timestamp() and _mark_used(cached['id'], now):
+            return VALID, LockerOtp.objects.select_related('transaction').get(pk=cached['id'])
+
+    otp = LockerOtp.objects.select_related('transaction').filter(code=code, is_active=True).first()
+    if otp is None:
+        return INVALID, None
+    if otp.expires_at <= now:
+        LockerOtp.objects.filter(pk=otp.pk).update(is_active=False)
+        return EXPIRED, otp
+    if _mark_used(otp.pk, now):
+        return VALID, otp
+    return INVALID, None
+
+
+def check_transaction_otp(transaction, code):
+    """
+    Cocokkan OTP untuk transaksi tertentu (alur buyer di aplikasi). Setiap
+    salah menambah `attempts`; setelah `LOCKER_OTP_MAX_ATTEMPTS` OTP dikunci.
+    """
+    otp = LockerOtp.objects.filter(transaction=transaction, is_active=True).first()
+    if otp is None:
+        return INVALID
+    if otp.expires_at <= timezone.now():
+        return EXPIRED
+    if otp.attempts >= getattr(settings, 'LOCKER_OTP_MAX_ATTEMPTS', 5):
+        return LOCKED
+    if not secrets.compare_digest(otp.code, str(code or '')):
+        LockerOtp.objects.filter(pk=otp.pk).update(attempts=otp.attempts + 1)
+        return INVALID
+    return VALID
+
+
+def sweep_expired_otps(batch_size=1000, retention_days=None):
+    """Nonaktifkan OTP kedaluwarsa dan hapus OTP nonaktif yang lebih tua dari retensi."""
+    retention_days = getattr(settings, 'LOCKER_OTP_RETENTION_DAYS', 30) if retention_days is None else retention_days
+    now = timezone.now()
+    expired = 0
+    while True:
+        ids = list(
+            LockerOtp.objects.filter(is_active=True, expires_at__lte=now).values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        expired += LockerOtp.objects.filter(id__in=ids).update(is_active=False)
+    deleted = 0
+    cutoff = now - timedelta(days=retention_days)
+    while True:
+        ids = list(
+            LockerOtp.objects.filter(is_active=False, expires_at__lt=cutoff).values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        deleted += LockerOtp.objects.filter(id__in=ids).delete()[0]
+    if expired or deleted:
+        logger.info("Locker OTP sweep: %d expired, %d deleted", expired, deleted)
+    return expired, deleted
@@ -10,3 +10,11 @@ def send_notification_task(user_id, message, title="SmartLocker Update"):
     time.sleep(1)
     push_notification_task(user_ids=[user_id], title=title, body=message)
     return f"Notification queued for user {user_id}"
+
+
+@shared_task
+def sweep_locker_otps_task(batch_size=1000):
+    from .otp import sweep_expired_otps
+
+    expired, deleted = sweep_expired_otps(batch_size=batch_size)
+    return {'expired': expired, 'deleted': deleted}
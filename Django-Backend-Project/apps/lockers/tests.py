@@ -1,3 +1,397 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
+from urllib.parse import urlsplit
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+import device_client
+from apps.iot.models import DeviceKey
+from apps.marketplace.models import Product, Store, Transaction
+from apps.package_center.models import PackageEntry
+from apps.users.models import User
+
+from .command_stream import stream_locker_requests
+from .device_views import hash_code
+from .models import Delivery, Locker, LockerOtp, LockerRequest
+from .mqtt_commands import LockerCommandPublisher, LockerCommandTimeout
+from . import otp as locker_otp
+
+
+class FakeMqttClient:
+    """Client paho palsu: langsung 'terhubung' dan bisa membalas ack seperti device."""
+
+    def __init__(self, client_id, reply=None, connect=True):
+        self.client_id = client_id
+        self.reply = reply
+        self.connect = connect
+        self.published = []
+        self.subscriptions = []
+        self.loop_started = 0
+
+    def reconnect_delay_set(self, **kwargs):
+        pass
+
+    def connect_async(self, host, port, keepalive=60):
+        pass
+
+    def loop_start(self):
+        self.loop_started += 1
+        if self.connect:
+            self.on_connect(self, None, {}, SimpleNamespace(is_failure=False), None)
+
+    def subscribe(self, topic, qos=0):
+        self.subscriptions.append((topic, qos))
+
+    def publish(self, topic, payload, qos=0):
+        self.published.append((topic, json.loads(payload), qos))
+        data = json.loads(payload)
+        if self.reply is not None:
+            ack = dict(self.reply, command_id=data['command_id'])
+            self.on_message(self, None, SimpleNamespace(topic='penlok/command/ack', payload=json.dumps(ack).encode()))
+        return SimpleNamespace(wait_for_publish=lambda timeout=None: None, is_published=lambda: True)
+
+
+def _publisher(**client_kwargs):
+    clients = []
+
+    def factory(client_id):
+        clients.append(FakeMqttClient(client_id, **client_kwargs))
+        return clients[-1]
+
+    return LockerCommandPublisher(host='broker', port=1883, client_factory=factory), clients
+
+
+class LockerCommandPublisherTests(SimpleTestCase):
+    def test_reuses_one_client_and_publishes_qos1(self):
+        publisher, clients = _publisher()
+        first = publisher.publish('1', 'open')
+        second = publisher.publish('2', 'open')
+
+        self.assertEqual(len(clients), 1)
+        self.assertEqual(clients[0].loop_started, 1)
+        self.assertIn(('penlok/command/ack', 1), clients[0].subscriptions)
+        topics = {(topic, qos) for topic, _, qos in clients[0].published}
+        self.assertEqual(topics, {('penlok/command', 1)})
+        self.assertNotEqual(first, second)
+        self.assertEqual(clients[0].published[0][1]['command_id'], first)
+
+    def test_wait_ack_returns_device_reply(self):
+        publisher, clients = _publisher(reply={'status': 'ok'})
+        reply = publisher.publish('0', 'open', wait_ack=True, timeout=1)
+
+        self.assertEqual(reply['status'], 'ok')
+        self.assertEqual(reply['command_id'], clients[0].published[0][1]['command_id'])
+        self.assertEqual(publisher._pending, {})
+
+    def test_wait_ack_times_out_without_reply(self):
+        publisher, _ = _publisher()
+        with self.assertRaises(LockerCommandTimeout):
+            publisher.publish('0', 'open', wait_ack=True, timeout=0.05)
+        self.assertEqual(publisher._pending, {})
+
+    def test_broker_unavailable_raises_timeout(self):
+        publisher, clients = _publisher(connect=False)
+        with self.assertRaises(LockerCommandTimeout):
+            publisher.publish('0', 'open', timeout=0.05)
+        self.assertEqual(clients[0].published, [])
+
+    def test_new_client_after_fork(self):
+        publisher, clients = _publisher()
+        publisher.publish('1', 'open')
+        with mock.patch('apps.lockers.mqtt_commands.os.getpid', return_value=-1):
+            publisher.publish('1', 'open')
+        self.assertEqual(len(clients), 2)
+
+
+@override_settings(MQTT_COMMAND_ACK_TIMEOUT=0.05)
+class VerifyDeliveryCommandTests(APITestCase):
+    def setUp(self):
+        self.courier = User.objects.create_user(
+            username='kurir', email='kurir@example.com', password='secret123', role=User.Role.COURIER,
+        )
+        self.locker = Locker.objects.create(number='0', type=Locker.LockerType.INBOUND, gpio_pin=19)
+        self.delivery = Delivery.objects.create(receipt_number='RESI-1', courier=self.courier, locker=self.locker)
+        self.client.force_authenticate(self.courier)
+
+    def test_locker_marked_occupied_after_ack(self):
+        with mock.patch('apps.lockers.views.publish_locker_command', return_value={'status': 'ok'}) as publish:
+            response = self.client.post(reverse('verify-delivery'), {'receipt_number': 'RESI-1'})
+
+        self.assertEqual(response.status_code, 200)
+        publish.assert_called_once_with('0', 'open', wait_ack=True)
+        self.locker.refresh_from_db()
+        self.assertEqual(self.locker.status, Locker.LockerStatus.OCCUPIED)
+
+    def test_ack_timeout_keeps_delivery_pending(self):
+        with mock.patch('apps.lockers.views.publish_locker_command', side_effect=LockerCommandTimeout('timeout')):
+            response = self.client.post(reverse('verify-delivery'), {'receipt_number': 'RESI-1'})
+
+        self.assertEqual(response.status_code, 504)
+        self.delivery.refresh_from_db()
+        self.assertEqual(self.delivery.status, Delivery.DeliveryStatus.PENDING)
+
+
+class FakeListener:
+    def __init__(self, on_wait):
+        self.on_wait = on_wait
+        self.closed = False
+
+    def wait(self, timeout):
+        self.on_wait()
+        return True
+
+    def close(self):
+        self.closed = True
+
+
+class TestClientSession:
+    """Pengganti requests.Session yang meneruskan request ke test client Django."""
+
+    def __init__(self, client, headers):
+        self.client = client
+        self.headers = dict(headers)
+
+    def post(self, url, headers=None, timeout=None):
+        merged = {**self.headers, **(headers or {})}
+        meta = {f"HTTP_{name.upper().replace('-', '_')}": value for name, value in merged.items()}
+        response = self.client.post(urlsplit(url).path, **meta)
+        response.raise_for_status = lambda: self._raise(response)
+        response.json = lambda: response.data
+        return response
+
+    @staticmethod
+    def _raise(response):
+        if response.status_code >= 400:
+            raise AssertionError(f'HTTP {response.status_code}')
+
+
+class LockerRequestStreamTests(APITestCase):
+    def test_stream_sends_pending_requests_after_last_event_id(self):
+        LockerRequest.objects.create(locker_number='1')
+        pending = LockerRequest.objects.create(locker_number='2')
+        LockerRequest.objects.create(locker_number='3', fulfilled=True)
+
+        with override_settings(LOCKER_STREAM_MAX_SECONDS=0):
+            response = self.client.get(
+                reverse('locker-request-stream'),
+                HTTP_ACCEPT='text/event-stream',
+                HTTP_LAST_EVENT_ID=str(pending.id - 1),
+            )
+            body = b''.join(response.streaming_content).decode()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertIn(f'id: {pending.id}\nevent: open\n', body)
+        self.assertEqual(body.count('event: open'), 1)
+
+    def test_notify_wakes_stream_for_new_request(self):
+        created = []
+        listener = FakeListener(lambda: created.append(LockerRequest.objects.create(locker_number='3')))
+        stream = stream_locker_requests(last_id=0, max_seconds=5, listener_factory=lambda: listener)
+
+        self.assertEqual(next(stream), 'retry: 1000\n\n')
+        event = next(stream)
+        stream.close()
+
+        self.assertIn(f'id: {created[0].id}', event)
+        self.assertIn('"locker_number": "3"', event)
+        self.assertTrue(listener.closed)
+
+    @override_settings(SSE_MAX_STREAMS_PER_PROCESS=1, LOCKER_STREAM_MAX_SECONDS=0)
+    def test_streams_beyond_process_limit_get_503_until_one_closes(self):
+        url = reverse('locker-request-stream')
+        first = self.client.get(url, HTTP_ACCEPT='text/event-stream')
+        busy = self.client.get(url, HTTP_ACCEPT='text/event-stream')
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(busy.status_code, 503)
+        self.assertEqual(busy['Retry-After'], '5')
+
+        first.close()
+        again = self.client.get(url, HTTP_ACCEPT='text/event-stream')
+        again.close()
+        self.assertEqual(again.status_code, 200)
+
+    @override_settings(SMARTLOCKER_DEVICE_TOKEN='rahasia')
+    def test_stream_requires_device_token(self):
+        response = self.client.get(reverse('locker-request-stream'), HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(response.status_code, 403)
+
+    def test_kiosk_fulfill_works_from_stream_session(self):
+        locker_request = LockerRequest.objects.create(locker_number='1')
+        # Header yang sama dengan session di cobaface.listen_locker_requests
+        session = TestClientSession(self.client, {'Accept': 'text/event-stream'})
+
+        result = device_client.fulfill_locker_request(session, locker_request.id, base_url='http://testserver')
+
+        self.assertEqual(result, {'status': 'ok', 'fulfilled': 1})
+        locker_request.refresh_from_db()
+        self.assertTrue(locker_request.fulfilled)
+
+    def test_fulfill_marks_older_requests_for_same_locker(self):
+        older = LockerRequest.objects.create(locker_number='1')
+        latest = LockerRequest.objects.create(locker_number='1')
+        other = LockerRequest.objects.create(locker_number='2')
+
+        response = self.client.post(reverse('locker-request-fulfill', args=[latest.id]))
+        again = self.client.post(reverse('locker-request-fulfill', args=[latest.id]))
+
+        self.assertEqual(response.data, {'status': 'ok', 'fulfilled': 2})
+        self.assertEqual(again.data['status'], 'already_fulfilled')
+        self.assertTrue(LockerRequest.objects.get(pk=older.pk).fulfilled)
+        self.assertFalse(LockerRequest.objects.get(pk=other.pk).fulfilled)
+
+
+class DeviceCodeVerificationTests(APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(
+            username='pemilik', email='pemilik@example.com', password='secret123', role=User.Role.OWNER,
+        )
+        self.buyer = User.objects.create_user(
+            username='pembeli', email='pembeli@example.com', password='secret123', role=User.Role.BUYER,
+        )
+        PackageEntry.objects.create(owner=self.owner, package_name='Paket', tracking_number='JNE0012345')
+        PackageEntry.objects.create(
+            owner=self.owner, package_name='Lama', tracking_number='JNE0099999', status=PackageEntry.Status.DELIVERED,
+        )
+        store = Store.objects.create(owner=self.owner, name='Toko')
+        product = Product.objects.create(
+            store=store, seller=self.owner, name='Barang', price=Decimal('10.00'), stock=1, description='-',
+        )
+        awaiting = Transaction.objects.create(
+            buyer=self.buyer, seller=self.owner, product=product, quantity=1, total_price=Decimal('10.00'),
+            status=Transaction.TransactionStatus.AWAITING_PICKUP,
+        )
+        released = Transaction.objects.create(
+            buyer=self.buyer, seller=self.owner, product=product, quantity=1, total_price=Decimal('10.00'),
+            status=Transaction.TransactionStatus.RELEASED,
+        )
+        expires_at = timezone.now() + timedelta(hours=1)
+        LockerOtp.objects.create(transaction=awaiting, code='123456', expires_at=expires_at)
+        LockerOtp.objects.create(transaction=released, code='654321', expires_at=expires_at, is_active=False)
+
+    def test_verify_tracking_suffix(self):
+        url = reverse('device-verify-tracking')
+        self.assertTrue(self.client.post(url, {'code': '12345'}).data['valid'])
+        self.assertFalse(self.client.post(url, {'code': '54321'}).data['valid'])
+        self.assertEqual(self.client.post(url, {'code': '123'}).status_code, 400)
+
+    def test_verify_otp(self):
+        url = reverse('device-verify-otp')
+        self.assertTrue(self.client.post(url, {'code': '123456'}).data['valid'])
+        self.assertFalse(self.client.post(url, {'code': '000000'}).data['valid'])
+
+    def test_pending_codes_are_hashed_and_exclude_closed_entries(self):
+        _, raw_key = DeviceKey.generate('kiosk-1')
+        data = self.client.get(reverse('device-pending-codes'), HTTP_X_DEVICE_TOKEN=raw_key).data
+
+        salt = data['salt']
+        self.assertEqual(data['tracking_suffixes'], [hash_code('12345', salt)])
+        self.assertNotIn('otps', data)
+        self.assertNotIn(hash_code('123456', salt), json.dumps(data))
+
+    @override_settings(SMARTLOCKER_DEVICE_TOKEN='rahasia')
+    def test_pending_codes_require_registered_device_key(self):
+        url = reverse('device-pending-codes')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get(url, HTTP_X_DEVICE_TOKEN='rahasia').status_code, 403)
+
+    @override_settings(SMARTLOCKER_DEVICE_TOKEN=None)
+    def test_pending_codes_closed_without_token_in_development(self):
+        self.assertEqual(self.client.get(reverse('device-pending-codes')).status_code, 403)
+
+    @override_settings(SMARTLOCKER_DEVICE_TOKEN='rahasia')
+    def test_device_token_required(self):
+        response = self.client.post(reverse('device-verify-otp'), {'code': '123456'})
+        self.assertEqual(response.status_code, 403)
+        response = self.client.post(reverse('device-verify-otp'), {'code': '123456'}, HTTP_X_DEVICE_TOKEN='rahasia')
+        self.assertTrue(response.data['valid'])
+
+
+class LockerOtpTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user(
+            username='penjual', email='penjual@example.com', password='secret123', role=User.Role.OWNER,
+        )
+        self.buyer = User.objects.create_user(
+            username='pembeli', email='pembeli@example.com', password='secret123', role=User.Role.BUYER,
+        )
+        store = Store.objects.create(owner=self.seller, name='Toko')
+        self.product = Product.objects.create(
+            store=store, seller=self.seller, name='Barang', price=Decimal('10.00'), stock=1, description='-',
+        )
+        self.transaction = self._transaction()
+
+    def _transaction(self):
+        return Transaction.objects.create(
+            buyer=self.buyer, seller=self.seller, product=self.product, quantity=1, total_price=Decimal('10.00'),
+            status=Transaction.TransactionStatus.AWAITING_PICKUP,
+        )
+
+    def test_issue_replaces_previous_otp_and_retries_collisions(self):
+        other = self._transaction()
+        with mock.patch.object(locker_otp, 'generate_code', side_effect=['111111', '111111', '222222']):
+            locker_otp.issue_otp(other)
+            first = locker_otp.issue_otp(self.transaction)
+        self.assertEqual(first.code, '222222')
+
+        second = locker_otp.issue_otp(self.transaction)
+        self.transaction.refresh_from_db()
+        self.assertEqual(self.transaction.otp, second.code)
+        self.assertEqual(LockerOtp.objects.filter(transaction=self.transaction, is_active=True).count(), 1)
+
+    def test_validate_view_consumes_otp_once(self):
+        code = locker_otp.issue_otp(self.transaction).code
+        url = reverse('locker-otp-validate')
+        with mock.patch('apps.lockers.views.push_notification_task'):
+            first = self.client.post(url, {'otp': code})
+            second = self.client.post(url, {'otp': code})
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.data['transaction_id'], self.transaction.id)
+        self.assertEqual(second.status_code, 400)
+        self.assertEqual(second.data['status'], locker_otp.INVALID)
+        self.transaction.refresh_from_db()
+        self.assertEqual(self.transaction.status, Transaction.TransactionStatus.RELEASED)
+
+    def test_expired_otp_is_rejected_and_swept(self):
+        otp = locker_otp.issue_otp(self.transaction, ttl=timedelta(hours=1))
+        LockerOtp.objects.filter(pk=otp.pk).update(expires_at=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(locker_otp.consume_otp(otp.code)[0], locker_otp.EXPIRED)
+
+        stale = locker_otp.issue_otp(self._transaction())
+        LockerOtp.objects.filter(pk=stale.pk).update(expires_at=timezone.now() - timedelta(days=40))
+        self.assertEqual(locker_otp.sweep_expired_otps(), (1, 1))
+        self.assertFalse(LockerOtp.objects.filter(pk=stale.pk).exists())
+
+    @override_settings(LOCKER_OTP_MAX_ATTEMPTS=2)
+    def test_transaction_otp_locks_after_failed_attempts(self):
+        code = locker_otp.issue_otp(self.transaction).code
+        wrong = '000000' if code != '000000' else '111111'
+        self.assertEqual(locker_otp.check_transaction_otp(self.transaction, wrong), locker_otp.INVALID)
+        self.assertEqual(locker_otp.check_transaction_otp(self.transaction, wrong), locker_otp.INVALID)
+        self.assertEqual(locker_otp.check_transaction_otp(self.transaction, code), locker_otp.LOCKED)
+
+    @override_settings(LOCKER_OTP_MAX_ATTEMPTS=2)
+    def test_validate_view_locks_source_after_failed_attempts(self):
+        code = locker_otp.issue_otp(self.transaction).code
+        wrong = '000000' if code != '000000' else '111111'
+        url = reverse('locker-otp-validate')
+        with mock.patch('apps.lockers.views.push_notification_task'):
+            for _ in range(2):
+                response = self.client.post(url, {'otp': wrong}, REMOTE_ADDR='10.0.0.1')
+                self.assertEqual(response.data['status'], locker_otp.INVALID)
+            locked = self.client.post(url, {'otp': code}, REMOTE_ADDR='10.0.0.1')
+            other = self.client.post(url, {'otp': code}, REMOTE_ADDR='10.0.0.2')
+
+        self.assertEqual(locked.status_code, 400)
+        self.assertEqual(locked.data['status'], locker_otp.LOCKED)
+        self.assertEqual(other.status_code, 200)
@@ -1,7 +1,10 @@
 from django.urls import path
+from .device_views import DevicePendingCodesView, DeviceVerifyOtpView, DeviceVerifyTrackingView
 from .views import (
     ConfirmDepositWebhookView,
     LockerLogListView,
+    LockerRequestFulfillView,
+    LockerRequestStreamView,
     OpenStorageLockerView,
     ValidateOtpView,
     VerifyDeliveryView,
@@ -12,6 +15,11 @@ urlpatterns = [
     path('inbound/confirm-deposit/', ConfirmDepositWebhookView.as_view(), name='confirm-deposit-webhook'),
     path('storage/open/', OpenStorageLockerView.as_view(), name='open-storage-locker'),
     path('storage/open/<int:locker_slot>/', OpenStorageLockerView.as_view(), name='open-storage-locker-slot'),
+    path('requests/stream/', LockerRequestStreamView.as_view(), name='locker-request-stream'),
+    path('requests/<int:request_id>/fulfill/', LockerRequestFulfillView.as_view(), name='locker-request-fulfill'),
     path('logs/', LockerLogListView.as_view(), name='locker-logs'),
+    path('device/verify-tracking/', DeviceVerifyTrackingView.as_view(), name='device-verify-tracking'),
+    path('device/verify-otp/', DeviceVerifyOtpView.as_view(), name='device-verify-otp'),
+    path('device/pending-codes/', DevicePendingCodesView.as_view(), name='device-pending-codes'),
     path('otp/validate/', ValidateOtpView.as_view(), name='locker-otp-validate'),
 ]
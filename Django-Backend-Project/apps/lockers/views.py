@@ -1,16 +1,22 @@
-from django.conf import settings
+from django.utils import timezone
 from drf_spectacular.utils import OpenApiResponse, extend_schema
 from rest_framework import generics, permissions, status
-from rest_framework.exceptions import PermissionDenied
 from rest_framework.response import Response
+from rest_framework.throttling import BaseThrottle
 from rest_framework.views import APIView
 
-from apps.iot.models import IoTEvent
+from apps.iot.models import DeviceKey, IoTEvent
+from apps.iot.views import DeviceAPIView
 from apps.marketplace.models import Transaction
 from apps.notifications.tasks import push_notification_task
 from apps.users.models import User
+from smartlocker.pagination import TimestampCursorPagination
+from smartlocker.streaming import event_stream_response
 
+from .command_stream import EventStreamRenderer, stream_locker_requests
 from .models import Delivery, Locker, LockerLog, LockerRequest
+from .otp import VALID, consume_otp
+from .mqtt_commands import LockerCommandError, LockerCommandTimeout, publish_locker_command
 from .permissions import IsCourierUser
 from .serializers import LockerLogSerializer, OtpValidationSerializer
 from .services import BlynkAPIService
@@ -37,8 +43,8 @@ class VerifyDeliveryView(APIView):
             if gpio_pin is None:
                 raise ValueError(f"GPIO pin for inbound locker {inbound_locker.number} is not configured.")
             
-            # Panggil fungsi untuk membuka loker via GPIO
-            _publish_mqtt_command(inbound_locker.number, "open")
+            # Kirim perintah buka via MQTT dan tunggu ack dari device sebelum status diubah
+            publish_locker_command(inbound_locker.number, "open", wait_ack=True)
             # --- AKHIR LOGIKA BARU ---
             
             delivery.status = Delivery.DeliveryStatus.VERIFIED
@@ -59,6 +65,10 @@ class VerifyDeliveryView(APIView):
 
         except Delivery.DoesNotExist:
             return Response({'error': 'Invalid or already processed receipt number.'}, status=status.HTTP_404_NOT_FOUND)
+        except LockerCommandTimeout as e:
+            return Response({'error': str(e)}, status=status.HTTP_504_GATEWAY_TIMEOUT)
+        except LockerCommandError as e:
+            return Response({'error': str(e)}, status=status.HTTP_502_BAD_GATEWAY)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -156,6 +166,7 @@ class OpenStorageLockerView(APIView):
 class LockerLogListView(generics.ListAPIView):
     serializer_class = LockerLogSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = TimestampCursorPagination
 
     def get_queryset(self):
         queryset = LockerLog.objects.select_related('locker', 'user')
@@ -168,28 +179,26 @@ class LockerLogListView(generics.ListAPIView):
         return queryset.filter(user=user)
 
 
-def _require_device_token(request):
-    expected = getattr(settings, 'SMARTLOCKER_DEVICE_TOKEN', None)
-    if not expected:
-        return
-    provided = request.headers.get('X-Device-Token')
-    if provided != expected:
-        raise PermissionDenied('Invalid device token')
+def _otp_source(request):
+    # DeviceKey terdaftar dihitung per device; token legacy/development per IP client
+    device_key = request.auth
+    if isinstance(device_key, DeviceKey) and device_key.pk is not None:
+        return f'device:{device_key.prefix}'
+    return f'ip:{BaseThrottle().get_ident(request)}'
 
 
-class ValidateOtpView(APIView):
-    permission_classes = [permissions.AllowAny]
+class ValidateOtpView(DeviceAPIView):
 
     @extend_schema(request=OtpValidationSerializer, responses={'200': OpenApiResponse(description='OTP validation success')})
     def post(self, request, *args, **kwargs):
-        _require_device_token(request)
         serializer = OtpValidationSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         otp_code = serializer.validated_data['otp']
 
-        transaction = Transaction.objects.filter(otp=otp_code).order_by('-updated_at').first()
-        if not transaction:
-            return Response({'status': 'invalid'}, status=status.HTTP_400_BAD_REQUEST)
+        result, otp = consume_otp(otp_code, source=_otp_source(request))
+        if result != VALID:
+            return Response({'status': result}, status=status.HTTP_400_BAD_REQUEST)
+        transaction = otp.transaction
 
         if transaction.status != Transaction.TransactionStatus.RELEASED:
             transaction.status = Transaction.TransactionStatus.RELEASED
@@ -218,4 +227,41 @@ class ValidateOtpView(APIView):
             'status': 'ok',
             'transaction_id': transaction.id,
             'event_id': event.id,
-        }, status=status.HTTP_200_OK)
\ No newline at end of file
+        }, status=status.HTTP_200_OK)
+
+
+@extend_schema(exclude=True)
+class LockerRequestStreamView(DeviceAPIView):
+    """
+    Stream SSE permintaan buka locker untuk device kiosk. Event `open` berisi
+    id request dan nomor locker; device mengirim header `Last-Event-ID` saat
+    tersambung ulang agar request yang sudah diterima tidak dikirim dua kali.
+    """
+    renderer_classes = [EventStreamRenderer]
+
+    def get(self, request, *args, **kwargs):
+        last_id = request.headers.get('Last-Event-ID') or request.query_params.get('last_id') or 0
+        try:
+            last_id = int(last_id)
+        except (TypeError, ValueError):
+            last_id = 0
+        return event_stream_response(stream_locker_requests(last_id))
+
+
+@extend_schema(exclude=True)
+class LockerRequestFulfillView(DeviceAPIView):
+    """Device menandai request (dan request lebih lama untuk locker yang sama) sudah dibuka."""
+
+    def post(self, request, request_id, *args, **kwargs):
+        locker_request = LockerRequest.objects.filter(pk=request_id).only('id', 'locker_number').first()
+        if locker_request is None:
+            return Response({'error': 'Locker request not found.'}, status=status.HTTP_404_NOT_FOUND)
+        updated = LockerRequest.objects.filter(
+            locker_number=locker_request.locker_number,
+            fulfilled=False,
+            id__lte=locker_request.id,
+        ).update(fulfilled=True, fulfilled_at=timezone.now())
+        return Response({
+            'status': 'ok' if updated else 'already_fulfilled',
+            'fulfilled': updated,
+        }, status=status.HTTP_200_OK)
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0010_product_seller_and_transaction_seller'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('otp__isnull', False)), fields=['otp'], name='transaction_otp_idx'),
+        ),
+    ]
@@ -66,3 +66,8 @@ class Transaction(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['otp'], condition=models.Q(otp__isnull=False), name='transaction_otp_idx'),
+            models.Index(fields=['buyer', '-created_at', '-id'], name='transaction_buyer_feed_idx'),
+            models.Index(fields=['seller', '-created_at', '-id'], name='transaction_seller_feed_idx'),
+        ]
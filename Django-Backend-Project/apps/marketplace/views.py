@@ -1,5 +1,4 @@
 import random
-import string
 from datetime import timedelta
 
 from django.contrib.auth import get_user_model
@@ -25,9 +24,11 @@ from .serializers import (
 from .permissions import IsStoreOwner
 from .services import PaymentGatewayService
 from apps.lockers.models import Locker
+from apps.lockers.otp import VALID, check_transaction_otp, issue_otp, revoke_transaction_otps
 from apps.lockers.services import BlynkAPIService
 from apps.notifications.tasks import push_notification_task
 from apps.users.permissions import IsOwner, IsBuyer
+from smartlocker.pagination import FeedCursorPagination
 
 User = get_user_model()
 
@@ -360,7 +361,7 @@ class BuyerRetrieveItemView(APIView):
         transaction = get_object_or_404(Transaction, id=request.data.get('transaction_id'))
         if request.user != transaction.buyer or transaction.status != Transaction.TransactionStatus.AWAITING_PICKUP:
             return Response({"error": "Action not allowed."}, status=status.HTTP_403_FORBIDDEN)
-        if transaction.otp != request.data.get('otp'):
+        if check_transaction_otp(transaction, request.data.get('otp')) != VALID:
             return Response({"error": "Action not allowed or invalid OTP."}, status=status.HTTP_403_FORBIDDEN)
 
         locker = Locker.objects.filter(type=Locker.LockerType.MARKETPLACE, status=Locker.LockerStatus.OCCUPIED).first()
@@ -382,6 +383,7 @@ class ConfirmMarketplaceRetrievalWebhookView(APIView):
                 transaction.status = Transaction.TransactionStatus.RELEASED
                 transaction.otp = None
                 transaction.save(update_fields=['status', 'otp'])
+                revoke_transaction_otps(transaction.id)
                 locker = Locker.objects.filter(type=Locker.LockerType.MARKETPLACE, status=Locker.LockerStatus.OCCUPIED).first()
                 if locker:
                     locker.status = Locker.LockerStatus.AVAILABLE
@@ -412,6 +414,7 @@ def _ensure_participant(user, transaction: Transaction):
 class TransactionListView(generics.ListAPIView):
     serializer_class = TransactionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = FeedCursorPagination
 
     def get_permissions(self):
         role = (self.request.query_params.get('role') or '').lower()
@@ -544,11 +547,11 @@ class TransactionGenerateOtpView(APIView):
     def post(self, request, pk):
         transaction = get_object_or_404(Transaction, pk=pk)
         _ensure_seller(request.user, transaction)
-        otp = ''.join(random.choices(string.digits, k=6))
-        transaction.otp = otp
         transaction.status = Transaction.TransactionStatus.AWAITING_PICKUP
         transaction.payment_expires_at = timezone.now() + timedelta(hours=6)
-        transaction.save(update_fields=['otp', 'status', 'payment_expires_at', 'updated_at'])
+        transaction.save(update_fields=['status', 'payment_expires_at', 'updated_at'])
+        # OTP unik di antara OTP aktif, kedaluwarsa setelah LOCKER_OTP_TTL_HOURS
+        otp = issue_otp(transaction).code
 
         push_notification_task(
             user_ids=[transaction.buyer_id],
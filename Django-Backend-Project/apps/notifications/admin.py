@@ -1,10 +1,26 @@
 from django.contrib import admin
 
-from .models import Notification
+from .models import Notification, NotificationCounter, NotificationMessage
+
+
+@admin.register(NotificationMessage)
+class NotificationMessageAdmin(admin.ModelAdmin):
+    list_display = ('id', 'title', 'created_at')
+    search_fields = ('title', 'body')
+    list_filter = ('created_at',)
 
 
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
-    list_display = ('id', 'title', 'user', 'created_at')
-    search_fields = ('title', 'body', 'user__email')
+    list_display = ('id', 'message', 'user', 'created_at', 'read_at')
+    search_fields = ('message__title', 'user__email')
     list_filter = ('created_at',)
+    list_select_related = ('message', 'user')
+    raw_id_fields = ('message',)
+
+
+@admin.register(NotificationCounter)
+class NotificationCounterAdmin(admin.ModelAdmin):
+    list_display = ('user', 'unread')
+    search_fields = ('user__email',)
+    list_select_related = ('user',)
@@ -0,0 +1,96 @@
+"""
+Fan-out notifikasi ke banyak penerima (broadcast owner, push admin).
+
+Judul dan isi ditulis sekali sebagai NotificationMessage; setiap penerima
+hanya mendapat baris Notification ramping yang merujuk pesan tersebut.
+Id penerima divalidasi dengan `values_list` (tanpa memuat objek User) dan
+baris Notification ditulis per chunk berukuran tetap, jadi memori dan
+ukuran satu INSERT tidak tumbuh mengikuti jumlah penerima. Audiens besar
+dipecah oleh `push_notification_task` menjadi beberapa `fan_out_chunk_task`
+yang berjalan paralel di worker Celery.
+"""
+import logging
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from .models import Notification, NotificationMessage
+from .stream import publish_new_notifications
+from .unread import increment_unread
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FanOutStats:
+    requested: int = 0
+    created: int = 0
+    chunks: int = 0
+    seconds: float = 0.0
+
+    @property
+    def per_second(self):
+        return self.created / self.seconds if self.seconds else 0.0
+
+
+def chunk_size():
+    return getattr(settings, 'NOTIFICATION_FANOUT_CHUNK_SIZE', 1000)
+
+
+def split_chunks(user_ids, size=None):
+    size = size or chunk_size()
+    return [user_ids[index:index + size] for index in range(0, len(user_ids), size)]
+
+
+def existing_user_ids(user_ids, size=None):
+    """Id di `user_ids` yang benar-benar ada, divalidasi per chunk dengan `values_list`."""
+    User = get_user_model()
+    valid_ids = []
+    for chunk in split_chunks(user_ids, size):
+        valid_ids.extend(User.objects.filter(id__in=chunk).values_list('id', flat=True))
+    return valid_ids
+
+
+def create_message(title, body):
+    return NotificationMessage.objects.create(title=title, body=body)
+
+
+def fan_out_chunk(user_ids, message_id):
+    """Validasi satu chunk id lalu tulis baris penerimanya; mengembalikan jumlah baris."""
+    User = get_user_model()
+    valid_ids = list(User.objects.filter(id__in=user_ids).values_list('id', flat=True))
+    if not valid_ids:
+        return 0
+    with transaction.atomic():
+        Notification.objects.bulk_create([
+            Notification(user_id=user_id, message_id=message_id) for user_id in valid_ids
+        ])
+        increment_unread(valid_ids)
+    publish_new_notifications(valid_ids)
+    return len(valid_ids)
+
+
+def log_stats(stats, title):
+    logger.info(
+        "Notification fan-out '%s': %d/%d recipients in %d chunks, %.3fs (%.0f rows/s)",
+        title, stats.created, stats.requested, stats.chunks, stats.seconds, stats.per_second,
+    )
+
+
+def fan_out(user_ids, title, body, size=None):
+    """Fan-out inline per chunk di proses pemanggil."""
+    start = time.perf_counter()
+    stats = FanOutStats(requested=len(user_ids))
+    message = create_message(title, body)
+    for chunk in split_chunks(user_ids, size):
+        stats.created += fan_out_chunk(chunk, message.id)
+        stats.chunks += 1
+    if not stats.created:
+        message.delete()
+    stats.seconds = time.perf_counter() - start
+    log_stats(stats, title)
+    return stats
@@ -0,0 +1,59 @@
+# Backfill dipisah dari perubahan skema: di PostgreSQL UPDATE pada FK
+# deferrable meninggalkan trigger event yang tertunda, dan ALTER TABLE di
+# transaksi yang sama gagal ("pending trigger events").
+
+from django.db import migrations
+
+
+BATCH_SIZE = 1000
+
+
+def _batches(queryset, fields):
+    # Keyset per pk: satu query per batch, tanpa OFFSET
+    last_pk = 0
+    while True:
+        rows = list(queryset.filter(pk__gt=last_pk).order_by('pk').values(*fields)[:BATCH_SIZE])
+        if not rows:
+            return
+        yield rows
+        last_pk = rows[-1]['pk']
+
+
+def copy_messages(apps, schema_editor):
+    # Satu lintasan per batch: (title, body) yang sama dalam satu batch berbagi satu NotificationMessage
+    Notification = apps.get_model('notifications', 'Notification')
+    NotificationMessage = apps.get_model('notifications', 'NotificationMessage')
+    for rows in _batches(Notification.objects.all(), ('pk', 'title', 'body', 'created_at')):
+        groups = {}
+        for row in rows:
+            groups.setdefault((row['title'], row['body']), []).append(row)
+        messages = NotificationMessage.objects.bulk_create([
+            NotificationMessage(title=title, body=body) for title, body in groups
+        ])
+        deliveries = []
+        for message, members in zip(messages, groups.values()):
+            # auto_now_add mengisi waktu migrasi; samakan dengan notifikasi tertua
+            message.created_at = min(row['created_at'] for row in members)
+            deliveries.extend(Notification(pk=row['pk'], message_id=message.pk) for row in members)
+        NotificationMessage.objects.bulk_update(messages, ['created_at'])
+        Notification.objects.bulk_update(deliveries, ['message'])
+
+
+def copy_messages_back(apps, schema_editor):
+    Notification = apps.get_model('notifications', 'Notification')
+    for rows in _batches(Notification.objects.all(), ('pk', 'message__title', 'message__body')):
+        Notification.objects.bulk_update(
+            [Notification(pk=row['pk'], title=row['message__title'], body=row['message__body']) for row in rows],
+            ['title', 'body'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0003_notificationmessage'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_messages, copy_messages_back),
+    ]
@@ -2,18 +2,61 @@ from django.conf import settings
 from django.db import models
 
 
+class NotificationMessage(models.Model):
+    """Isi notifikasi; satu baris dipakai bersama oleh semua penerima satu fan-out."""
+
+    title = models.CharField(max_length=255)
+    body = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.title
+
+
 class Notification(models.Model):
+    """Baris per penerima: referensi ke pesan dan status baca."""
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
         related_name='notifications',
     )
-    title = models.CharField(max_length=255)
-    body = models.TextField()
+    message = models.ForeignKey(
+        NotificationMessage,
+        on_delete=models.CASCADE,
+        related_name='deliveries',
+    )
     created_at = models.DateTimeField(auto_now_add=True)
+    read_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='notification_user_feed_idx'),
+        ]
+
+    @property
+    def title(self):
+        return self.message.title
+
+    @property
+    def body(self):
+        return self.message.body
+
+    def __str__(self):
+        return f"{self.message.title} -> {self.user}"
+
+
+class NotificationCounter(models.Model):
+    """Jumlah notifikasi belum dibaca per user, agar badge tidak perlu COUNT ke tabel notifikasi."""
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='notification_counter',
+    )
+    unread = models.PositiveIntegerField(default=0)
 
     def __str__(self):
-        return f"{self.title} -> {self.user}"
+        return f"{self.user}: {self.unread}"
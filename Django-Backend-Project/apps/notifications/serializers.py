@@ -4,9 +4,12 @@ from .models import Notification
 
 
 class NotificationSerializer(serializers.ModelSerializer):
+    title = serializers.CharField(source='message.title', read_only=True)
+    body = serializers.CharField(source='message.body', read_only=True)
+
     class Meta:
         model = Notification
-        fields = ['id', 'title', 'body', 'created_at']
+        fields = ['id', 'title', 'body', 'created_at', 'read_at']
 
 
 class NotificationPushSerializer(serializers.Serializer):
@@ -0,0 +1,37 @@
+import threading
+from collections import Counter
+
+from django.db.models.signals import post_delete, pre_delete
+from django.dispatch import receiver
+
+from .models import Notification
+from .unread import decrement_unread_many
+
+
+# Satu delete() (termasuk CASCADE dari pesan/user dan aksi delete di admin)
+# mengirim semua pre_delete lalu semua post_delete dalam satu transaksi.
+# Jumlah belum-dibaca dikumpulkan per user di pre_delete dan diterapkan
+# sekali saat post_delete terakhir dari delete() yang sama (`origin`).
+_pending = threading.local()
+
+
+@receiver(pre_delete, sender=Notification)
+def collect_deleted_unread(sender, instance: Notification, origin=None, **kwargs):
+    state = getattr(_pending, 'state', None)
+    if state is None or state['origin'] is not origin:
+        # delete() sebelumnya gagal di tengah jalan: reconcile_unread yang merapikan
+        state = _pending.state = {'origin': origin, 'remaining': 0, 'unread': Counter()}
+    state['remaining'] += 1
+    if instance.read_at is None:
+        state['unread'][instance.user_id] += 1
+
+
+@receiver(post_delete, sender=Notification)
+def forget_deleted_unread(sender, instance: Notification, origin=None, **kwargs):
+    state = getattr(_pending, 'state', None)
+    if state is None or state['origin'] is not origin:
+        return
+    state['remaining'] -= 1
+    if not state['remaining']:
+        _pending.state = None
+        decrement_unread_many(state['unread'])
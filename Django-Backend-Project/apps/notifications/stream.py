@@ -0,0 +1,179 @@
+"""
+Stream notifikasi real-time per user (pengganti polling `GET /api/v1/notifications/`).
+
+`push_notification_task` mem-publish sinyal ke channel Redis
+`notifications:user:<id>` setelah baris notifikasi tersimpan. Endpoint SSE
+subscribe ke channel user tersebut lalu mengambil notifikasi dengan id lebih
+besar dari event terakhir. Isi notifikasi selalu dibaca dari database, jadi
+pesan pub/sub yang hilang tidak membuat notifikasi hilang. Tanpa Redis stream
+kembali ke polling database. Koneksi database dilepas selama menunggu sinyal,
+dan stream dilayani pool thread service `stream` (lihat smartlocker/streaming.py).
+
+Id dialokasikan saat INSERT, bukan saat commit, jadi notifikasi dengan id
+lebih kecil bisa terlihat setelah id yang lebih besar terkirim. Karena itu
+setiap scan juga mengambil ulang notifikasi `NOTIFICATION_STREAM_RESCAN_SECONDS`
+terakhir dan melewati id yang sudah dikirim di koneksi ini. Setelah
+tersambung ulang, notifikasi di jendela itu bisa terkirim dua kali; client
+menyaring berdasarkan `id` notifikasi.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.lockers.command_stream import sse_event
+from smartlocker.redis_client import get_redis
+from smartlocker.streaming import release_db_connections
+
+from .models import Notification
+from .serializers import NotificationSerializer
+
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+
+
+def user_channel(user_id):
+    return f'notifications:user:{user_id}'
+
+
+def _publish(user_ids):
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        pipe = client.pipeline(transaction=False)
+        for user_id in user_ids:
+            pipe.publish(user_channel(user_id), 'new')
+        pipe.execute()
+    except Exception as exc:
+        logger.warning("Notification pub/sub unavailable, streams will catch up by polling: %s", exc)
+
+
+def publish_new_notifications(user_ids):
+    """Kirim sinyal ke stream para penerima setelah transaksi commit."""
+    user_ids = list(user_ids)
+    if user_ids:
+        transaction.on_commit(lambda: _publish(user_ids))
+
+
+def latest_notification_id(user_id):
+    return Notification.objects.filter(user_id=user_id).order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def new_notifications(user_id, after_id=0, since=None, exclude_ids=()):
+    """Notifikasi dengan id > `after_id` ditambah yang dibuat sejak `since`, kecuali `exclude_ids`."""
+    condition = Q(id__gt=after_id)
+    if since is not None:
+        condition |= Q(created_at__gte=since)
+    queryset = (
+        Notification.objects.filter(condition, user_id=user_id)
+        .exclude(id__in=list(exclude_ids))
+        .select_related('message')
+        .order_by('id')[:BATCH_SIZE]
+    )
+    return NotificationSerializer(queryset, many=True).data
+
+
+class NotificationSubscriber:
+    """Satu koneksi pub/sub Redis yang subscribe ke channel seorang user."""
+
+    def __init__(self, client, user_id):
+        self.pubsub = client.pubsub(ignore_subscribe_messages=True)
+        self.pubsub.subscribe(user_channel(user_id))
+
+    def wait(self, timeout):
+        """True jika ada sinyal dalam `timeout` detik."""
+        notified = self.pubsub.get_message(timeout=timeout) is not None
+        # Kosongkan sinyal yang menumpuk; satu query mengambil semuanya
+        while self.pubsub.get_message(timeout=0) is not None:
+            notified = True
+        return notified
+
+    def close(self):
+        try:
+            self.pubsub.close()
+        except Exception:
+            pass
+
+
+def open_subscriber(user_id):
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        return NotificationSubscriber(client, user_id)
+    except Exception as exc:
+        logger.warning("Notification pub/sub unavailable, falling back to polling: %s", exc)
+        return None
+
+
+def stream_notifications(user_id, last_id=None, max_seconds=None, heartbeat=None, poll_interval=None, subscriber_factory=open_subscriber):
+    """
+    Generator SSE untuk satu user. Tanpa `last_id` stream mulai dari
+    notifikasi terbaru (daftar awal diambil app lewat endpoint list);
+    dengan `Last-Event-ID` notifikasi yang terlewat saat terputus dikirim
+    ulang lebih dulu.
+    """
+    max_seconds = getattr(settings, 'NOTIFICATION_STREAM_MAX_SECONDS', 300) if max_seconds is None else max_seconds
+    heartbeat = getattr(settings, 'NOTIFICATION_STREAM_HEARTBEAT', 15) if heartbeat is None else heartbeat
+    poll_interval = getattr(settings, 'NOTIFICATION_STREAM_POLL_INTERVAL', 5) if poll_interval is None else poll_interval
+
+    rescan = timedelta(seconds=getattr(settings, 'NOTIFICATION_STREAM_RESCAN_SECONDS', 30))
+
+    deadline = time.monotonic() + max_seconds
+    # Subscribe sebelum membaca database agar notifikasi di antara keduanya tidak terlewat
+    subscriber = subscriber_factory(user_id)
+    # id -> waktu kirim; hanya id di jendela rescan yang perlu diingat.
+    # Notifikasi `Last-Event-ID` sendiri pasti sudah diterima client.
+    sent = {last_id: timezone.now()} if last_id else {}
+    if last_id is None:
+        last_id = latest_notification_id(user_id)
+        # Yang sudah terlihat sekarang sudah ada di daftar awal yang diambil app
+        now = timezone.now()
+        sent = dict.fromkeys(
+            Notification.objects.filter(user_id=user_id, id__lte=last_id, created_at__gte=now - rescan)
+            .values_list('id', flat=True),
+            now,
+        )
+    wait_seconds = heartbeat if subscriber else poll_interval
+    last_write = time.monotonic()
+    yield 'retry: 3000\n\n'
+    try:
+        while True:
+            since = timezone.now() - rescan
+            sent = {notification_id: sent_at for notification_id, sent_at in sent.items() if sent_at >= since}
+            items = new_notifications(user_id, last_id, since, sent)
+            while items:
+                for item in items:
+                    sent[item['id']] = timezone.now()
+                    last_id = max(last_id, item['id'])
+                    # Id event = posisi resume (id terbesar terkirim), bukan id notifikasi yang terlambat
+                    yield sse_event(item, event='notification', event_id=last_id)
+                last_write = time.monotonic()
+                items = new_notifications(user_id, last_id, since, sent) if len(items) == BATCH_SIZE else []
+            release_db_connections()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if subscriber:
+                try:
+                    subscriber.wait(min(wait_seconds, remaining))
+                except Exception as exc:
+                    logger.warning("Notification pub/sub connection lost, falling back to polling: %s", exc)
+                    subscriber.close()
+                    subscriber = None
+                    wait_seconds = poll_interval
+            else:
+                time.sleep(min(wait_seconds, remaining))
+            if time.monotonic() - last_write >= heartbeat:
+                last_write = time.monotonic()
+                yield ': keepalive\n\n'
+    finally:
+        if subscriber:
+            subscriber.close()
@@ -1,10 +1,15 @@
 import logging
+import time
 from typing import Iterable, Optional
 
-from celery import shared_task
-from django.contrib.auth import get_user_model
+from celery import group, shared_task
+from django.conf import settings
+from django.db import transaction
 
-from .models import Notification
+from .fanout import (
+    FanOutStats, create_message, existing_user_ids, fan_out, fan_out_chunk, log_stats, split_chunks,
+)
+from .unread import reconcile_unread
 
 
 logger = logging.getLogger(__name__)
@@ -27,20 +32,45 @@ def push_notification_task(user_ids: Optional[Iterable[int]] = None, title: str
         logger.warning("Notification skipped because no recipients were provided: %s", title)
         return 'no_recipients'
 
-    User = get_user_model()
-    users = list(User.objects.filter(id__in=user_ids))
-    if not users:
-        logger.warning("Notification recipients %s not found", user_ids)
-        return 'users_not_found'
+    if len(user_ids) > getattr(settings, 'NOTIFICATION_FANOUT_PARALLEL_THRESHOLD', 5000):
+        # Validasi dulu agar pesan tidak tertinggal tanpa penerima
+        valid_ids = existing_user_ids(user_ids)
+        if not valid_ids:
+            logger.warning("Notification recipients not found for: %s", title)
+            return 'users_not_found'
+        chunks = split_chunks(valid_ids)
+        message = create_message(title, body)
+        signatures = [fan_out_chunk_task.s(chunk, message.id) for chunk in chunks]
+        transaction.on_commit(lambda: group(signatures).apply_async())
+        logger.info("Notification fan-out '%s' split into %d parallel chunks for %d recipients", title, len(chunks), len(valid_ids))
+        return 'notification_dispatched'
 
-    Notification.objects.bulk_create([
-        Notification(user=user, title=title, body=body) for user in users
-    ])
-    logger.info("Notification queued for users %s: %s", [user.id for user in users], title)
+    stats = fan_out(user_ids, title, body)
+    if not stats.created:
+        logger.warning("Notification recipients not found for: %s", title)
+        return 'users_not_found'
     # Hook for FCM/email integrations can be added here using metadata.
     return 'notification_created'
 
 
+@shared_task
+def fan_out_chunk_task(user_ids: list[int], message_id: int):
+    start = time.perf_counter()
+    stats = FanOutStats(requested=len(user_ids), chunks=1)
+    stats.created = fan_out_chunk(user_ids, message_id)
+    stats.seconds = time.perf_counter() - start
+    log_stats(stats, f'message {message_id}')
+    return stats.created
+
+
+@shared_task
+def reconcile_unread_counters_task():
+    fixed = reconcile_unread()
+    if fixed:
+        logger.warning("Corrected %d notification unread counters", fixed)
+    return fixed
+
+
 @shared_task
 def noop_notifications_task():
     return 'notifications ready'
@@ -0,0 +1,282 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from apps.users.models import User
+
+from . import tasks as notification_tasks
+from .fanout import fan_out
+from .models import Notification, NotificationCounter, NotificationMessage
+from .stream import stream_notifications
+from .tasks import push_notification_task, reconcile_unread_counters_task
+from .unread import decrement_unread_many, mark_read
+
+
+def notify(user, title, body='-'):
+    return Notification.objects.create(user=user, message=NotificationMessage.objects.create(title=title, body=body))
+
+
+class FakeSubscriber:
+    """Pengganti pub/sub Redis: menjalankan `on_wait` lalu melapor ada sinyal."""
+
+    def __init__(self, on_wait):
+        self.on_wait = on_wait
+        self.closed = False
+
+    def wait(self, timeout):
+        self.on_wait()
+        return True
+
+    def close(self):
+        self.closed = True
+
+
+class NotificationFeedPaginationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='pembeli', email='pembeli@example.com', password='secret123', role=User.Role.BUYER,
+        )
+        other = User.objects.create_user(
+            username='lain', email='lain@example.com', password='secret123', role=User.Role.BUYER,
+        )
+        base = timezone.now() - timedelta(hours=1)
+        self.notifications = []
+        for index in range(5):
+            notification = notify(self.user, f'N{index}')
+            # created_at auto_now_add; dua notifikasi terakhir sengaja diberi waktu yang sama
+            created_at = base + timedelta(minutes=min(index, 3))
+            Notification.objects.filter(pk=notification.pk).update(created_at=created_at)
+            notification.created_at = created_at
+            self.notifications.append(notification)
+        notify(other, 'Bukan milik user')
+        self.client.force_authenticate(self.user)
+        self.url = reverse('notifications-list')
+
+    def test_cursor_pages_cover_feed_once_newest_first(self):
+        seen = []
+        response = self.client.get(self.url, {'page_size': 2})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            seen.extend(item['id'] for item in response.data['results'])
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+
+        expected = [n.id for n in sorted(self.notifications, key=lambda n: (n.created_at, n.id), reverse=True)]
+        self.assertEqual(seen, expected)
+
+    def test_since_returns_only_newer_notifications(self):
+        since = self.notifications[1].created_at
+        response = self.client.get(self.url, {'since': since.isoformat()})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {item['id'] for item in response.data['results']},
+            {n.id for n in self.notifications[2:]},
+        )
+
+    def test_invalid_since_is_rejected(self):
+        response = self.client.get(self.url, {'since': 'kemarin'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('since', response.data)
+
+
+class NotificationStreamTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='pembeli', email='pembeli@example.com', password='secret123', role=User.Role.BUYER,
+        )
+
+    def test_stream_starts_after_latest_and_delivers_new_notification(self):
+        notify(self.user, 'Lama')
+        subscriber = FakeSubscriber(lambda: push_notification_task([self.user.id], title='Baru', body='Paket tiba'))
+        stream = stream_notifications(self.user.id, max_seconds=5, subscriber_factory=lambda user_id: subscriber)
+
+        self.assertEqual(next(stream), 'retry: 3000\n\n')
+        event = next(stream)
+        stream.close()
+
+        self.assertIn('event: notification', event)
+        self.assertIn('"title": "Baru"', event)
+        self.assertNotIn('Lama', event)
+        self.assertTrue(subscriber.closed)
+
+    def test_last_event_id_replays_missed_notifications(self):
+        first = notify(self.user, 'Pertama')
+        missed = notify(self.user, 'Terlewat')
+        stream = stream_notifications(self.user.id, last_id=first.id, max_seconds=0, subscriber_factory=lambda user_id: None)
+
+        events = list(stream)
+
+        self.assertEqual(len(events), 2)
+        self.assertIn(f'id: {missed.id}', events[1])
+
+    def test_late_commit_below_last_event_id_is_delivered_once(self):
+        late = notify(self.user, 'Terlambat')
+        seen = notify(self.user, 'Sudah terkirim')
+        newer = []
+        subscriber = FakeSubscriber(lambda: newer.append(notify(self.user, 'Baru')))
+        # Client sudah menerima `seen`; `late` (id lebih kecil) baru commit setelahnya
+        stream = stream_notifications(self.user.id, last_id=seen.id, max_seconds=5, subscriber_factory=lambda user_id: subscriber)
+
+        next(stream)
+        first = next(stream)
+        second = next(stream)
+        stream.close()
+
+        self.assertIn('"title": "Terlambat"', first)
+        self.assertIn(f'id: {seen.id}\n', first)
+        self.assertIn('"title": "Baru"', second)
+        self.assertIn(f'id: {newer[0].id}\n', second)
+        self.assertNotIn('Terlambat', second)
+        self.assertNotIn(f'"id": {late.id},', second)
+
+    def test_db_connection_is_released_before_each_wait(self):
+        waits = []
+
+        def on_wait():
+            waits.append(release.call_count)
+            push_notification_task([self.user.id], title='Baru', body='-')
+
+        subscriber = FakeSubscriber(on_wait)
+        with mock.patch('apps.notifications.stream.release_db_connections') as release:
+            stream = stream_notifications(self.user.id, max_seconds=5, subscriber_factory=lambda user_id: subscriber)
+            next(stream)
+            self.assertIn('event: notification', next(stream))
+            stream.close()
+
+        self.assertEqual(waits, [1])
+
+    def test_stream_requires_authentication(self):
+        response = self.client.get(reverse('notifications-stream'), HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(response.status_code, 401)
+
+
+class NotificationFanOutTests(APITestCase):
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(
+                username=f'owner{index}', email=f'owner{index}@example.com', password='secret123', role=User.Role.OWNER,
+            )
+            for index in range(5)
+        ]
+        self.user_ids = [user.id for user in self.users]
+
+    def test_fan_out_inserts_in_chunks_and_skips_unknown_ids(self):
+        stats = fan_out(self.user_ids + [999999], 'Tamper', 'Locker dibuka paksa', size=2)
+
+        self.assertEqual((stats.requested, stats.created, stats.chunks), (6, 5, 3))
+        self.assertEqual(
+            sorted(Notification.objects.filter(message__title='Tamper').values_list('user_id', flat=True)),
+            sorted(self.user_ids),
+        )
+        self.assertEqual(NotificationMessage.objects.count(), 1)
+
+    def test_list_keeps_response_shape(self):
+        fan_out(self.user_ids, 'Tamper', 'Locker dibuka paksa')
+        self.client.force_authenticate(self.users[0])
+
+        response = self.client.get(reverse('notifications-list'))
+
+        item = response.data['results'][0]
+        self.assertEqual(set(item), {'id', 'title', 'body', 'created_at', 'read_at'})
+        self.assertEqual((item['title'], item['body']), ('Tamper', 'Locker dibuka paksa'))
+
+    @override_settings(NOTIFICATION_FANOUT_PARALLEL_THRESHOLD=2, NOTIFICATION_FANOUT_CHUNK_SIZE=2)
+    def test_large_audience_is_split_into_parallel_subtasks(self):
+        with mock.patch.object(notification_tasks, 'group') as group, self.captureOnCommitCallbacks(execute=True):
+            result = notification_tasks.push_notification_task(self.user_ids, title='Broadcast', body='-')
+
+        self.assertEqual(result, 'notification_dispatched')
+        signatures = list(group.call_args.args[0])
+        self.assertEqual([sig.args[0] for sig in signatures], [self.user_ids[0:2], self.user_ids[2:4], self.user_ids[4:]])
+        group.return_value.apply_async.assert_called_once_with()
+        self.assertFalse(Notification.objects.exists())
+
+    @override_settings(NOTIFICATION_FANOUT_PARALLEL_THRESHOLD=2, NOTIFICATION_FANOUT_CHUNK_SIZE=2)
+    def test_large_unknown_audience_creates_no_message(self):
+        with mock.patch.object(notification_tasks, 'group') as group, self.captureOnCommitCallbacks(execute=True):
+            result = notification_tasks.push_notification_task([999997, 999998, 999999], title='Broadcast', body='-')
+
+        self.assertEqual(result, 'users_not_found')
+        group.assert_not_called()
+        self.assertFalse(NotificationMessage.objects.exists())
+
+    def test_unknown_recipients_only(self):
+        self.assertEqual(notification_tasks.push_notification_task([999999], title='X', body='-'), 'users_not_found')
+
+
+class NotificationReadStateTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='pembeli', email='pembeli@example.com', password='secret123', role=User.Role.BUYER,
+        )
+        self.other = User.objects.create_user(
+            username='lain', email='lain@example.com', password='secret123', role=User.Role.BUYER,
+        )
+        fan_out([self.user.id, self.other.id], 'Paket tiba', '-')
+        fan_out([self.user.id], 'Pembayaran', '-')
+        self.client.force_authenticate(self.user)
+
+    def unread(self):
+        return self.client.get(reverse('notifications-unread-count')).data['unread']
+
+    def test_fan_out_increments_counter(self):
+        self.assertEqual(self.unread(), 2)
+
+    def test_mark_one_read_is_idempotent(self):
+        notification = Notification.objects.filter(user=self.user).first()
+        url = reverse('notifications-read', args=[notification.id])
+
+        first = self.client.post(url)
+        again = self.client.post(url)
+
+        self.assertEqual((first.data['unread'], again.data['unread']), (1, 1))
+        self.assertIsNotNone(Notification.objects.get(pk=notification.pk).read_at)
+
+    def test_cannot_mark_other_users_notification(self):
+        notification = Notification.objects.get(user=self.other)
+        response = self.client.post(reverse('notifications-read', args=[notification.id]))
+
+        self.assertEqual(response.status_code, 404)
+        self.assertIsNone(Notification.objects.get(pk=notification.pk).read_at)
+
+    def test_read_all_clears_only_own_counter(self):
+        response = self.client.post(reverse('notifications-read-all'))
+
+        self.assertEqual((response.data['marked'], response.data['unread']), (2, 0))
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.unread(), 1)
+
+    def test_deleting_unread_notifications_decrements_counter(self):
+        read = Notification.objects.filter(user=self.user, message__title='Paket tiba').get()
+        mark_read(self.user, [read.id])
+        read.refresh_from_db()
+        read.delete()
+        self.assertEqual(self.unread(), 1)
+
+        # CASCADE dari pesan ikut mengurangi counter
+        NotificationMessage.objects.filter(title='Pembayaran').delete()
+        self.assertEqual(self.unread(), 0)
+
+    def test_cascade_delete_applies_counter_decrements_once(self):
+        with mock.patch('apps.notifications.signals.decrement_unread_many', wraps=decrement_unread_many) as decrement:
+            NotificationMessage.objects.all().delete()
+
+        decrement.assert_called_once_with({self.user.id: 2, self.other.id: 1})
+        self.assertEqual(self.unread(), 0)
+        self.assertEqual(NotificationCounter.objects.get(user=self.other).unread, 0)
+
+    def test_reconcile_fixes_drifted_counters(self):
+        NotificationCounter.objects.filter(user=self.user).update(unread=7)
+        NotificationCounter.objects.filter(user=self.other).delete()
+
+        self.assertEqual(reconcile_unread_counters_task(), 2)
+        self.assertEqual(self.unread(), 2)
+        self.assertEqual(NotificationCounter.objects.get(user=self.other).unread, 1)
+        self.assertEqual(reconcile_unread_counters_task(), 0)
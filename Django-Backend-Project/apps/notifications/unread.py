@@ -0,0 +1,119 @@
+"""
+Status baca notifikasi dan counter belum-dibaca per user.
+
+Counter di NotificationCounter diperbarui dengan ekspresi F() bersamaan
+dengan perubahan baris Notification (fan-out menambah, aksi baca dan
+penghapusan notifikasi belum dibaca mengurangi), jadi endpoint badge cukup
+membaca satu baris per primary key. Baris counter selalu dikunci berurutan
+`user_id` agar fan-out paralel tidak saling deadlock. `reconcile_unread`
+menghitung ulang counter secara berkala untuk perubahan yang tidak lewat ORM.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Notification, NotificationCounter
+
+
+def unread_count(user_id):
+    return NotificationCounter.objects.filter(user_id=user_id).values_list('unread', flat=True).first() or 0
+
+
+def increment_unread(user_ids, amount=1):
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return
+    with transaction.atomic():
+        NotificationCounter.objects.bulk_create(
+            [NotificationCounter(user_id=user_id) for user_id in user_ids],
+            ignore_conflicts=True,
+        )
+        # UPDATE ... IN mengunci baris sesuai urutan scan; kunci dulu berurutan user_id
+        list(
+            NotificationCounter.objects.select_for_update()
+            .filter(user_id__in=user_ids).order_by('user_id').values_list('user_id', flat=True)
+        )
+        NotificationCounter.objects.filter(user_id__in=user_ids).update(unread=F('unread') + amount)
+
+
+def decrement_unread(user_id, amount):
+    if amount:
+        NotificationCounter.objects.filter(user_id=user_id).update(
+            unread=Greatest(F('unread') - amount, Value(0)),
+        )
+
+
+def decrement_unread_many(amounts):
+    """
+    Kurangi counter banyak user sekaligus (`amounts`: user_id -> jumlah).
+    Baris dikunci berurutan user_id seperti `increment_unread`, lalu satu
+    UPDATE per jumlah yang berbeda.
+    """
+    by_amount = {}
+    for user_id, amount in sorted(amounts.items()):
+        if amount:
+            by_amount.setdefault(amount, []).append(user_id)
+    if not by_amount:
+        return
+    with transaction.atomic():
+        list(
+            NotificationCounter.objects.select_for_update()
+            .filter(user_id__in=sorted(amounts)).order_by('user_id').values_list('user_id', flat=True)
+        )
+        for amount, user_ids in by_amount.items():
+            NotificationCounter.objects.filter(user_id__in=user_ids).update(
+                unread=Greatest(F('unread') - amount, Value(0)),
+            )
+
+
+def mark_read(user, notification_ids=None):
+    """Tandai notifikasi milik `user` sudah dibaca (semua jika `notification_ids` None)."""
+    queryset = Notification.objects.filter(user=user, read_at__isnull=True)
+    if notification_ids is not None:
+        queryset = queryset.filter(id__in=notification_ids)
+    with transaction.atomic():
+        updated = queryset.update(read_at=timezone.now())
+        decrement_unread(user.id, updated)
+    return updated
+
+
+def reconcile_unread(batch_size=1000):
+    """
+    Samakan counter dengan jumlah Notification belum dibaca, per batch
+    user_id. Mengembalikan jumlah counter yang dikoreksi.
+    """
+    User = get_user_model()
+    fixed = 0
+    last_user_id = 0
+    while True:
+        user_ids = list(
+            User.objects.filter(id__gt=last_user_id).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not user_ids:
+            return fixed
+        last_user_id = user_ids[-1]
+        with transaction.atomic():
+            counters = dict(
+                NotificationCounter.objects.select_for_update()
+                .filter(user_id__in=user_ids)
+                .order_by('user_id')
+                .values_list('user_id', 'unread')
+            )
+            actual = dict(
+                Notification.objects.filter(user_id__in=user_ids, read_at__isnull=True)
+                .values('user_id').annotate(total=Count('id')).order_by()
+                .values_list('user_id', 'total')
+            )
+            missing = [
+                NotificationCounter(user_id=user_id, unread=total)
+                for user_id, total in sorted(actual.items()) if user_id not in counters
+            ]
+            stale = [
+                NotificationCounter(user_id=user_id, unread=actual.get(user_id, 0))
+                for user_id, unread in counters.items() if unread != actual.get(user_id, 0)
+            ]
+            NotificationCounter.objects.bulk_create(missing, ignore_conflicts=True)
+            NotificationCounter.objects.bulk_update(stale, ['unread'])
+        fixed += len(missing) + len(stale)
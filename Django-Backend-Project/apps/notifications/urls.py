@@ -1,8 +1,19 @@
 from django.urls import path
 
-from .views import NotificationListView, NotificationPushView
+from .views import (
+    NotificationListView,
+    NotificationPushView,
+    NotificationReadAllView,
+    NotificationReadView,
+    NotificationStreamView,
+    NotificationUnreadCountView,
+)
 
 urlpatterns = [
     path('', NotificationListView.as_view(), name='notifications-list'),
+    path('stream/', NotificationStreamView.as_view(), name='notifications-stream'),
+    path('unread-count/', NotificationUnreadCountView.as_view(), name='notifications-unread-count'),
+    path('read-all/', NotificationReadAllView.as_view(), name='notifications-read-all'),
+    path('<int:pk>/read/', NotificationReadView.as_view(), name='notifications-read'),
     path('push/', NotificationPushView.as_view(), name='notifications-push'),
 ]
@@ -3,17 +3,72 @@ from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from apps.lockers.command_stream import EventStreamRenderer
+from smartlocker.pagination import FeedCursorPagination
+from smartlocker.streaming import event_stream_response
+
 from .models import Notification
 from .serializers import NotificationPushSerializer, NotificationSerializer
+from .stream import stream_notifications
+from .unread import mark_read, unread_count
 from .tasks import push_notification_task
 
 
 class NotificationListView(generics.ListAPIView):
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = FeedCursorPagination
 
     def get_queryset(self):
-        return Notification.objects.filter(user=self.request.user).order_by('-created_at')
+        return Notification.objects.filter(user=self.request.user).select_related('message').order_by('-created_at')
+
+
+class NotificationStreamView(APIView):
+    """
+    Stream SSE notifikasi baru milik user. Setiap event `notification` berisi
+    objek yang sama dengan item list; kirim header `Last-Event-ID` saat
+    tersambung ulang agar notifikasi yang terlewat dikirim ulang.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [EventStreamRenderer]
+
+    @extend_schema(responses={(200, 'text/event-stream'): OpenApiResponse(description='Server-Sent Events stream')})
+    def get(self, request):
+        last_id = request.headers.get('Last-Event-ID') or request.query_params.get('last_id')
+        try:
+            last_id = int(last_id) if last_id else None
+        except (TypeError, ValueError):
+            last_id = None
+        return event_stream_response(stream_notifications(request.user.id, last_id))
+
+
+class NotificationUnreadCountView(APIView):
+    """Jumlah notifikasi belum dibaca untuk badge; dibaca dari NotificationCounter."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(responses={'200': OpenApiResponse(description='{"unread": <int>}')})
+    def get(self, request):
+        return Response({'unread': unread_count(request.user.id)}, status=status.HTTP_200_OK)
+
+
+class NotificationReadView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(request=None, responses={'200': OpenApiResponse(description='Notification marked as read')})
+    def post(self, request, pk):
+        if not Notification.objects.filter(pk=pk, user=request.user).exists():
+            return Response({'error': 'Notification not found.'}, status=status.HTTP_404_NOT_FOUND)
+        mark_read(request.user, [pk])
+        return Response({'status': 'ok', 'unread': unread_count(request.user.id)}, status=status.HTTP_200_OK)
+
+
+class NotificationReadAllView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(request=None, responses={'200': OpenApiResponse(description='All notifications marked as read')})
+    def post(self, request):
+        updated = mark_read(request.user)
+        return Response({'status': 'ok', 'marked': updated, 'unread': unread_count(request.user.id)}, status=status.HTTP_200_OK)
 
 
 class NotificationPushView(APIView):
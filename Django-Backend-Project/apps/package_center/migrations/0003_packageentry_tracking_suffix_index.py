@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:11
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('package_center', '0002_limit_status_choices'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='packageentry',
+            index=models.Index(django.db.models.functions.text.Right('tracking_number', 5), name='packageentry_tracking_sfx_idx'),
+        ),
+    ]
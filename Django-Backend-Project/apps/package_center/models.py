@@ -1,5 +1,6 @@
 from django.conf import settings
 from django.db import models
+from django.db.models.functions import Right
 
 
 class PackageEntry(models.Model):
@@ -33,6 +34,10 @@ class PackageEntry(models.Model):
     class Meta:
         ordering = ['-created_at']
         unique_together = ('owner', 'tracking_number')
+        indexes = [
+            # Keypad kiosk memverifikasi 5 karakter terakhir nomor resi
+            models.Index(Right('tracking_number', 5), name='packageentry_tracking_sfx_idx'),
+        ]
 
     def __str__(self):
         return f'{self.package_name} ({self.tracking_number})'
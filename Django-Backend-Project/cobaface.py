@@ -7,36 +7,51 @@ import threading
 from threading import Thread
 import serial
 import threading
-import psycopg2
 import os
 import datetime
 import paho.mqtt.client as mqtt
 import json
+import requests
 import face
+from device_client import DeviceClient
+from device_client import fulfill_locker_request as send_fulfill
 
-# --- Database Configuration ---
-# Konfigurasi database sekarang menggunakan localhost dan port 1723 sesuai dengan Docker
-DB_NAME = os.getenv("PG_DB", "smartlocker") # Mengikuti nama DB di Django
-DB_USER = os.getenv("PG_USER", "smartlocker_admin") # Mengikuti konfigurasi di Django
-DB_PASSWORD = os.getenv("PG_PASSWORD", "penlokjaya") # Mengikuti konfigurasi di Django
-DB_HOST = os.getenv("DB_HOST", "localhost") # Menggunakan localhost agar bisa terhubung ke Docker
-DB_PORT = os.getenv("DB_PORT", "1723") # Menggunakan port forwarding Docker
+# --- API Server ---
+API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
+STREAM_BASE_URL = os.getenv("STREAM_BASE_URL", API_BASE_URL)  # Service stream SSE (docker-compose: port 8001)
+DEVICE_TOKEN = os.getenv("SMARTLOCKER_DEVICE_TOKEN", "")
+device_client = DeviceClient(API_BASE_URL, DEVICE_TOKEN)
 
 # --- MQTT Setup ---
 MQTT_BROKER_HOST = "localhost"
 MQTT_BROKER_PORT = 1883
 MQTT_TOPIC_COMMAND = "penlok/command"
+MQTT_TOPIC_COMMAND_ACK = "penlok/command/ack"
 
 def on_connect(client, userdata, flags, rc):
     if rc == 0:
         print("Terhubung ke MQTT Broker!")
-        client.subscribe(MQTT_TOPIC_COMMAND)
+        client.subscribe(MQTT_TOPIC_COMMAND, qos=1)
         print(f"Berlangganan topik: {MQTT_TOPIC_COMMAND}")
     else:
         print(f"Gagal terhubung, kode status: {rc}")
 
+def send_command_ack(client, data, status, detail=""):
+    # Server menunggu ack dengan command_id yang sama (lihat apps/lockers/mqtt_commands.py)
+    command_id = data.get("command_id")
+    if not command_id:
+        return
+    ack = {
+        "command_id": command_id,
+        "locker_number": data.get("locker_number"),
+        "status": status,
+        "detail": detail,
+    }
+    client.publish(MQTT_TOPIC_COMMAND_ACK, json.dumps(ack), qos=1)
+
 def on_message(client, userdata, msg):
     print(f"Pesan diterima dari topik {msg.topic}: {msg.payload.decode()}")
+    data = {}
     try:
         data = json.loads(msg.payload.decode())
         action = data.get("action")
@@ -47,13 +62,17 @@ def on_message(client, userdata, msg):
             relay_to_trigger = LOCKER_RELAY_MAP[locker_number]
             trigger_relay(relay_to_trigger, 1)
             print(f"Loker {locker_number} telah dibuka.")
+            send_command_ack(client, data, "ok")
         else:
             print(f"Aksi tidak dikenal '{action}' atau loker '{locker_number}' tidak valid.")
+            send_command_ack(client, data, "error", f"Aksi '{action}' atau loker '{locker_number}' tidak valid")
 
     except json.JSONDecodeError:
         print("Gagal mem-parsing JSON dari pesan MQTT.")
     except Exception as e:
         print(f"Terjadi error saat memproses pesan MQTT: {e}")
+        if isinstance(data, dict):
+            send_command_ack(client, data, "error", str(e))
 
 def setup_mqtt_client():
     client = mqtt.Client()
@@ -108,53 +127,61 @@ KEYS = [
     ['*', '0', '#']
 ]
 
-def poll_locker_requests():
+def fulfill_locker_request(session, request_id):
+    """Tandai request sudah dibuka lewat API (menggantikan UPDATE langsung ke database)."""
+    try:
+        send_fulfill(session, request_id, base_url=API_BASE_URL)
+    except Exception as e:
+        print(f"Gagal menandai request loker {request_id}: {e}")
+
+
+def listen_locker_requests():
     """
-    Fungsi untuk polling permintaan pembukaan loker dari database
+    Terima permintaan pembukaan loker secara push dari stream SSE server.
+    Stream ditutup server secara berkala; sambung ulang dengan Last-Event-ID.
     """
+    session = requests.Session()
+    session.headers.update({"Accept": "text/event-stream"})
+    if DEVICE_TOKEN:
+        session.headers.update({"X-Device-Token": DEVICE_TOKEN})
+    last_event_id = None
+    retry_delay = 1
     while True:
         try:
-            # Ambil permintaan terbaru yang belum diproses
-            conn = psycopg2.connect(
-                dbname=DB_NAME,
-                user=DB_USER,
-                password=DB_PASSWORD,
-                host=DB_HOST,
-                port=DB_PORT
-            )
-            cur = conn.cursor()
-
-            # Query semua permintaan yang belum diproses
-            cur.execute("""
-                SELECT locker_number
-                FROM lockers_lockerrequest
-                WHERE fulfilled = false
-                ORDER BY requested_at DESC
-            """)
-            unfulfilled_requests = cur.fetchall()
-
-            for request in unfulfilled_requests:
-                locker_number = request[0]
-                if locker_number in LOCKER_RELAY_MAP:
-                    print(f"Membuka loker nomor: {locker_number} berdasarkan permintaan dari database")
-                    relay_to_trigger = LOCKER_RELAY_MAP[locker_number]
-                    trigger_relay(relay_to_trigger, 1)
-                    print(f"Loker {locker_number} telah dibuka.")
-
-                    # Tandai permintaan sebagai sudah diproses
-                    cur.execute("""
-                        UPDATE lockers_lockerrequest
-                        SET fulfilled = true, fulfilled_at = NOW()
-                        WHERE locker_number = %s AND fulfilled = false
-                        """, (locker_number,))
-                    conn.commit()
-
-            cur.close()
-            conn.close()
+            headers = {"Last-Event-ID": str(last_event_id)} if last_event_id else {}
+            with session.get(
+                f"{STREAM_BASE_URL}/api/v1/lockers/requests/stream/",
+                headers=headers,
+                stream=True,
+                timeout=(5, 60),
+            ) as response:
+                response.raise_for_status()
+                retry_delay = 1
+                event_id = None
+                data = None
+                for line in response.iter_lines(decode_unicode=True):
+                    if line is None:
+                        continue
+                    if line.startswith("id:"):
+                        event_id = line[3:].strip()
+                    elif line.startswith("data:"):
+                        data = line[5:].strip()
+                    elif line == "" and data:
+                        # Satu event SSE selesai
+                        request = json.loads(data)
+                        locker_number = request.get("locker_number")
+                        if locker_number in LOCKER_RELAY_MAP:
+                            print(f"Membuka loker nomor: {locker_number} berdasarkan permintaan dari server")
+                            trigger_relay(LOCKER_RELAY_MAP[locker_number], 1)
+                            print(f"Loker {locker_number} telah dibuka.")
+                        fulfill_locker_request(session, request["id"])
+                        last_event_id = event_id or request["id"]
+                        event_id = None
+                        data = None
         except Exception as e:
-            print(f"Error saat polling permintaan loker: {e}")
-
-        time.sleep(2)  # Tunggu 2 detik sebelum polling lagi
+            print(f"Stream permintaan loker terputus: {e}")
+            time.sleep(retry_delay)
+            retry_delay = min(retry_delay * 2, 30)
 
 # Setup GPIO
 PIN_BUTTON = 16
@@ -607,7 +634,7 @@ def face_handle_training_flow():
         if len(verified_images) >= target_images:
             face_display_lines(["Upload ke server", "", "", ""])
             status_upload, response = face.upload_images_to_server(username, verified_images)
-            if status_upload == 200 and isinstance(response, dict):
+            if status_upload in (200, 202) and isinstance(response, dict):
                 total = len(response.get("data", []))
                 face_show_temp_message([
                     "Upload sukses",
@@ -615,7 +642,7 @@ def face_handle_training_flow():
                     "",
                     "",
                 ], 3)
-            elif status_upload == 200:
+            elif status_upload in (200, 202):
                 face_show_temp_message([
                     "Upload sukses",
                     "",
@@ -652,7 +679,9 @@ def face_handle_verification_flow():
         face_show_temp_message(["Gagal ambil foto"], 2)
         return
 
-    status_code, response = face.send_face_log_to_server(image_path)
+    # Tambah beberapa frame burst agar satu frame blur tidak langsung ditolak
+    burst_paths = [image_path] + face.capture_face_burst(num_frames=4)
+    status_code, response = face.send_face_burst_to_server(burst_paths)
     face.cleanup_face_log_temp()
 
     if status_code == 200 and isinstance(response, dict):
@@ -710,31 +739,8 @@ def face_menu_loop():
 
 
 def verify_tracking_id_from_db(input_id):
-    conn = None
-    try:
-        conn = psycopg2.connect(
-            dbname=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT
-        )
-        cur = conn.cursor()
-        # Query untuk memeriksa 5 digit terakhir dari tracking_number
-        # Menggunakan RIGHT() untuk mengambil 5 karakter terakhir
-        cur.execute(
-            "SELECT 1 FROM package_center_packageentry WHERE RIGHT(tracking_number, 5) = %s;",
-            (input_id,)
-        )
-        result = cur.fetchone()
-        cur.close()
-        return result is not None
-    except Exception as e:
-        print(f"Error connecting to or querying database: {e}")
-        return False
-    finally:
-        if conn:
-            conn.close()
+    # Cek 5 digit terakhir resi lewat API device (cache lokal dulu, lalu server)
+    return device_client.verify_tracking(input_id)
 
 def menu_utama():
     lcd.clear()
@@ -835,30 +841,7 @@ def menu_input_id(kembali_ke):
                 input_id = ""
 
 def verify_otp_from_db(otp):
-    conn = None
-    try:
-        conn = psycopg2.connect(
-            dbname=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT
-        )
-        cur = conn.cursor()
-        # Query untuk memeriksa apakah OTP ada di tabel marketplace_transaction
-        cur.execute(
-            "SELECT 1 FROM marketplace_transaction WHERE otp = %s;",
-            (otp,)
-        )
-        result = cur.fetchone()
-        cur.close()
-        return result is not None
-    except Exception as e:
-        print(f"Error connecting to or querying database for OTP: {e}")
-        return False
-    finally:
-        if conn:
-            conn.close()
+    return device_client.verify_otp(otp)
 
 def menu_ambil():
     lcd.clear()
@@ -919,8 +902,11 @@ def menu_ambil():
                 input_id = ""
 
 # Main loop
-# Mulai polling permintaan loker dari database
-threading.Thread(target=poll_locker_requests, daemon=True).start()
+# Mulai mendengarkan permintaan loker dari stream server
+threading.Thread(target=listen_locker_requests, daemon=True).start()
+
+# Cache akhiran resi agar verifikasi keypad tetap cepat saat server lambat (OTP selalu dicek ke server)
+device_client.start_cache_refresh()
 
 # Mulai monitoring loadcell dengan toleransi
 threading.Thread(target=monitor_loadcell, daemon=True).start()
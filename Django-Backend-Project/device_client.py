@@ -0,0 +1,146 @@
+"""
+Client HTTP kiosk untuk verifikasi keypad (dipakai cobaface.py).
+
+- Satu requests.Session keep-alive dengan pool koneksi dan retry, bukan
+  koneksi PostgreSQL baru per percobaan keypad.
+- Cache lokal ber-TTL berisi hash akhiran resi aktif dari
+  `/device/pending-codes/` (butuh DeviceKey terdaftar), di-refresh di thread
+  latar. Akhiran yang ada di cache langsung dianggap benar; kode lain dicek
+  ke server dengan timeout pendek.
+- OTP tidak pernah di-cache: setiap OTP dikonsumsi di server
+  (`otp/validate/`) sebelum loker dibuka, karena hanya berlaku sekali.
+"""
+import hashlib
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
+DEVICE_TOKEN = os.getenv("SMARTLOCKER_DEVICE_TOKEN", "")
+VERIFY_TIMEOUT = float(os.getenv("DEVICE_VERIFY_TIMEOUT", "2"))
+
+
+def hash_code(code, salt):
+    # Harus sama dengan apps/lockers/device_views.py
+    return hashlib.sha256(f"{salt}:{code}".encode()).hexdigest()
+
+
+def fulfill_locker_request(session, request_id, base_url=API_BASE_URL, timeout=5):
+    """
+    Tandai request buka loker sudah dipenuhi. `session` boleh session stream
+    SSE: Accept JSON ditulis eksplisit karena endpoint fulfill menolak
+    `Accept: text/event-stream` (406).
+    """
+    response = session.post(
+        f"{base_url.rstrip('/')}/api/v1/lockers/requests/{request_id}/fulfill/",
+        headers={"Accept": "application/json"},
+        timeout=timeout,
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+class PendingCodeCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.salt = None
+        self.tracking_suffixes = set()
+        self.expires_at = 0
+
+    def update(self, data):
+        with self.lock:
+            self.salt = data["salt"]
+            self.tracking_suffixes = set(data.get("tracking_suffixes", []))
+            self.expires_at = time.monotonic() + data.get("ttl", 30)
+
+    def contains(self, code):
+        with self.lock:
+            if self.salt is None or time.monotonic() > self.expires_at:
+                return False
+            return hash_code(code, self.salt) in self.tracking_suffixes
+
+
+class DeviceClient:
+    def __init__(self, base_url=API_BASE_URL, token=DEVICE_TOKEN, timeout=VERIFY_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(total=2, backoff_factor=0.2, status_forcelist=(502, 503, 504))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if token:
+            self.session.headers.update({"X-Device-Token": token})
+        self.cache = PendingCodeCache()
+        self._refresher = None
+
+    def _url(self, path):
+        return f"{self.base_url}/api/v1/lockers/{path}"
+
+    def refresh_cache(self):
+        response = self.session.get(self._url("device/pending-codes/"), timeout=5)
+        response.raise_for_status()
+        data = response.json()
+        self.cache.update(data)
+        return data.get("ttl", 30)
+
+    def start_cache_refresh(self):
+        """Refresh cache kode aktif di thread latar sebelum TTL habis."""
+        if self._refresher is not None:
+            return
+
+        def loop():
+            while True:
+                try:
+                    ttl = self.refresh_cache()
+                    time.sleep(max(1, ttl / 2))
+                except requests.HTTPError as e:
+                    if e.response is not None and e.response.status_code == 403:
+                        # Cache hanya untuk DeviceKey terdaftar; tanpa itu semua kode dicek ke server
+                        print("Cache kode dimatikan: token device bukan DeviceKey terdaftar")
+                        return
+                    print(f"Gagal memperbarui cache kode: {e}")
+                    time.sleep(5)
+                except Exception as e:
+                    print(f"Gagal memperbarui cache kode: {e}")
+                    time.sleep(5)
+
+        self._refresher = threading.Thread(target=loop, daemon=True)
+        self._refresher.start()
+
+    def verify_tracking(self, code):
+        if self.cache.contains(code):
+            return True
+        try:
+            response = self.session.post(
+                self._url("device/verify-tracking/"), json={"code": code}, timeout=self.timeout
+            )
+            response.raise_for_status()
+            return bool(response.json().get("valid"))
+        except Exception as e:
+            print(f"Error verifikasi tracking ke server: {e}")
+            return False
+
+    def _consume_otp(self, code):
+        response = self.session.post(self._url("otp/validate/"), json={"otp": code}, timeout=self.timeout)
+        if response.status_code == 400:
+            return False
+        response.raise_for_status()
+        return True
+
+    def verify_otp(self, code):
+        """
+        OTP sekali pakai: True hanya jika server berhasil menandai OTP terpakai
+        lewat `otp/validate/`. Server tidak terjangkau berarti loker tetap
+        tertutup.
+        """
+        try:
+            return self._consume_otp(code)
+        except Exception as e:
+            print(f"Error verifikasi otp ke server: {e}")
+            return False
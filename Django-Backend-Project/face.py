@@ -426,7 +426,7 @@ def process_user_training_by_faceid(username):
     print("\n⏳ Upload...")
     status_code, response = upload_images_to_server(username, verified_images)
 
-    if status_code == 200:
+    if status_code in (200, 202):
         print("\n" + "=" * 50)
         if action_type == "baru":
             print("✓ UPLOAD BERHASIL!")
@@ -436,6 +436,8 @@ def process_user_training_by_faceid(username):
         msg = response.get('message', '')
         print(f"Msg: {truncate_text(msg)}")
         print(f"Jumlah: {len(response.get('data', []))}")
+        if response.get('job_id'):
+            print(f"Job: {response['job_id'][:8]}")
     else:
         print(f"\n✗ Gagal ({status_code})")
         print(f"Resp: {truncate_text(str(response))}")
@@ -647,6 +649,65 @@ def send_face_log_to_server(image_path):
         return None, None
 
 
+def capture_face_burst(num_frames=5, frame_gap=5, warmup_frames=30):
+    """Ambil beberapa frame berurutan dalam satu burst untuk verifikasi batch"""
+    cap = cv2.VideoCapture(0, cv2.CAP_V4L2)
+
+    if not cap.isOpened():
+        print("❌ Kamera /dev/video0 tidak bisa dibuka")
+        return []
+
+    log_temp_dir = os.path.join(TEMP_DIR, "face_log")
+    os.makedirs(log_temp_dir, exist_ok=True)
+
+    # Buang frame awal agar exposure kamera stabil
+    for _ in range(warmup_frames):
+        cap.read()
+
+    image_paths = []
+    frame_index = 0
+    while len(image_paths) < num_frames:
+        ret, frame = cap.read()
+        if not ret:
+            print("Error: Baca frame")
+            break
+        frame_index += 1
+        if frame_index % frame_gap:
+            continue
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        filepath = os.path.join(log_temp_dir, f"burst_{timestamp}.jpg")
+        cv2.imwrite(filepath, frame)
+        image_paths.append(filepath)
+
+    cap.release()
+    print(f"📸 Burst: {len(image_paths)} frame")
+    return image_paths
+
+
+def send_face_burst_to_server(image_paths, fusion="majority"):
+    """Mengirim beberapa frame sekaligus untuk satu keputusan verifikasi"""
+    files = []
+    try:
+        for image_path in image_paths:
+            files.append(
+                ('image_list', (os.path.basename(image_path), open(image_path, 'rb'), 'image/jpeg'))
+            )
+
+        print("\n⏳ Kirim burst ke server...")
+        response = requests.post(
+            f"{BASE_URL}/api/v1/facerecognition/createlogusersmartbatch/",
+            data={'fusion': fusion},
+            files=files
+        )
+        return response.status_code, response.json()
+    except Exception as e:
+        print(f"Error: {truncate_text(str(e))}")
+        return None, None
+    finally:
+        for _, (_, file_obj, _) in files:
+            file_obj.close()
+
+
 def cleanup_face_log_temp():
     """Membersihkan file temporary face log"""
     log_temp_dir = os.path.join(TEMP_DIR, "face_log")
@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
+
+
+class FeedCursorPagination(CursorPagination):
+    """
+    Keyset pagination untuk feed (terbaru dulu). Posisi cursor disimpan di
+    token `cursor`, jadi biaya satu halaman tetap walau riwayat membesar.
+    `?since=<ISO datetime>` membatasi hasil ke baris yang lebih baru dari
+    waktu tersebut (delta sync aplikasi).
+    """
+
+    page_size = getattr(settings, 'API_FEED_PAGE_SIZE', 20)
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+    since_query_param = 'since'
+
+    @property
+    def since_field(self):
+        return self.ordering[0].lstrip('-')
+
+    def parse_since(self, request):
+        raw = request.query_params.get(self.since_query_param)
+        if not raw:
+            return None
+        # `+` di query string bisa berubah menjadi spasi jika client tidak meng-encode
+        value = parse_datetime(raw.replace(' ', '+'))
+        if value is None:
+            raise ValidationError({self.since_query_param: 'Invalid ISO 8601 datetime.'})
+        if timezone.is_naive(value):
+            value = timezone.make_aware(value)
+        return value
+
+    def paginate_queryset(self, queryset, request, view=None):
+        since = self.parse_since(request)
+        if since is not None:
+            queryset = queryset.filter(**{f'{self.since_field}__gt': since})
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        parameters.append({
+            'name': self.since_query_param,
+            'required': False,
+            'in': 'query',
+            'description': f'Only return items with {self.since_field} after this ISO 8601 datetime.',
+            'schema': {'type': 'string', 'format': 'date-time'},
+        })
+        return parameters
+
+
+class TimestampCursorPagination(FeedCursorPagination):
+    ordering = ('-timestamp', '-id')
@@ -0,0 +1,32 @@
+import logging
+import threading
+
+from django.conf import settings
+
+try:
+    import redis
+except ModuleNotFoundError:
+    redis = None
+
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_redis():
+    """
+    Client Redis bersama (connection pool) dari `REDIS_CACHE_URL`, untuk fitur
+    yang butuh operasi atomik di luar API cache Django. None jika Redis tidak
+    dikonfigurasi; pemanggil wajib punya fallback.
+    """
+    global _client
+    url = getattr(settings, 'REDIS_CACHE_URL', None)
+    if not url or redis is None:
+        return None
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = redis.Redis.from_url(url, socket_timeout=1, socket_connect_timeout=1)
+    return _client
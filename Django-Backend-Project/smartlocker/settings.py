@@ -2,15 +2,42 @@ import os
 from datetime import timedelta
 from pathlib import Path
 
+from celery.schedules import crontab
 from dotenv import load_dotenv
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 load_dotenv(os.path.join(BASE_DIR, '.env'))
 
 # MQTT Configuration                                                                                                                                                                     
-MQTT_BROKER_HOST = 'localhost'  # Ganti dengan IP broker MQTT Anda jika tidak di localhost                                                                                               
-MQTT_BROKER_PORT = 1883         # Port default MQTT                                                                                                                                      
+MQTT_BROKER_HOST = os.getenv('MQTT_BROKER_HOST', 'localhost')  # Ganti dengan IP broker MQTT Anda jika tidak di localhost                                                                                               
+MQTT_BROKER_PORT = int(os.getenv('MQTT_BROKER_PORT', '1883'))  # Port default MQTT                                                                                                                                      
 MQTT_TOPIC_COMMAND = 'penlok/command' # Topik untuk mengirim perintah ke Raspberry Pi
+MQTT_TOPIC_COMMAND_ACK = os.getenv('MQTT_TOPIC_COMMAND_ACK', 'penlok/command/ack')  # Balasan device untuk setiap command_id
+MQTT_COMMAND_CLIENT_ID = os.getenv('MQTT_COMMAND_CLIENT_ID', 'smartlocker-cmd')  # Prefix; pid worker ditambahkan otomatis
+MQTT_COMMAND_ACK_TIMEOUT = float(os.getenv('MQTT_COMMAND_ACK_TIMEOUT', '5'))
+
+# Stream SSE memegang satu thread worker per koneksi. Service `web` membatasi jumlahnya per proses
+# agar API tetap punya thread; service `stream` (pool thread besar) menset 0 = tanpa batas.
+SSE_MAX_STREAMS_PER_PROCESS = int(os.getenv('SSE_MAX_STREAMS_PER_PROCESS', '2'))
+# Stream SSE permintaan buka locker (/api/v1/lockers/requests/stream/)
+LOCKER_STREAM_MAX_SECONDS = int(os.getenv('LOCKER_STREAM_MAX_SECONDS', '300'))  # Device tersambung ulang dengan Last-Event-ID
+LOCKER_STREAM_HEARTBEAT = int(os.getenv('LOCKER_STREAM_HEARTBEAT', '15'))
+LOCKER_STREAM_POLL_INTERVAL = float(os.getenv('LOCKER_STREAM_POLL_INTERVAL', '1'))  # Fallback tanpa LISTEN/NOTIFY
+# Stream SSE notifikasi user (/api/v1/notifications/stream/), sinyal lewat Redis pub/sub
+NOTIFICATION_STREAM_MAX_SECONDS = int(os.getenv('NOTIFICATION_STREAM_MAX_SECONDS', '300'))
+NOTIFICATION_STREAM_HEARTBEAT = int(os.getenv('NOTIFICATION_STREAM_HEARTBEAT', '15'))
+NOTIFICATION_STREAM_POLL_INTERVAL = float(os.getenv('NOTIFICATION_STREAM_POLL_INTERVAL', '5'))  # Fallback tanpa Redis
+NOTIFICATION_STREAM_RESCAN_SECONDS = int(os.getenv('NOTIFICATION_STREAM_RESCAN_SECONDS', '30'))  # Jendela id yang commit terlambat
+NOTIFICATION_FANOUT_CHUNK_SIZE = int(os.getenv('NOTIFICATION_FANOUT_CHUNK_SIZE', '1000'))  # Baris per INSERT saat fan-out
+NOTIFICATION_FANOUT_PARALLEL_THRESHOLD = int(os.getenv('NOTIFICATION_FANOUT_PARALLEL_THRESHOLD', '5000'))  # Di atas ini dipecah ke subtask Celery
+DEVICE_CODE_CACHE_TTL = int(os.getenv('DEVICE_CODE_CACHE_TTL', '30'))  # TTL cache kode keypad di kiosk
+MQTT_TOPIC_EVENTS = os.getenv('MQTT_TOPIC_EVENTS', 'penlok/events/#')  # Telemetri device -> `manage.py mqtt_ingest`
+MQTT_INGEST_CLIENT_ID = os.getenv('MQTT_INGEST_CLIENT_ID', 'smartlocker-ingest')
+MQTT_INGEST_BATCH_SIZE = int(os.getenv('MQTT_INGEST_BATCH_SIZE', '200'))
+MQTT_INGEST_FLUSH_INTERVAL = float(os.getenv('MQTT_INGEST_FLUSH_INTERVAL', '0.5'))
+# Batas pesan QoS 1 belum di-ack yang diminta ke broker (MQTT v5 Receive Maximum); batch penuh pada nilai terkecil
+MQTT_INGEST_RECEIVE_MAXIMUM = int(os.getenv('MQTT_INGEST_RECEIVE_MAXIMUM', str(MQTT_INGEST_BATCH_SIZE)))
+MQTT_INGEST_SESSION_EXPIRY = int(os.getenv('MQTT_INGEST_SESSION_EXPIRY', '86400'))  # Detik broker menyimpan sesi + pesan belum di-ack
 
 LOG_DIR = BASE_DIR / 'logs'
 LOG_DIR.mkdir(parents=True, exist_ok=True)
@@ -142,14 +169,102 @@ SPECTACULAR_SETTINGS = {
     'VERSION': '2.0.0',
 }
 
+# Cache bersama antar worker gunicorn/Celery; tanpa REDIS_CACHE_URL pakai cache lokal per proses
+REDIS_CACHE_URL = os.getenv('REDIS_CACHE_URL')
+if REDIS_CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', 'redis://localhost:6379/0')
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'Asia/Jakarta'
+CELERY_BEAT_SCHEDULE = {
+    'iot-rollup-hourly': {
+        'task': 'apps.iot.tasks.rollup_iot_events_task',
+        'schedule': crontab(minute='*/15'),
+    },
+    'iot-ensure-partitions': {
+        'task': 'apps.iot.tasks.ensure_iot_event_partitions_task',
+        'schedule': crontab(hour=0, minute=10),
+    },
+    'iot-retention': {
+        'task': 'apps.iot.tasks.purge_old_iot_events_task',
+        'schedule': crontab(hour=2, minute=30),
+    },
+    'locker-otp-sweep': {
+        'task': 'apps.lockers.tasks.sweep_locker_otps_task',
+        'schedule': crontab(minute='*/15'),
+    },
+    'face-training-recover': {
+        'task': 'apps.facerecognition.tasks.recover_stale_training_jobs_task',
+        'schedule': crontab(minute='*/5'),
+    },
+    'notification-unread-reconcile': {
+        'task': 'apps.notifications.tasks.reconcile_unread_counters_task',
+        'schedule': crontab(hour=3, minute=15),
+    },
+}
 
 SMARTLOCKER_DEVICE_TOKEN = os.getenv('SMARTLOCKER_DEVICE_TOKEN')
+# Autentikasi device (X-Device-Token): kunci per device di tabel DeviceKey (`manage.py create_device_key`)
+DEVICE_AUTH_REQUIRED = os.getenv('DEVICE_AUTH_REQUIRED', 'False').lower() == 'true'  # Tolak request tanpa token meski SMARTLOCKER_DEVICE_TOKEN kosong
+DEVICE_AUTH_CACHE_SIZE = int(os.getenv('DEVICE_AUTH_CACHE_SIZE', '256'))
+DEVICE_AUTH_CACHE_TTL = int(os.getenv('DEVICE_AUTH_CACHE_TTL', '15'))  # Batas waktu worker lain masih menerima kunci yang dicabut
+# Token bucket per device: request/detik rata-rata dan ukuran burst
+DEVICE_THROTTLE_RATE = float(os.getenv('DEVICE_THROTTLE_RATE', '20'))
+DEVICE_THROTTLE_BURST = int(os.getenv('DEVICE_THROTTLE_BURST', '100'))
+# Jumlah event maksimum per request ingest batch IoT
+IOT_INGEST_MAX_BATCH = int(os.getenv('IOT_INGEST_MAX_BATCH', '500'))
+# Anomali getaran: alarm jika >= THRESHOLD dari WINDOW_SIZE event terakhir satu locker adalah tamper
+IOT_TAMPER_WINDOW_SIZE = int(os.getenv('IOT_TAMPER_WINDOW_SIZE', '7'))
+IOT_TAMPER_THRESHOLD = int(os.getenv('IOT_TAMPER_THRESHOLD', '7'))
+IOT_TAMPER_STATE_TTL = int(os.getenv('IOT_TAMPER_STATE_TTL', '86400'))
+# State window disimpan di Redis (REDIS_CACHE_URL); tanpa Redis deteksi mati kecuali state lokal diizinkan (satu proses saja)
+IOT_TAMPER_LOCAL_STATE = os.getenv('IOT_TAMPER_LOCAL_STATE', str(DEBUG)).lower() == 'true'
+# Penyimpanan IoTEvent: partisi PostgreSQL ('month' atau 'day'), retensi event mentah dan rollup per jam
+IOT_EVENT_PARTITION_INTERVAL = os.getenv('IOT_EVENT_PARTITION_INTERVAL', 'month')
+IOT_EVENT_PARTITIONS_AHEAD = int(os.getenv('IOT_EVENT_PARTITIONS_AHEAD', '2'))
+IOT_EVENT_RETENTION_DAYS = int(os.getenv('IOT_EVENT_RETENTION_DAYS', '90'))
+IOT_ROLLUP_RETENTION_DAYS = int(os.getenv('IOT_ROLLUP_RETENTION_DAYS', '365'))
+# OTP pengambilan locker: masa berlaku, batas salah input per transaksi, retensi OTP nonaktif
+LOCKER_OTP_TTL_HOURS = int(os.getenv('LOCKER_OTP_TTL_HOURS', '6'))
+LOCKER_OTP_MAX_ATTEMPTS = int(os.getenv('LOCKER_OTP_MAX_ATTEMPTS', '5'))
+LOCKER_OTP_ATTEMPT_WINDOW_SECONDS = int(os.getenv('LOCKER_OTP_ATTEMPT_WINDOW_SECONDS', '900'))
+LOCKER_OTP_RETENTION_DAYS = int(os.getenv('LOCKER_OTP_RETENTION_DAYS', '30'))
+
+# Face recognition: ukuran crop wajah (piksel) di cache training `media/facecrops/`
+FACE_CROP_SIZE = int(os.getenv('FACE_CROP_SIZE', '100'))
+# Job training RUNNING tanpa heartbeat selama ini (detik) dianggap ditinggal worker mati dan diulang
+FACE_TRAINING_JOB_TIMEOUT = int(os.getenv('FACE_TRAINING_JOB_TIMEOUT', '1800'))
+FACE_TRAINING_MAX_ATTEMPTS = int(os.getenv('FACE_TRAINING_MAX_ATTEMPTS', '3'))
+# Index face_id -> nama owner di cache; None = sampai di-invalidate signal User
+FACE_LABEL_INDEX_TTL = None
+# Verifikasi burst: jumlah frame maksimum per request dan ukuran thread pool decode/recognize
+FACE_BATCH_MAX_FRAMES = int(os.getenv('FACE_BATCH_MAX_FRAMES', '10'))
+FACE_BATCH_WORKERS = int(os.getenv('FACE_BATCH_WORKERS', '4'))
+# Log akses wajah ditulis thread background; antrian penuh -> tulis sinkron (backpressure)
+FACE_ACCESS_LOG_ASYNC = os.getenv('FACE_ACCESS_LOG_ASYNC', 'True').lower() == 'true'
+FACE_ACCESS_LOG_QUEUE_SIZE = int(os.getenv('FACE_ACCESS_LOG_QUEUE_SIZE', '32'))
+FACE_ACCESS_LOG_WORKERS = int(os.getenv('FACE_ACCESS_LOG_WORKERS', '1'))
+FACE_THUMBNAIL_SIZE = int(os.getenv('FACE_THUMBNAIL_SIZE', '160'))
+# Backend pengenalan: 'lbph' (lbph_model.xml) atau 'histogram' (index vektor per owner di hasiltraining/embeddings/)
+FACE_RECOGNIZER_BACKEND = os.getenv('FACE_RECOGNIZER_BACKEND', 'lbph')
+# Batas distance (0-100, lebih kecil = lebih mirip) untuk status Authorized per backend
+FACE_LBPH_THRESHOLD = float(os.getenv('FACE_LBPH_THRESHOLD', '50'))
+FACE_HISTOGRAM_THRESHOLD = float(os.getenv('FACE_HISTOGRAM_THRESHOLD', '35'))
 
 LOGGING = {
     'version': 1,
@@ -0,0 +1,83 @@
+import threading
+
+from django.conf import settings
+from django.db import connections
+from django.http import StreamingHttpResponse
+from rest_framework import status
+from rest_framework.response import Response
+
+
+class StreamSlots:
+    """
+    Batas jumlah stream SSE yang boleh berjalan bersamaan di satu proses.
+    Setiap stream memegang satu thread worker sampai ditutup, jadi tanpa
+    batas ini beberapa client saja bisa menghabiskan thread untuk API biasa.
+    0 berarti tanpa batas (service `stream` punya pool thread sendiri).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.active = 0
+
+    def acquire(self):
+        limit = getattr(settings, 'SSE_MAX_STREAMS_PER_PROCESS', 0)
+        with self._lock:
+            if limit and self.active >= limit:
+                return False
+            self.active += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.active = max(self.active - 1, 0)
+
+
+stream_slots = StreamSlots()
+
+
+class _SlotStream:
+    """Iterable stream yang mengembalikan slot saat response ditutup, walau belum sempat diiterasi."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._released = False
+
+    def __iter__(self):
+        return iter(self.stream)
+
+    def close(self):
+        try:
+            self.stream.close()
+        finally:
+            if not self._released:
+                self._released = True
+                stream_slots.release()
+
+
+def release_db_connections():
+    """
+    Tutup koneksi database thread ini selama stream menunggu event; query
+    berikutnya membuka koneksi baru. Di dalam transaksi (test) tidak ada
+    yang ditutup.
+    """
+    for conn in connections.all(initialized_only=True):
+        if not conn.in_atomic_block:
+            conn.close()
+
+
+def event_stream_response(stream):
+    """
+    StreamingHttpResponse SSE untuk generator `stream`, atau 503 dengan
+    Retry-After jika slot stream proses ini sudah penuh.
+    """
+    if not stream_slots.acquire():
+        stream.close()
+        return Response(
+            {'error': 'Too many open streams on this server, retry later.'},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={'Retry-After': '5'},
+        )
+    response = StreamingHttpResponse(_SlotStream(stream), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,32 @@
+import os
+import tempfile
+
+from django.test import TestCase, override_settings
+
+from apps.facerecognition.benchmark import cv2, run_scale
+from apps.facerecognition.models import Manifesttrainingwajah
+
+
+class FaceRecognitionBenchmarkTestCase(TestCase):
+    def setUp(self):
+        if cv2 is None or not hasattr(cv2, 'face'):
+            self.skipTest('opencv-contrib is not installed')
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.media = override_settings(MEDIA_ROOT=self.tmpdir.name)
+        self.media.enable()
+
+    def tearDown(self):
+        self.media.disable()
+        self.tmpdir.cleanup()
+
+    def test_small_scale_benchmark_runs_training_pipeline(self):
+        row = run_scale(3, os.path.join(self.tmpdir.name, 'lbph_model.xml'), images_per_owner=2, queries=5, enroll_samples=1)
+
+        self.assertEqual(row['owners'], 3)
+        self.assertGreater(row['model_size_bytes'], 0)
+        self.assertLessEqual(row['recognize_p50_ms'], row['recognize_p99_ms'])
+        self.assertEqual(row['accuracy'], 1.0)
+        self.assertGreater(row['peak_rss_mb'], 0)
+        # Owner awal dan owner enroll melewati manifest, lalu retrain penuh
+        self.assertEqual(Manifesttrainingwajah.objects.count(), 8)
+        self.assertEqual(set(Manifesttrainingwajah.objects.values_list('generation', flat=True)), {2})